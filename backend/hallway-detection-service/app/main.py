@@ -1,6 +1,12 @@
-from fastapi import FastAPI, HTTPException
+import time
+
+# Taken before the heavy imports (OpenCV, FastAPI) so startup time includes them
+SERVICE_STARTED_AT = time.monotonic()
+
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 import py_eureka_client.eureka_client as eureka_client
 import logging
 import os
@@ -9,7 +15,27 @@ import cv2
 import numpy as np
 from typing import Optional, List
 import base64
-import urllib.request
+import json
+import asyncio
+from app.services.yolo_postprocessing import DEFAULT_CONFIDENCE_THRESHOLD, DEFAULT_NMS_THRESHOLD
+from app.services.model_registry import get_model_spec, ensure_model_files, load_detector as load_model
+from app.services.inference_pool import InferencePool, QueueFullError
+from app.services.latest_frame import LatestFrameSlot
+from app.services.color_classifier import ColorClassifier, load_palette, DEFAULT_MIN_FRACTION
+from app.services.tracker import (
+    PersonTracker,
+    DEFAULT_IOU_THRESHOLD,
+    DEFAULT_MAX_DISTANCE,
+    DEFAULT_TRACK_TIMEOUT
+)
+from app.services.motion_gate import (
+    MotionGate,
+    DEFAULT_MOTION_THRESHOLD,
+    DEFAULT_PIXEL_THRESHOLD,
+    DEFAULT_MAX_SKIPPED_FRAMES
+)
+from app.services.camera_state import CameraState, CameraStates, hold_cameras
+from app.services.detections import build_detections
 
 # Load environment variables
 load_dotenv()
@@ -43,122 +69,136 @@ APP_NAME = os.getenv("APP_NAME", "HALLWAY-DETECTION-SERVICE")
 PORT = int(os.getenv("PORT", "5001"))
 INSTANCE_HOST = os.getenv("INSTANCE_HOST", "localhost")
 
-# Update the path to YOLO files
-MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
-YOLO_CONFIG = os.path.join(MODELS_DIR, "yolov3.cfg")
-YOLO_WEIGHTS = os.path.join(MODELS_DIR, "yolov3.weights")
-
-# Create models directory if it doesn't exist
-os.makedirs(MODELS_DIR, exist_ok=True)
-
-def download_yolo_files():
-    if not os.path.exists(YOLO_CONFIG):
-        logger.info("Downloading YOLOv3 config file...")
-        cfg_url = "https://raw.githubusercontent.com/pjreddie/darknet/master/cfg/yolov3.cfg"
-        urllib.request.urlretrieve(cfg_url, YOLO_CONFIG)
-    
-    if not os.path.exists(YOLO_WEIGHTS):
-        logger.info("Downloading YOLOv3 weights file (this may take a while)...")
-        weights_url = "https://pjreddie.com/media/files/yolov3.weights"
-        urllib.request.urlretrieve(weights_url, YOLO_WEIGHTS)
-
-# Initialize YOLO
-try:
-    if not os.path.exists(YOLO_CONFIG) or not os.path.exists(YOLO_WEIGHTS):
-        logger.info("YOLO files not found. Attempting to download...")
-        download_yolo_files()
-        
-    net = cv2.dnn.readNet(YOLO_WEIGHTS, YOLO_CONFIG)
-    layer_names = net.getLayerNames()
-    output_layers = [layer_names[i - 1] for i in net.getUnconnectedOutLayers().flatten()]
-    logger.info("YOLO model loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading YOLO model: {e}")
-    net = None
-    output_layers = None
-
-# Color detection function
-def detect_color(frame):
-    if frame is None or frame.size == 0:
-        return "No Frame"
-
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-    # Define color ranges for blue
-    blue_lower = np.array([100, 150, 0])
-    blue_upper = np.array([140, 255, 255])
-    
-    # Define color ranges for green
-    green_lower = np.array([40, 100, 0])
-    green_upper = np.array([80, 255, 255])
-
-    # Create masks for blue and green
-    blue_mask = cv2.inRange(hsv, blue_lower, blue_upper)
-    green_mask = cv2.inRange(hsv, green_lower, green_upper)
-
-    if cv2.countNonZero(blue_mask) > 0:
-        return "Wearing Blue"
-    elif cv2.countNonZero(green_mask) > 0:
-        return "Wearing Green"
-    else:
-        return "Unknown"
+# Detection model selection, see app/services/model_registry.py
+MODELS_DIR = os.getenv("MODELS_DIR", os.path.join(os.path.dirname(__file__), "models"))
+MODEL_REGISTRY_FILE = os.getenv("MODEL_REGISTRY_FILE")
+DETECTION_MODEL = os.getenv("DETECTION_MODEL", "yolov3")
+DETECTION_INPUT_SIZE = int(os.getenv("DETECTION_INPUT_SIZE", "416"))
+DNN_BACKEND = os.getenv("DNN_BACKEND", "default")
+DNN_TARGET = os.getenv("DNN_TARGET", "cpu")
+
+# Default detection thresholds, overridable per request
+CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", str(DEFAULT_CONFIDENCE_THRESHOLD)))
+NMS_THRESHOLD = float(os.getenv("NMS_THRESHOLD", str(DEFAULT_NMS_THRESHOLD)))
+
+# Clothing colour classification: palette JSON file and minimum matching fraction per box
+COLOR_PALETTE_FILE = os.getenv("COLOR_PALETTE_FILE")
+COLOR_MIN_FRACTION = float(os.getenv("COLOR_MIN_FRACTION", str(DEFAULT_MIN_FRACTION)))
+
+# Person tracking per camera: association gates and track expiry (seconds)
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", str(DEFAULT_IOU_THRESHOLD)))
+TRACK_MAX_DISTANCE = float(os.getenv("TRACK_MAX_DISTANCE", str(DEFAULT_MAX_DISTANCE)))
+TRACK_TIMEOUT = float(os.getenv("TRACK_TIMEOUT", str(DEFAULT_TRACK_TIMEOUT)))
+
+# Motion gating per camera: skip YOLO while the scene is unchanged
+MOTION_GATING = os.getenv("MOTION_GATING", "true").lower() == "true"
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", str(DEFAULT_MOTION_THRESHOLD)))
+MOTION_PIXEL_THRESHOLD = int(os.getenv("MOTION_PIXEL_THRESHOLD", str(DEFAULT_PIXEL_THRESHOLD)))
+MOTION_MAX_SKIPPED_FRAMES = int(os.getenv("MOTION_MAX_SKIPPED_FRAMES", str(DEFAULT_MAX_SKIPPED_FRAMES)))
+
+# Inference pool sizing: one loaded net per worker, bounded backlog
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "8"))
+
+# Startup phases, reported by /ready so cold-start time can be tracked across releases
+startup_timings = {
+    "imports_seconds": None,
+    "model_files_seconds": None
+}
+
+model_spec = None
+
+# Resolve the configured model and fetch its files (may download); runs off the event loop
+def prepare_model_files():
+    global model_spec
+    start = time.perf_counter()
+    try:
+        spec = get_model_spec(DETECTION_MODEL, MODEL_REGISTRY_FILE)
+        ensure_model_files(spec, MODELS_DIR)
+        model_spec = spec
+    except Exception as e:
+        logger.error(f"Error preparing detection model {DETECTION_MODEL}: {e}")
+    finally:
+        startup_timings["model_files_seconds"] = time.perf_counter() - start
+
+# Runs once on each inference worker
+def load_detector():
+    if model_spec is None:
+        raise RuntimeError(f"Detection model {DETECTION_MODEL} is not available")
+    detector = load_model(model_spec, MODELS_DIR, DETECTION_INPUT_SIZE, DNN_BACKEND, DNN_TARGET)
+    logger.info(
+        f"Detection model {model_spec.name} loaded successfully "
+        f"({DETECTION_INPUT_SIZE}x{DETECTION_INPUT_SIZE}, backend={DNN_BACKEND}, target={DNN_TARGET})"
+    )
+    return detector
+
+# One inference on a synthetic frame so OpenCV initialises its backend before real traffic
+def warm_up_detector(detector):
+    detector.detect([np.zeros((480, 640, 3), dtype=np.uint8)])
+
+color_classifier = ColorClassifier(load_palette(COLOR_PALETTE_FILE), COLOR_MIN_FRACTION)
+
+TRACKER_OPTIONS = {
+    "iou_threshold": TRACK_IOU_THRESHOLD,
+    "max_distance": TRACK_MAX_DISTANCE,
+    "track_timeout": TRACK_TIMEOUT
+}
+
+def new_camera_state():
+    motion_gate = MotionGate(
+        threshold=MOTION_THRESHOLD,
+        pixel_threshold=MOTION_PIXEL_THRESHOLD,
+        max_skipped_frames=MOTION_MAX_SKIPPED_FRAMES
+    ) if MOTION_GATING else None
+    return CameraState(PersonTracker(**TRACKER_OPTIONS), motion_gate)
+
+camera_states = CameraStates(new_camera_state)
+
+# Motion gate counters across all cameras, updated on the event loop. Kept here rather than
+# summed from the gates, because idle cameras are dropped along with their gate.
+motion_stats = {"frames": 0, "skipped": 0}
+
+inference_pool = InferencePool(
+    load_detector,
+    workers=INFERENCE_WORKERS,
+    queue_size=INFERENCE_QUEUE_SIZE,
+    warm_up=warm_up_detector
+)
 
-# Person detection function
-def detect_persons(frame):
-    if net is None or output_layers is None:
+async def prepare_inference():
+    await asyncio.get_running_loop().run_in_executor(None, prepare_model_files)
+    inference_pool.start()
+
+# Batched person detection: one blob and one forward pass for all frames
+def detect_persons_batch(detector, frames, confidence_threshold=None, nms_threshold=None):
+    if detector is None:
         logger.error("YOLO model not initialized")
-        return []
-
-    height, width, _ = frame.shape
-    blob = cv2.dnn.blobFromImage(frame, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-    net.setInput(blob)
-    outputs = net.forward(output_layers)
-
-    boxes = []
-    confidences = []
-    class_ids = []
-    detections = []
-
-    for output in outputs:
-        for detection in output:
-            scores = detection[5:]
-            class_id = np.argmax(scores)
-            confidence = scores[class_id]
-
-            if confidence > 0.5 and class_id == 0:  # Class ID 0 is for 'person'
-                center_x = int(detection[0] * width)
-                center_y = int(detection[1] * height)
-                w = int(detection[2] * width)
-                h = int(detection[3] * height)
-
-                x = int(center_x - w / 2)
-                y = int(center_y - h / 2)
-                boxes.append([x, y, w, h])
-                confidences.append(float(confidence))
-                class_ids.append(class_id)
-
-    indices = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
-
-    if len(indices) > 0:
-        for i in indices.flatten():
-            box = boxes[i]
-            x, y, w, h = box
-            person_roi = frame[y:y+h, x:x+w]
-            color = detect_color(person_roi)
-            detections.append({
-                "box": [x, y, w, h],
-                "color": color,
-                "confidence": confidences[i]
-            })
+        return [[] for _ in frames]
+
+    results = detector.detect(
+        frames,
+        confidence_threshold=CONFIDENCE_THRESHOLD if confidence_threshold is None else confidence_threshold,
+        nms_threshold=NMS_THRESHOLD if nms_threshold is None else nms_threshold
+    )
+    return [
+        build_detections(color_classifier, frame, boxes, confidences)
+        for frame, (boxes, confidences) in zip(frames, results)
+    ]
 
-    return detections
+# Person detection function
+def detect_persons(detector, frame, confidence_threshold=None, nms_threshold=None):
+    return detect_persons_batch(detector, [frame], confidence_threshold, nms_threshold)[0]
 
 # Eureka client initialization
 eureka_client_instance = None
+model_preparation = None
 
 @app.on_event("startup")
 async def startup_event():
-    global eureka_client_instance
+    global eureka_client_instance, model_preparation
+    startup_timings["imports_seconds"] = time.monotonic() - SERVICE_STARTED_AT
+    # Model download, load and warm-up happen in the background; /ready reports when they are done
+    model_preparation = asyncio.create_task(prepare_inference())
     try:
         eureka_client_instance = await eureka_client.init_async(
             eureka_server=EUREKA_SERVER,
@@ -182,46 +222,394 @@ async def shutdown_event():
             logger.info("Successfully deregistered from Eureka server")
     except Exception as e:
         logger.error(f"Error deregistering from Eureka: {e}")
+    inference_pool.shutdown()
 
 class ImageData(BaseModel):
     image: str  # Base64 encoded image
     metadata: Optional[dict] = None
+    camera_id: Optional[str] = None  # Enables stable track IDs across frames
+    confidence_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    nms_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+
+class BatchImageData(BaseModel):
+    images: List[str]  # Base64 encoded images, one per camera frame
+    metadata: Optional[dict] = None
+    camera_ids: Optional[List[Optional[str]]] = None  # One per image
+    confidence_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    nms_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+
+# Upper bound on frames per forward pass to keep blob memory predictable
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "16"))
+
+class InvalidImageError(ValueError):
+    def __init__(self, index=None):
+        self.index = index
+        super().__init__("Invalid image data" if index is None else f"Invalid image data at index {index}")
+
+# Content types accepted as a raw image body
+RAW_IMAGE_CONTENT_TYPES = {"image/jpeg", "image/png", "application/octet-stream"}
+
+def decode_buffer(buffer):
+    if not buffer:
+        return None
+    # np.frombuffer wraps the request bytes in place, imdecode reads them directly
+    return cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+
+def decode_image(image):
+    return decode_buffer(base64.b64decode(image))
+
+# Runs on an inference worker: decoding is CPU work too, so it stays off the event loop.
+# Frames whose camera's motion gate sees no change are not inferred and come back as None.
+def analyze_images(detector, images, decode, confidence_threshold=None, nms_threshold=None,
+                   batched=False, motion_gates=None):
+    frames = []
+    for index, image in enumerate(images):
+        try:
+            frame = decode(image)
+        except ValueError:
+            frame = None
+        if frame is None:
+            raise InvalidImageError(index if batched else None)
+        frames.append(frame)
+
+    motion_gates = motion_gates or [None] * len(frames)
+    active = [i for i, (frame, gate) in enumerate(zip(frames, motion_gates))
+              if gate is None or gate.should_infer(frame)]
+
+    results = [None] * len(frames)
+    if active:
+        detections = detect_persons_batch(
+            detector, [frames[i] for i in active], confidence_threshold, nms_threshold
+        )
+        for i, frame_detections in zip(active, detections):
+            results[i] = frame_detections
+    return results
+
+def camera_state_for(camera_id):
+    return None if camera_id is None else camera_states.get(camera_id)
+
+def motion_gates_for(states):
+    return [None if state is None else state.motion_gate for state in states]
+
+def track_detections(tracker, detections):
+    if tracker is None:
+        track_ids = [(None, False)] * len(detections)
+    else:
+        track_ids = tracker.update([detection["box"] for detection in detections])
+    for detection, (track_id, is_new) in zip(detections, track_ids):
+        detection["track_id"] = track_id
+        detection["new_track"] = is_new
+    return detections
+
+# Runs on the event loop after inference, so camera state is only touched from one thread.
+# Returns (detections, skipped); a skipped frame reuses the camera's previous detections.
+def finish_detections(state, detections):
+    if state is None:
+        return track_detections(None, detections), False
+
+    if state.motion_gate is not None:
+        motion_stats["frames"] += 1
+    skipped = detections is None
+    if skipped:
+        motion_stats["skipped"] += 1
+        # Re-feed the previous boxes so tracks of people standing still do not expire
+        detections = [dict(detection) for detection in state.last_detections]
+
+    track_detections(state.tracker, detections)
+    state.last_detections = detections
+    return detections, skipped
+
+def check_camera_ids(camera_ids, count):
+    if camera_ids is not None and len(camera_ids) != count:
+        raise HTTPException(status_code=400, detail=f"Expected {count} camera ids, got {len(camera_ids)}")
+    return camera_ids or [None] * count
+
+async def detect_frames(states, images, decode, confidence_threshold, nms_threshold, batched):
+    """Gate, infer and track frames of the given camera states; returns (detections, skipped) per frame."""
+    # Cameras stay locked until finish_detections, so two frames of one camera in flight
+    # cannot have the second skipped and served the detections from before the first
+    async with hold_cameras(states):
+        batch_detections = await run_inference(
+            analyze_images, images, decode, confidence_threshold, nms_threshold,
+            batched, motion_gates_for(states)
+        )
+        return [finish_detections(state, detections) for state, detections in zip(states, batch_detections)]
+
+async def run_inference(fn, *args):
+    if not inference_pool.accepting:
+        raise HTTPException(status_code=503, detail="Detection model is still loading",
+                            headers={"Retry-After": "5"})
+    try:
+        return await inference_pool.run(fn, *args)
+    except QueueFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail="Detection service is busy, retry later",
+                            headers={"Retry-After": "1"})
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.post("/api/detection/analyze")
 async def analyze_image(data: ImageData):
     try:
-        # Decode base64 image
-        image_bytes = base64.b64decode(data.image)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        state = camera_state_for(data.camera_id)
+        # Decode and detect on an inference worker
+        detections, skipped = (await detect_frames(
+            [state], [data.image], decode_image, data.confidence_threshold, data.nms_threshold, False
+        ))[0]
 
-        if frame is None:
-            raise HTTPException(status_code=400, detail="Invalid image data")
+        return {
+            "status": "success",
+            "data": {
+                "detections": detections,
+                "total_persons": len(detections),
+                "inference_skipped": skipped
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing image: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Perform detection
-        detections = detect_persons(frame)
+@app.post("/api/detection/analyze/batch")
+async def analyze_batch(data: BatchImageData):
+    if not data.images:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(data.images) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(data.images)} images (max {MAX_BATCH_SIZE})"
+        )
+
+    states = [camera_state_for(camera_id) for camera_id in check_camera_ids(data.camera_ids, len(data.images))]
+
+    try:
+        # Perform detection on all frames in a single forward pass
+        batch_detections = await detect_frames(
+            states, data.images, decode_image, data.confidence_threshold, data.nms_threshold, True
+        )
+
+        return {
+            "status": "success",
+            "data": {
+                "results": [
+                    {
+                        "detections": detections,
+                        "total_persons": len(detections),
+                        "inference_skipped": skipped
+                    }
+                    for detections, skipped in batch_detections
+                ],
+                "total_images": len(batch_detections)
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing image batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/detection/analyze/raw")
+async def analyze_raw_image(
+    request: Request,
+    confidence_threshold: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    nms_threshold: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    camera_id: Optional[str] = None
+):
+    """
+    Analyze an encoded image sent as the raw request body
+    (image/jpeg, image/png or application/octet-stream), without base64 or JSON.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in RAW_IMAGE_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type or 'none'}")
+
+    try:
+        body = await request.body()
+        state = camera_state_for(camera_id)
+        detections, skipped = (await detect_frames(
+            [state], [body], decode_buffer, confidence_threshold, nms_threshold, False
+        ))[0]
 
         return {
             "status": "success",
             "data": {
                 "detections": detections,
-                "total_persons": len(detections)
+                "total_persons": len(detections),
+                "inference_skipped": skipped
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing image: {e}")
+        logger.error(f"Error processing raw image: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/detection/analyze/upload")
+async def analyze_uploaded_images(
+    files: List[UploadFile] = File(...),
+    confidence_threshold: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    nms_threshold: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    camera_ids: Optional[List[str]] = Query(default=None)
+):
+    """
+    Analyze one or more images sent as multipart/form-data files.
+    All files go through a single forward pass, as with the batch endpoint.
+    """
+    if len(files) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(files)} images (max {MAX_BATCH_SIZE})"
+        )
+    states = [camera_state_for(camera_id) for camera_id in check_camera_ids(camera_ids, len(files))]
+
+    try:
+        buffers = [await file.read() for file in files]
+        batch_detections = await detect_frames(
+            states, buffers, decode_buffer, confidence_threshold, nms_threshold, True
+        )
+
+        return {
+            "status": "success",
+            "data": {
+                "results": [
+                    {
+                        "filename": file.filename,
+                        "detections": detections,
+                        "total_persons": len(detections),
+                        "inference_skipped": skipped
+                    }
+                    for file, (detections, skipped) in zip(files, batch_detections)
+                ],
+                "total_images": len(batch_detections)
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing uploaded images: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Number of open streaming sessions, reported with the pool stats
+active_stream_sessions = 0
+
+async def process_stream(websocket, slot, state, confidence_threshold, nms_threshold):
+    try:
+        while True:
+            frame_id, image, decode = await slot.get()
+            try:
+                detections, skipped = (await detect_frames(
+                    [state], [image], decode, confidence_threshold, nms_threshold, False
+                ))[0]
+                message = {
+                    "status": "success",
+                    "frame_id": frame_id,
+                    "data": {
+                        "detections": detections,
+                        "total_persons": len(detections),
+                        "inference_skipped": skipped
+                    },
+                    "dropped_frames": slot.dropped
+                }
+            except HTTPException as e:
+                message = {"status": "error", "frame_id": frame_id, "detail": e.detail}
+            except Exception as e:
+                logger.error(f"Error processing streamed frame: {e}")
+                message = {"status": "error", "frame_id": frame_id, "detail": str(e)}
+            await websocket.send_json(message)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+
+@app.websocket("/ws/detection")
+async def detection_stream(
+    websocket: WebSocket,
+    confidence_threshold: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    nms_threshold: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    camera_id: Optional[str] = None
+):
+    """
+    Streaming detection session over a single connection.
+
+    Clients push frames as binary messages (encoded JPEG/PNG bytes) or as
+    text messages {"image": <base64>, "frame_id": ...}. Only the newest
+    pending frame is analyzed, older ones are dropped, and each result is
+    pushed back as soon as it is ready. Tracking and motion gating state is
+    kept per camera_id, or per session when no camera_id is given.
+    """
+    global active_stream_sessions
+    await websocket.accept()
+    active_stream_sessions += 1
+    slot = LatestFrameSlot()
+    state = new_camera_state() if camera_id is None else camera_states.get(camera_id)
+    processor = asyncio.create_task(process_stream(websocket, slot, state, confidence_threshold, nms_threshold))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                slot.put((slot.received + 1, message["bytes"], decode_buffer))
+            elif message.get("text") is not None:
+                try:
+                    payload = json.loads(message["text"])
+                    image = payload["image"]
+                except (ValueError, KeyError, TypeError):
+                    await websocket.send_json({"status": "error", "detail": 'Expected {"image": <base64>}'})
+                    continue
+                slot.put((payload.get("frame_id", slot.received + 1), image, decode_image))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        processor.cancel()
+        active_stream_sessions -= 1
+
+@app.get("/api/detection/stats")
+async def detection_stats():
+    return {
+        **inference_pool.stats(),
+        "stream_sessions": active_stream_sessions,
+        "tracked_cameras": len(camera_states),
+        "motion_gate": {
+            "enabled": MOTION_GATING,
+            **motion_stats,
+            "skip_rate": round(motion_stats["skipped"] / motion_stats["frames"], 4) if motion_stats["frames"] else 0.0
+        }
+    }
+
 @app.get("/health")
 async def health_check():
     return {"status": "UP"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: UP once every inference worker has loaded and warmed up
+    its model. /health stays a pure liveness check.
+    """
+    ready = inference_pool.ready and inference_pool.models_loaded > 0
+    content = {
+        "status": "UP" if ready else "DOWN",
+        "model": DETECTION_MODEL,
+        "workers_loaded": inference_pool.models_loaded,
+        "startup": {
+            **startup_timings,
+            "ready_seconds": inference_pool.ready_at - SERVICE_STARTED_AT if inference_pool.ready else None
+        }
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
 @app.get("/info")
 async def info():
     return {
         "app_name": APP_NAME,
         "version": "1.0.0",
-        "status": "Running"
+        "status": "Running",
+        "model": {
+            "name": DETECTION_MODEL,
+            "input_size": DETECTION_INPUT_SIZE,
+            "backend": DNN_BACKEND,
+            "target": DNN_TARGET
+        }
     }
 
 @app.get("/")
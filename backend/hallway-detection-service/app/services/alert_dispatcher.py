@@ -0,0 +1,222 @@
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOTIFICATION_URL = "http://localhost:8000/api/v1/notifications"
+DEFAULT_COALESCE_WINDOW = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 10.0
+DEFAULT_TIMEOUT = 5.0
+
+# Statuses worth retrying; other 4xx responses mean the alert itself is wrong
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _Window:
+    def __init__(self, closes_at):
+        self.closes_at = closes_at
+        self.suppressed = 0
+        self.track_ids = []
+
+
+class AlertDispatcher:
+    """
+    Sends detection alerts to the notification-service from a background thread.
+
+    submit() never blocks: alerts go into a bounded queue and are dropped
+    (and counted) when it is full. The first alert for a (colour, zone) is
+    sent right away and opens a coalescing window; duplicates arriving
+    within the window are folded into one summary alert sent when it
+    closes. Requests share one pooled HTTP session and are retried with
+    exponential backoff on connection errors, timeouts and 429/5xx. Retries
+    wait in a heap rather than sleeping on the dispatcher thread, so other
+    alerts keep flowing while the notification service is struggling.
+    """
+
+    def __init__(self, url=DEFAULT_NOTIFICATION_URL, recipient_email=None, priority="normal",
+                 coalesce_window=DEFAULT_COALESCE_WINDOW, queue_size=100,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT,
+                 session=None):
+        self.url = url
+        self.recipient_email = recipient_email
+        self.priority = priority
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session = session
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._windows = {}
+        # (due, tiebreak, attempt, payload, description) of alerts waiting to be retried
+        self._retry_heap = []
+        self._retry_order = itertools.count()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.submitted = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Send pending summaries and retries, then stop; alerts still pending after `timeout` are lost."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self.session.close()
+
+    def submit(self, color, zone, track_id=None, timestamp=None):
+        """Queue an alert for a person wearing `color` seen in `zone`; False when it was dropped."""
+        try:
+            self._queue.put_nowait((color, zone, track_id, timestamp or time.time()))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Alert queue full, dropping alert for {color} in {zone}")
+            return False
+        self.submitted += 1
+        return True
+
+    def _next_deadline(self):
+        deadline = min((window.closes_at for window in self._windows.values()), default=None)
+        if self._retry_heap and (deadline is None or self._retry_heap[0][0] < deadline):
+            deadline = self._retry_heap[0][0]
+        return deadline
+
+    def _run(self):
+        while True:
+            deadline = self._next_deadline()
+            wait = 0.5 if deadline is None else min(0.5, max(0.0, deadline - time.monotonic()))
+            try:
+                self._handle(*self._queue.get(timeout=wait))
+            except queue.Empty:
+                # Everything queued before stop() has been handled; finish pending retries
+                if self._stopping.is_set():
+                    self._close_windows(force=True)
+                    self._retry_due()
+                    if not self._retry_heap:
+                        return
+                    continue
+            self._close_windows()
+            self._retry_due()
+
+    def _handle(self, color, zone, track_id, timestamp):
+        key = (color, zone)
+        window = self._windows.get(key)
+        if window is not None:
+            window.suppressed += 1
+            if track_id is not None:
+                window.track_ids.append(track_id)
+            self.coalesced += 1
+            return
+
+        if self.coalesce_window > 0:
+            self._windows[key] = _Window(time.monotonic() + self.coalesce_window)
+        self._send(color, zone, 1, [] if track_id is None else [track_id], timestamp)
+
+    def _close_windows(self, force=False):
+        now = time.monotonic()
+        for key, window in list(self._windows.items()):
+            if not force and window.closes_at > now:
+                continue
+            if window.suppressed:
+                # Report the duplicates and keep coalescing for another window
+                self._send(*key, window.suppressed, window.track_ids, time.time(), summary=True)
+                if not force:
+                    self._windows[key] = _Window(now + self.coalesce_window)
+                    continue
+            del self._windows[key]
+
+    def _payload(self, color, zone, count, track_ids, timestamp, summary):
+        color_name = color.replace("Wearing ", "")
+        if summary:
+            message = (f"Detected {count} more {'person' if count == 1 else 'people'} wearing {color_name} "
+                       f"in {zone} in the last {self.coalesce_window:.0f}s.")
+        else:
+            message = f"Detected a person wearing {color_name} in {zone}."
+        return {
+            "recipient_email": self.recipient_email,
+            "message": message,
+            "notification_type": "email",
+            "priority": self.priority,
+            "metadata": {
+                "department": zone,
+                "source": "hallway-detection",
+                "color": color_name,
+                "count": count,
+                "track_ids": track_ids,
+                "detected_at": datetime.fromtimestamp(timestamp).isoformat()
+            }
+        }
+
+    def _send(self, color, zone, count, track_ids, timestamp, summary=False):
+        payload = self._payload(color, zone, count, track_ids, timestamp, summary)
+        self._attempt(payload, f"{color} in {zone}", 0)
+
+    def _retry_due(self):
+        now = time.monotonic()
+        while self._retry_heap and self._retry_heap[0][0] <= now:
+            _, _, attempt, payload, description = heapq.heappop(self._retry_heap)
+            self._attempt(payload, description, attempt)
+
+    def _attempt(self, payload, description, attempt):
+        """POST the alert once; a retryable failure schedules the next attempt instead of waiting for it."""
+        retry_after = None
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            if response.status_code < 400:
+                self.sent += 1
+                return
+            if response.status_code not in RETRY_STATUSES:
+                logger.error(f"Alert rejected by notification service: {response.status_code} {response.text}")
+                self.failed += 1
+                return
+            retry_after = response.headers.get("Retry-After")
+            error = f"HTTP {response.status_code}"
+        except requests.RequestException as e:
+            error = str(e)
+
+        if attempt == self.max_retries:
+            logger.error(f"Giving up on alert for {description} after {attempt + 1} attempts: {error}")
+            self.failed += 1
+            return
+        self.retries += 1
+        delay = min(self.backoff * 2 ** attempt, MAX_BACKOFF) * (0.5 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = min(max(delay, float(retry_after)), MAX_BACKOFF)
+        heapq.heappush(self._retry_heap,
+                       (time.monotonic() + delay, next(self._retry_order), attempt + 1, payload, description))
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "retrying": len(self._retry_heap),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
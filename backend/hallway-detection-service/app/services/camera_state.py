@@ -0,0 +1,50 @@
+import asyncio
+import contextlib
+import time
+
+
+class CameraState:
+    """Per-camera state kept between frames: tracker, motion gate and the last detections."""
+
+    def __init__(self, tracker=None, motion_gate=None):
+        self.tracker = tracker
+        self.motion_gate = motion_gate
+        self.last_detections = []
+        # Held from the motion gate decision until last_detections is updated, so a frame
+        # the gate skips reuses the detections of the frame it was compared with
+        self.lock = asyncio.Lock()
+
+
+@contextlib.asynccontextmanager
+async def hold_cameras(states):
+    """Lock each distinct CameraState (None entries ignored), in a fixed order so batches cannot deadlock."""
+    unique = sorted({id(state): state for state in states if state is not None}.values(), key=id)
+    async with contextlib.AsyncExitStack() as stack:
+        for state in unique:
+            await stack.enter_async_context(state.lock)
+        yield
+
+
+class CameraStates:
+    """CameraState per camera id, created on first use; cameras that stop sending frames are dropped."""
+
+    def __init__(self, factory, idle_timeout=300.0):
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self._states = {}
+        self._last_used = {}
+
+    def get(self, camera_id, timestamp=None):
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        for idle in [c for c, last in self._last_used.items() if timestamp - last > self.idle_timeout]:
+            del self._states[idle]
+            del self._last_used[idle]
+
+        state = self._states.get(camera_id)
+        if state is None:
+            state = self._states[camera_id] = self.factory()
+        self._last_used[camera_id] = timestamp
+        return state
+
+    def __len__(self):
+        return len(self._states)
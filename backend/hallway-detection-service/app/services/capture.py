@@ -0,0 +1,207 @@
+import collections
+import json
+import logging
+import threading
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+
+# Put in a camera's buffer once its reader has stopped
+END_OF_STREAM = (None, None, None)
+
+
+class CameraSource:
+    """
+    One video source from the camera config.
+
+    `source` is a webcam index (0, "1"), a stream URL (rtsp://, http://) or
+    a video file path. Video files are paced to their frame rate unless
+    `realtime` is false, in which case every frame is handed to the
+    scheduler (the reader waits for room instead of dropping), which makes
+    offline runs over recordings reproducible.
+    """
+
+    def __init__(self, name, source, zone=None, loop=False, realtime=True, fps=None, buffer_size=1):
+        self.name = name
+        # Hallway or ward the camera watches, used to group alerts
+        self.zone = zone or name
+        self.source = int(source) if str(source).isdigit() else source
+        if isinstance(self.source, int):
+            self.kind = "webcam"
+        elif "://" in self.source:
+            self.kind = "stream"
+        else:
+            self.kind = "file"
+        self.loop = loop
+        self.realtime = realtime
+        self.fps = fps
+        self.buffer_size = buffer_size
+
+    @property
+    def drops_frames(self):
+        return self.kind != "file" or self.realtime
+
+
+def load_sources(config_file=None, sources=None):
+    """
+    Camera sources from a JSON config ({"cameras": [{"name": ..., "source": ...}, ...]})
+    and/or plain source strings; unnamed sources are called camera-<n>.
+    """
+    cameras = []
+    if config_file:
+        with open(config_file) as f:
+            config = json.load(f)
+        for fields in config.get("cameras", []) if isinstance(config, dict) else config:
+            cameras.append(CameraSource(**fields))
+    for source in sources or []:
+        cameras.append(CameraSource(f"camera-{len(cameras)}", source))
+
+    names = [camera.name for camera in cameras]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate camera names in config: {', '.join(duplicates)}")
+    return cameras
+
+
+class FrameBuffer:
+    """
+    Bounded, thread-safe buffer between a reader thread and the scheduler.
+
+    put() drops the oldest frame when the buffer is full (or, with
+    block=True, waits for room). `on_put` is called after every put so the
+    scheduler can wake up without polling each camera.
+    """
+
+    def __init__(self, capacity=1, on_put=None):
+        self._frames = collections.deque()
+        self._capacity = capacity
+        self._condition = threading.Condition()
+        self._on_put = on_put
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item, block=False, timeout=None):
+        with self._condition:
+            if block:
+                if not self._condition.wait_for(lambda: len(self._frames) < self._capacity, timeout):
+                    return False
+            elif len(self._frames) >= self._capacity:
+                self._frames.popleft()
+                self.dropped += 1
+            self._frames.append(item)
+            self.received += 1
+        if self._on_put is not None:
+            self._on_put()
+        return True
+
+    def take(self):
+        """Oldest pending item, or None."""
+        with self._condition:
+            if not self._frames:
+                return None
+            item = self._frames.popleft()
+            self._condition.notify()
+            return item
+
+    def __len__(self):
+        return len(self._frames)
+
+
+class CaptureThread(threading.Thread):
+    """
+    Reads one CameraSource into its FrameBuffer as (frame_id, timestamp, frame).
+
+    Webcams and streams are reopened with exponential backoff when they
+    fail; a video file ends the thread when it runs out (or rewinds when
+    `loop` is set).
+    """
+
+    def __init__(self, camera, buffer, stop_event):
+        super().__init__(name=f"capture-{camera.name}", daemon=True)
+        self.camera = camera
+        self.buffer = buffer
+        self.stop_event = stop_event
+        self.frames_read = 0
+        self.reconnects = 0
+        self.finished = False
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.camera.source)
+        if not capture.isOpened():
+            capture.release()
+            return None
+        return capture
+
+    def run(self):
+        delay = DEFAULT_RECONNECT_DELAY
+        try:
+            while not self.stop_event.is_set():
+                capture = self._open()
+                if capture is None:
+                    if self.camera.kind == "file":
+                        logger.error(f"Camera {self.camera.name}: cannot open {self.camera.source}")
+                        return
+                    logger.warning(f"Camera {self.camera.name}: cannot open source, retrying in {delay:.0f}s")
+                    self.stop_event.wait(delay)
+                    delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                    self.reconnects += 1
+                    continue
+
+                delay = DEFAULT_RECONNECT_DELAY
+                try:
+                    if not self._read(capture) and self.camera.kind == "file":
+                        return
+                finally:
+                    capture.release()
+                if self.camera.kind != "file":
+                    self.reconnects += 1
+                    logger.warning(f"Camera {self.camera.name}: stream lost, reconnecting")
+        finally:
+            self.finished = True
+            self.buffer.put(END_OF_STREAM, block=not self.camera.drops_frames, timeout=1.0)
+
+    def _read(self, capture):
+        """Read until the source ends or stop is requested; True when a looping file should be reopened."""
+        fps = self.camera.fps or capture.get(cv2.CAP_PROP_FPS) or 25.0
+        pace = self.camera.kind == "file" and self.camera.realtime
+        started = time.monotonic()
+        position = 0
+
+        while not self.stop_event.is_set():
+            ok, frame = capture.read()
+            if not ok or frame is None or frame.size == 0:
+                return self.camera.kind == "file" and self.camera.loop
+
+            if self.camera.kind == "file":
+                # Files are timed by their own frame rate, so tracking behaves the same at any replay speed
+                timestamp = started + position / fps
+                if pace:
+                    self.stop_event.wait(max(0.0, timestamp - time.monotonic()))
+            else:
+                timestamp = time.monotonic()
+            position += 1
+
+            item = (self.frames_read, timestamp, frame)
+            self.frames_read += 1
+            if self.camera.drops_frames:
+                self.buffer.put(item)
+            else:
+                while not self.buffer.put(item, block=True, timeout=0.5):
+                    if self.stop_event.is_set():
+                        return False
+        return False
+
+    def stats(self):
+        return {
+            "source": str(self.camera.source),
+            "kind": self.camera.kind,
+            "frames_read": self.frames_read,
+            "frames_dropped": self.buffer.dropped,
+            "reconnects": self.reconnects,
+            "finished": self.finished,
+        }
@@ -0,0 +1,103 @@
+import json
+
+import cv2
+import numpy as np
+
+# HSV ranges per colour (OpenCV hue is 0-179). A colour may use several
+# ranges, e.g. red wraps around hue 0.
+DEFAULT_PALETTE = {
+    "Blue": [[[100, 150, 0], [140, 255, 255]]],
+    "Green": [[[40, 100, 0], [80, 255, 255]]],
+    "Red": [[[0, 120, 70], [10, 255, 255]], [[170, 120, 70], [179, 255, 255]]],
+    "Yellow": [[[20, 100, 100], [35, 255, 255]]],
+    "Purple": [[[141, 80, 50], [169, 255, 255]]],
+}
+
+# Fraction of a box that must match a colour before it is used as the label
+DEFAULT_MIN_FRACTION = 0.15
+
+
+def load_palette(palette_file=None):
+    """Palette from a JSON file with the same shape as DEFAULT_PALETTE, or the default one."""
+    if not palette_file:
+        return DEFAULT_PALETTE
+    with open(palette_file) as f:
+        return json.load(f)
+
+
+class ColorClassifier:
+    """
+    Labels person boxes with the dominant palette colour.
+
+    The frame is converted to HSV and thresholded once per colour; each mask
+    is turned into a summed-area table, so the matching-pixel fraction of
+    any box costs four lookups regardless of its size or the number of
+    boxes in the frame.
+    """
+
+    def __init__(self, palette=None, min_fraction=DEFAULT_MIN_FRACTION):
+        palette = DEFAULT_PALETTE if palette is None else palette
+        self.colors = list(palette)
+        self.ranges = [
+            [(np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8)) for lower, upper in palette[color]]
+            for color in self.colors
+        ]
+        self.min_fraction = min_fraction
+
+    def integrals(self, frame):
+        """One (H + 1, W + 1) summed-area table of the 0/1 mask per colour."""
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        tables = []
+        for ranges in self.ranges:
+            mask = cv2.inRange(hsv, *ranges[0])
+            for lower, upper in ranges[1:]:
+                mask = cv2.bitwise_or(mask, cv2.inRange(hsv, lower, upper))
+            tables.append(cv2.integral(cv2.bitwise_and(mask, 1), sdepth=cv2.CV_32S))
+        return tables
+
+    def fractions(self, frame, boxes):
+        """(boxes, colours) matching-pixel fractions; boxes are [x, y, w, h] and are clipped to the frame."""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        if len(boxes) == 0 or frame is None or frame.size == 0:
+            return np.zeros((len(boxes), len(self.colors)))
+
+        height, width = frame.shape[:2]
+        x1 = np.clip(boxes[:, 0], 0, width)
+        y1 = np.clip(boxes[:, 1], 0, height)
+        x2 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+        y2 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+        area = (x2 - x1) * (y2 - y1)
+        fractions = np.zeros((len(boxes), len(self.colors)))
+        if not area.any():
+            return fractions
+
+        # Only the region covered by the boxes is converted and summed
+        left, top = int(x1.min()), int(y1.min())
+        region = frame[top:int(y2.max()), left:int(x2.max())]
+        x1, x2, y1, y2 = x1 - left, x2 - left, y1 - top, y2 - top
+
+        for i, table in enumerate(self.integrals(region)):
+            counts = table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+            fractions[:, i] = counts / np.maximum(area, 1)
+        return fractions
+
+    def classify(self, frame, boxes):
+        """Return (label, fraction) for each box, labels as 'Wearing <Colour>', 'Unknown' or 'No Frame'."""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        if len(boxes) == 0:
+            return []
+
+        fractions = self.fractions(frame, boxes)
+        height, width = (0, 0) if frame is None else frame.shape[:2]
+        results = []
+        for (x, y, w, h), box_fractions in zip(boxes.tolist(), fractions):
+            if min(x + w, width) <= max(x, 0) or min(y + h, height) <= max(y, 0):
+                results.append(("No Frame", 0.0))
+                continue
+            best = int(np.argmax(box_fractions))
+            fraction = float(box_fractions[best])
+            if fraction >= self.min_fraction:
+                results.append((f"Wearing {self.colors[best]}", fraction))
+            else:
+                results.append(("Unknown", fraction))
+        return results
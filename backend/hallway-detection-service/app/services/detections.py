@@ -0,0 +1,14 @@
+# Attach a colour label to every detected person box; shared by the HTTP service and the capture pipeline
+
+def build_detections(color_classifier, frame, boxes, confidences):
+    """Detection dicts (box, color, color_fraction, confidence) for one frame's detector output."""
+    colors = color_classifier.classify(frame, boxes)
+    return [
+        {
+            "box": box,
+            "color": color,
+            "color_fraction": round(fraction, 4),
+            "confidence": confidence
+        }
+        for box, confidence, (color, fraction) in zip(boxes.tolist(), confidences.tolist(), colors)
+    ]
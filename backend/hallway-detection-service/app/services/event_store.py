@@ -0,0 +1,275 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# One detection event, 32 bytes. Labels (camera, zone, colour) are stored as
+# ids into labels.json; confidence and colour fraction are scaled to uint16.
+EVENT_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("camera", "<u2"),
+    ("zone", "<u2"),
+    ("color", "u1"),
+    ("flags", "u1"),
+    ("confidence", "<u2"),
+    ("track_id", "<u4"),
+    ("box", "<i2", (4,)),
+    ("color_fraction", "<u2"),
+    ("reserved", "<u2"),
+])
+RECORD_SIZE = EVENT_DTYPE.itemsize
+
+FLAG_NEW_TRACK = 1
+
+# Records per sparse index entry; each entry holds the block's min and max timestamp
+INDEX_INTERVAL = 1024
+
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_SEGMENT_SECONDS = 3600.0
+
+LABEL_KINDS = ("camera", "zone", "color")
+SEGMENT_PATTERN = "events-*.bin"
+# Segment names hold timestamps truncated to milliseconds
+SEGMENT_NAME_RESOLUTION = 0.001
+
+
+def _segment_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def _segment_start(path):
+    """Timestamp of a segment's first record, from its name (events-<ms>[-<n>].bin)."""
+    return int(os.path.basename(path)[len("events-"):-len(".bin")].split("-")[0]) / 1000
+
+
+def _index_path(segment_path):
+    return segment_path[:-len(".bin")] + ".idx"
+
+
+def _load_labels(directory):
+    path = os.path.join(directory, "labels.json")
+    if not os.path.exists(path):
+        return {kind: [] for kind in LABEL_KINDS}
+    with open(path) as f:
+        labels = json.load(f)
+    return {kind: labels.get(kind, []) for kind in LABEL_KINDS}
+
+
+class EventStore:
+    """
+    Append-only store for detection events.
+
+    Events are fixed-width records appended to segment files that rotate
+    once they reach `max_segment_bytes` or `max_segment_seconds`. Next to
+    each segment, a sparse .idx file keeps the min and max timestamp of
+    every INDEX_INTERVAL records, so a time-range query only maps the
+    blocks it needs. Only the newest `max_segments` segments are kept when
+    it is set.
+    """
+
+    def __init__(self, directory, max_segment_bytes=DEFAULT_MAX_SEGMENT_BYTES,
+                 max_segment_seconds=DEFAULT_MAX_SEGMENT_SECONDS, max_segments=None):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+
+        self._labels = _load_labels(directory)
+        self._label_ids = {kind: {name: i for i, name in enumerate(names)} for kind, names in self._labels.items()}
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_path = None
+        self._segment_opened_at = None
+        self._records = 0
+        self._block = []
+        self.appended = 0
+
+    def _label_id(self, kind, name):
+        ids = self._label_ids[kind]
+        if name not in ids:
+            ids[name] = len(self._labels[kind])
+            self._labels[kind].append(name)
+            # Written atomically so readers never see a partial file
+            path = os.path.join(self.directory, "labels.json")
+            with open(path + ".tmp", "w") as f:
+                json.dump(self._labels, f)
+            os.replace(path + ".tmp", path)
+        return ids[name]
+
+    def _open_segment(self, timestamp):
+        # The name starts with the first record's timestamp, which readers use to skip segments.
+        # A rotation within one append shares that timestamp, so a counter keeps names unique:
+        # an existing segment is never reopened, its index entries would no longer line up
+        prefix = os.path.join(self.directory, f"events-{int(timestamp * 1000):015d}")
+        counter = 0
+        while os.path.exists(f"{prefix}-{counter:03d}.bin"):
+            counter += 1
+        self._segment_path = f"{prefix}-{counter:03d}.bin"
+        self._file = open(self._segment_path, "ab")
+        self._segment_opened_at = time.monotonic()
+        self._records = 0
+        self._block = []
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._write_index_entry()
+        self._file.close()
+        self._file = None
+        if self.max_segments:
+            for path in _segment_paths(self.directory)[:-self.max_segments]:
+                os.remove(path)
+                if os.path.exists(_index_path(path)):
+                    os.remove(_index_path(path))
+
+    def _write_index_entry(self):
+        if not self._block:
+            return
+        with open(_index_path(self._segment_path), "ab") as f:
+            f.write(np.array([min(self._block), max(self._block)], dtype="<f8").tobytes())
+        self._block = []
+
+    def _rotate_if_needed(self, timestamp):
+        if self._file is not None and (
+                self._records * RECORD_SIZE >= self.max_segment_bytes
+                or time.monotonic() - self._segment_opened_at >= self.max_segment_seconds):
+            self._close_segment()
+        if self._file is None:
+            self._open_segment(timestamp)
+
+    def append(self, camera, zone, detections, timestamp=None):
+        """
+        Append one event per detection dict (box, color, confidence, color_fraction, track_id, new_track).
+        Timestamps must not decrease: readers locate segments by the timestamp in their name.
+        """
+        if not detections:
+            return
+        with self._lock:
+            # Taken under the lock so concurrent appends stay in timestamp order
+            timestamp = time.time() if timestamp is None else timestamp
+            records = np.zeros(len(detections), dtype=EVENT_DTYPE)
+            records["timestamp"] = timestamp
+            records["camera"] = self._label_id("camera", camera)
+            records["zone"] = self._label_id("zone", zone)
+            for record, detection in zip(records, detections):
+                record["color"] = self._label_id("color", detection["color"])
+                record["flags"] = FLAG_NEW_TRACK if detection.get("new_track") else 0
+                record["confidence"] = round(detection.get("confidence", 0.0) * 65535)
+                record["track_id"] = detection.get("track_id") or 0
+                record["box"] = np.clip(detection["box"], -32768, 32767)
+                record["color_fraction"] = round(detection.get("color_fraction", 0.0) * 65535)
+
+            for record in records:
+                self._rotate_if_needed(timestamp)
+                self._file.write(record.tobytes())
+                self._records += 1
+                self._block.append(timestamp)
+                if len(self._block) == INDEX_INTERVAL:
+                    self._file.flush()
+                    self._write_index_entry()
+            self._file.flush()
+            self.appended += len(records)
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+class EventReader:
+    """
+    Time-range queries over an EventStore directory.
+
+    Segments whose time span (from their own name to the next segment's)
+    misses the range are skipped without being opened. The others are
+    memory-mapped, and within a segment the sparse index selects the
+    blocks that can hold matching timestamps. Records written after the
+    last index entry (the segment still being appended) are always scanned.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.labels = _load_labels(directory)
+
+    def _segments_between(self, start, end):
+        """Segments that may hold timestamps in [start, end), judged by file name only."""
+        paths = _segment_paths(self.directory)
+        starts = [_segment_start(path) for path in paths]
+        # A segment's records are no later than the next segment's first record, which may
+        # share their timestamp and lies within one name resolution after the next name
+        return [
+            path for i, path in enumerate(paths)
+            if starts[i] < end and (i + 1 == len(paths) or starts[i + 1] + SEGMENT_NAME_RESOLUTION > start)
+        ]
+
+    def _segment_ranges(self, path, start, end):
+        """(first, last) record ranges of a segment that may hold timestamps in [start, end)."""
+        count = os.path.getsize(path) // RECORD_SIZE
+        blocks = np.zeros((0, 2))
+        if os.path.exists(_index_path(path)):
+            blocks = np.fromfile(_index_path(path), dtype="<f8")
+            blocks = blocks[:len(blocks) // 2 * 2].reshape(-1, 2)
+
+        ranges = []
+        for i in np.flatnonzero((blocks[:, 1] >= start) & (blocks[:, 0] < end)):
+            first = int(i) * INDEX_INTERVAL
+            if ranges and ranges[-1][1] == first:
+                ranges[-1] = (ranges[-1][0], first + INDEX_INTERVAL)
+            else:
+                ranges.append((first, first + INDEX_INTERVAL))
+        indexed = len(blocks) * INDEX_INTERVAL
+        if count > indexed:
+            ranges.append((indexed, count))
+        return [(first, min(last, count)) for first, last in ranges if first < count]
+
+    def query(self, start=None, end=None, cameras=None, zones=None, colors=None, new_tracks_only=False):
+        """Structured array of the events in [start, end) matching the filters, ordered by segment."""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        parts = []
+        for path in self._segments_between(start, end):
+            count = os.path.getsize(path) // RECORD_SIZE
+            if count == 0:
+                continue
+            records = np.memmap(path, dtype=EVENT_DTYPE, mode="r", shape=(count,))
+            for first, last in self._segment_ranges(path, start, end):
+                block = records[first:last]
+                parts.append(np.array(block[(block["timestamp"] >= start) & (block["timestamp"] < end)]))
+
+        events = np.concatenate(parts) if parts else np.zeros(0, dtype=EVENT_DTYPE)
+        mask = np.ones(len(events), dtype=bool)
+        for kind, names in (("camera", cameras), ("zone", zones), ("color", colors)):
+            if names:
+                ids = [i for i, name in enumerate(self.labels[kind]) if name in names]
+                mask &= np.isin(events[kind], ids)
+        if new_tracks_only:
+            mask &= (events["flags"] & FLAG_NEW_TRACK) > 0
+        return events[mask]
+
+    def aggregate(self, events, by=("color",), bucket=None):
+        """
+        Count events grouped by label kinds and, when `bucket` (seconds) is
+        given, by time bucket. Returns a list of (key dict, count) sorted by key.
+        """
+        if len(events) == 0:
+            return []
+        columns = [events[kind].astype(np.int64) for kind in by]
+        if bucket:
+            columns.append((events["timestamp"] // bucket).astype(np.int64))
+        if not columns:
+            return [({}, len(events))]
+        keys, counts = np.unique(np.stack(columns, axis=1), axis=0, return_counts=True)
+
+        results = []
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            group = {kind: self.labels[kind][value] for kind, value in zip(by, key)}
+            if bucket:
+                group["bucket"] = key[-1] * bucket
+            results.append((group, count))
+        return results
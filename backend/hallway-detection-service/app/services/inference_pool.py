@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue cannot take more work."""
+
+
+class _Worker:
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.model = None
+        self.ready = False
+        self.busy = False
+        self.tasks = 0
+        self.busy_seconds = 0.0
+        self.load_seconds = None
+        self.warm_up_seconds = None
+        self.started_at = time.monotonic()
+        self.thread = None
+
+
+class InferencePool:
+    """
+    Fixed pool of inference threads fed by a bounded queue.
+
+    Each worker calls `load_model()` once in its own thread and keeps the
+    result, so nets are never shared; `warm_up(model)`, when given, runs
+    before the worker takes jobs. Jobs are `fn(model, *args)` calls;
+    OpenCV releases the GIL inside cv2.dnn, so the workers run in parallel
+    and the asyncio event loop stays free. When the queue is full, submit()
+    raises QueueFullError immediately instead of letting latency grow.
+    """
+
+    def __init__(self, load_model, workers=1, queue_size=8, warm_up=None):
+        self._load_model = load_model
+        self._warm_up = warm_up
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = [_Worker(worker_id) for worker_id in range(workers)]
+        self._rejected = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+        self.started_at = None
+        self.ready_at = None
+
+    @property
+    def started(self):
+        return self.started_at is not None
+
+    @property
+    def accepting(self):
+        """True once at least one worker can take jobs."""
+        return any(worker.ready for worker in self._workers)
+
+    @property
+    def ready(self):
+        """True once every worker has finished loading and warming up."""
+        return self.ready_at is not None
+
+    @property
+    def models_loaded(self):
+        return sum(worker.model is not None for worker in self._workers)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        for worker in self._workers:
+            worker.started_at = time.monotonic()
+            worker.thread = threading.Thread(
+                target=self._run, args=(worker,),
+                name=f"inference-worker-{worker.worker_id}", daemon=True
+            )
+            worker.thread.start()
+
+    def shutdown(self, timeout=5.0):
+        if not self.started:
+            return
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            if worker.thread is not None:
+                worker.thread.join(timeout)
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            self._queue.put_nowait((fn, args, future))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(f"Inference queue is full ({self._queue.maxsize} pending jobs)")
+        return future
+
+    async def run(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _run(self, worker):
+        start = time.perf_counter()
+        try:
+            worker.model = self._load_model()
+            worker.load_seconds = time.perf_counter() - start
+            if self._warm_up is not None:
+                start = time.perf_counter()
+                self._warm_up(worker.model)
+                worker.warm_up_seconds = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"Inference worker {worker.worker_id} failed to load model: {e}")
+            worker.model = None
+        self._mark_ready(worker)
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            fn, args, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            worker.busy = True
+            start = time.perf_counter()
+            try:
+                future.set_result(fn(worker.model, *args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                worker.busy_seconds += time.perf_counter() - start
+                worker.tasks += 1
+                worker.busy = False
+                with self._lock:
+                    self._completed += 1
+
+    def _mark_ready(self, worker):
+        with self._lock:
+            worker.ready = True
+            if all(w.ready for w in self._workers):
+                self.ready_at = time.monotonic()
+                logger.info(
+                    f"Inference pool ready: {self.models_loaded}/{len(self._workers)} workers "
+                    f"loaded in {self.ready_at - self.started_at:.2f}s"
+                )
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "workers": [
+                {
+                    "id": worker.worker_id,
+                    "ready": worker.ready,
+                    "model_loaded": worker.model is not None,
+                    "load_seconds": worker.load_seconds,
+                    "warm_up_seconds": worker.warm_up_seconds,
+                    "busy": worker.busy,
+                    "tasks": worker.tasks,
+                    "utilisation": round(worker.busy_seconds / max(now - worker.started_at, 1e-9), 4)
+                }
+                for worker in self._workers
+            ]
+        }
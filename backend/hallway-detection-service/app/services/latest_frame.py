@@ -0,0 +1,30 @@
+import asyncio
+
+
+class LatestFrameSlot:
+    """
+    Single-slot mailbox for a streaming session.
+
+    put() never waits: a newer frame replaces the pending one, which is
+    counted as dropped. get() waits for the next pending frame, so a slow
+    consumer only ever sees the newest frame.
+    """
+
+    def __init__(self):
+        self._item = None
+        self._event = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item):
+        if self._item is not None:
+            self.dropped += 1
+        self._item = item
+        self.received += 1
+        self._event.set()
+
+    async def get(self):
+        await self._event.wait()
+        item, self._item = self._item, None
+        self._event.clear()
+        return item
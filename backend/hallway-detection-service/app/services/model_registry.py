@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import urllib.request
+
+import cv2
+
+from app.services.person_detector import PersonDetector, YOLO_INPUT_SIZE
+from app.services.yolo_postprocessing import OUTPUT_LAYOUTS, DARKNET_LAYOUT
+
+logger = logging.getLogger(__name__)
+
+# Blob sizes the YOLO models are usually run at; any multiple of 32 works
+SUPPORTED_INPUT_SIZES = (320, 416, 608)
+
+DNN_BACKENDS = {
+    "default": cv2.dnn.DNN_BACKEND_DEFAULT,
+    "opencv": cv2.dnn.DNN_BACKEND_OPENCV,
+    "openvino": cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+    "cuda": cv2.dnn.DNN_BACKEND_CUDA,
+}
+
+DNN_TARGETS = {
+    "cpu": cv2.dnn.DNN_TARGET_CPU,
+    "opencl": cv2.dnn.DNN_TARGET_OPENCL,
+    "opencl_fp16": cv2.dnn.DNN_TARGET_OPENCL_FP16,
+    "cuda": cv2.dnn.DNN_TARGET_CUDA,
+    "cuda_fp16": cv2.dnn.DNN_TARGET_CUDA_FP16,
+}
+
+# Models available out of the box. More can be declared in a JSON file
+# (MODEL_REGISTRY_FILE) mapping a name to the same fields, for example:
+#   {"yolov5n": {"format": "onnx", "weights": "yolov5n.onnx", "layout": "yolov5"}}
+BUILTIN_MODELS = {
+    "yolov3": {
+        "format": "darknet",
+        "config": "yolov3.cfg",
+        "weights": "yolov3.weights",
+        "config_url": "https://raw.githubusercontent.com/pjreddie/darknet/master/cfg/yolov3.cfg",
+        "weights_url": "https://pjreddie.com/media/files/yolov3.weights",
+    },
+    "yolov3-tiny": {
+        "format": "darknet",
+        "config": "yolov3-tiny.cfg",
+        "weights": "yolov3-tiny.weights",
+        "config_url": "https://raw.githubusercontent.com/pjreddie/darknet/master/cfg/yolov3-tiny.cfg",
+        "weights_url": "https://pjreddie.com/media/files/yolov3-tiny.weights",
+    },
+}
+
+
+class ModelSpec:
+    """A named detector model: file format, files relative to the models directory, output layout."""
+
+    def __init__(self, name, format, weights, config=None, layout=DARKNET_LAYOUT,
+                 batching=None, weights_url=None, config_url=None):
+        if format not in ("darknet", "onnx"):
+            raise ValueError(f"Model {name}: unsupported format {format!r}")
+        if format == "darknet" and not config:
+            raise ValueError(f"Model {name}: darknet models need a config file")
+        if layout not in OUTPUT_LAYOUTS:
+            raise ValueError(f"Model {name}: unknown output layout {layout!r}")
+
+        self.name = name
+        self.format = format
+        self.weights = weights
+        self.config = config
+        self.layout = layout
+        # Darknet nets batch natively; ONNX exports usually have a fixed batch of 1
+        self.batching = format == "darknet" if batching is None else batching
+        self.weights_url = weights_url
+        self.config_url = config_url
+
+    def files(self, models_dir):
+        """(path, download url) for every file the model needs."""
+        files = [(os.path.join(models_dir, self.weights), self.weights_url)]
+        if self.config:
+            files.append((os.path.join(models_dir, self.config), self.config_url))
+        return files
+
+
+def load_registry(registry_file=None):
+    models = dict(BUILTIN_MODELS)
+    if registry_file:
+        with open(registry_file) as f:
+            models.update(json.load(f))
+    return {name: ModelSpec(name, **fields) for name, fields in models.items()}
+
+
+def get_model_spec(name, registry_file=None):
+    registry = load_registry(registry_file)
+    if name not in registry:
+        raise ValueError(f"Unknown detection model {name!r}, available: {', '.join(sorted(registry))}")
+    return registry[name]
+
+
+def ensure_model_files(spec, models_dir):
+    """Download missing model files when the registry knows where to get them."""
+    os.makedirs(models_dir, exist_ok=True)
+    for path, url in spec.files(models_dir):
+        if os.path.exists(path):
+            continue
+        if not url:
+            raise FileNotFoundError(f"Model {spec.name}: {path} not found and no download URL configured")
+        logger.info(f"Downloading {os.path.basename(path)} for model {spec.name} (this may take a while)...")
+        urllib.request.urlretrieve(url, path)
+
+
+def load_detector(spec, models_dir, input_size=YOLO_INPUT_SIZE, backend="default", target="cpu"):
+    if input_size % 32 != 0:
+        raise ValueError(f"Input size must be a multiple of 32, got {input_size}")
+    if backend not in DNN_BACKENDS:
+        raise ValueError(f"Unknown DNN backend {backend!r}, available: {', '.join(DNN_BACKENDS)}")
+    if target not in DNN_TARGETS:
+        raise ValueError(f"Unknown DNN target {target!r}, available: {', '.join(DNN_TARGETS)}")
+
+    weights_path = os.path.join(models_dir, spec.weights)
+    if spec.format == "onnx":
+        net = cv2.dnn.readNetFromONNX(weights_path)
+    else:
+        net = cv2.dnn.readNetFromDarknet(os.path.join(models_dir, spec.config), weights_path)
+
+    net.setPreferableBackend(DNN_BACKENDS[backend])
+    net.setPreferableTarget(DNN_TARGETS[target])
+    return PersonDetector(net, input_size=input_size, layout=spec.layout, batching=spec.batching, name=spec.name)
@@ -0,0 +1,55 @@
+import threading
+
+import cv2
+
+DEFAULT_MOTION_THRESHOLD = 0.001
+DEFAULT_PIXEL_THRESHOLD = 25
+DEFAULT_MAX_SKIPPED_FRAMES = 25
+GATE_SIZE = (160, 120)
+
+
+class MotionGate:
+    """
+    Cheap per-camera change detector run before YOLO.
+
+    Frames are downscaled to grayscale and compared with the last frame that
+    went through inference (not just the previous frame, so slow changes
+    still add up). When the fraction of pixels that changed by more than
+    `pixel_threshold` stays below `threshold`, inference can be skipped and
+    the previous detections reused. Every `max_skipped_frames` skips a frame
+    is let through anyway, so nothing stays stale for long.
+    """
+
+    def __init__(self, threshold=DEFAULT_MOTION_THRESHOLD, pixel_threshold=DEFAULT_PIXEL_THRESHOLD,
+                 max_skipped_frames=DEFAULT_MAX_SKIPPED_FRAMES):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.max_skipped_frames = max_skipped_frames
+        self._reference = None
+        self._skipped_in_a_row = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _thumbnail(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, GATE_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def changed_fraction(self, thumbnail):
+        if self._reference is None:
+            return 1.0
+        diff = cv2.absdiff(thumbnail, self._reference)
+        _, changed = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(changed) / changed.size
+
+    def should_infer(self, frame):
+        """True when the frame differs enough from the last inferred one (or a refresh is due)."""
+        thumbnail = self._thumbnail(frame)
+        with self._lock:
+            if (self._skipped_in_a_row < self.max_skipped_frames
+                    and self.changed_fraction(thumbnail) < self.threshold):
+                self._skipped_in_a_row += 1
+                return False
+            self._reference = thumbnail
+            self._skipped_in_a_row = 0
+            return True
@@ -0,0 +1,59 @@
+import cv2
+
+from app.services.yolo_postprocessing import (
+    find_person_boxes,
+    to_darknet_layout,
+    DARKNET_LAYOUT,
+    DEFAULT_CONFIDENCE_THRESHOLD,
+    DEFAULT_NMS_THRESHOLD
+)
+
+# Blob parameters used by the YOLO models
+YOLO_SCALE = 0.00392
+YOLO_INPUT_SIZE = 416
+
+
+class PersonDetector:
+    """
+    A loaded cv2.dnn YOLO net and its output layers.
+
+    A net is not safe to share between threads, so every inference worker
+    owns its own PersonDetector. Nets exported without a dynamic batch
+    dimension (most ONNX exports) run one frame per forward pass.
+    """
+
+    def __init__(self, net, input_size=YOLO_INPUT_SIZE, layout=DARKNET_LAYOUT, batching=True, name=None):
+        self.net = net
+        self.output_layers = list(net.getUnconnectedOutLayersNames())
+        self.input_size = input_size
+        self.layout = layout
+        self.batching = batching
+        self.name = name
+
+    def forward(self, frames):
+        """Run one forward pass over all frames and return the output layers of each frame."""
+        if not self.batching and len(frames) > 1:
+            return [outputs for frame in frames for outputs in self.forward([frame])]
+
+        blob = cv2.dnn.blobFromImages(
+            frames, YOLO_SCALE, (self.input_size, self.input_size), (0, 0, 0), True, crop=False
+        )
+        self.net.setInput(blob)
+        outputs = self.net.forward(self.output_layers)
+
+        # YOLO layers return (rows, 85) for a single image and (N, rows, 85) for a batch
+        outputs = [
+            to_darknet_layout(output.reshape((len(frames),) + output.shape[-2:]), self.layout, self.input_size)
+            for output in outputs
+        ]
+        return [[output[i] for output in outputs] for i in range(len(frames))]
+
+    def detect(self, frames,
+               confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+               nms_threshold=DEFAULT_NMS_THRESHOLD):
+        """Return (boxes, confidences) for each frame, see find_person_boxes."""
+        return [
+            find_person_boxes(outputs, frame.shape[1], frame.shape[0],
+                              confidence_threshold, nms_threshold)
+            for frame, outputs in zip(frames, self.forward(frames))
+        ]
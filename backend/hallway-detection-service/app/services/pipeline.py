@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+
+from app.services.capture import CaptureThread, FrameBuffer, END_OF_STREAM
+from app.services.detections import build_detections
+from app.services.yolo_postprocessing import DEFAULT_CONFIDENCE_THRESHOLD, DEFAULT_NMS_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 8
+# How long the scheduler waits for other cameras to deliver a frame before running a partial batch
+DEFAULT_BATCH_WINDOW = 0.01
+
+
+class CameraResult:
+    """Detections for one frame of one camera, as handed to the pipeline's result callback."""
+
+    def __init__(self, camera, frame_id, timestamp, frame, detections, inference_skipped):
+        self.camera = camera
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.frame = frame
+        self.detections = detections
+        self.inference_skipped = inference_skipped
+
+
+class _Camera:
+    def __init__(self, source, state, buffer, stop_event):
+        self.source = source
+        self.state = state
+        self.buffer = buffer
+        self.reader = CaptureThread(source, buffer, stop_event)
+        self.ended = False
+        self.inferred = 0
+        self.skipped = 0
+
+
+class CapturePipeline:
+    """
+    Multi-camera capture with one shared inference scheduler.
+
+    Every camera has its own reader thread writing into a bounded
+    FrameBuffer, so a slow detector or callback never blocks capture; live
+    cameras just drop stale frames. A single scheduler thread takes the
+    pending frame of each camera, runs them through the detector as one
+    batch, then classifies, tracks and passes a CameraResult per frame to
+    `on_result`. `on_result` runs on the scheduler thread and should hand
+    slow work (display, notifications) to another thread.
+
+    `new_state()` returns the CameraState (tracker and optional motion gate)
+    used for each camera.
+    """
+
+    def __init__(self, detector, sources, new_state, color_classifier, on_result,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, batch_window=DEFAULT_BATCH_WINDOW,
+                 confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD, nms_threshold=DEFAULT_NMS_THRESHOLD):
+        self.detector = detector
+        self.color_classifier = color_classifier
+        self.on_result = on_result
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self.cameras = [
+            _Camera(source, new_state(), FrameBuffer(source.buffer_size, on_put=self._wake.set), self._stop)
+            for source in sources
+        ]
+        self._next = 0
+        self._scheduler = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+
+        self.batches = 0
+        self.batched_frames = 0
+        self.inference_seconds = 0.0
+
+    def start(self):
+        for camera in self.cameras:
+            camera.reader.start()
+        self._scheduler.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        self._scheduler.join(timeout)
+        for camera in self.cameras:
+            camera.reader.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait until every source has ended (only happens for video files) or stop() is called."""
+        self._scheduler.join(timeout)
+        return not self._scheduler.is_alive()
+
+    @property
+    def running(self):
+        return self._scheduler.is_alive()
+
+    def _collect(self):
+        """At most one pending frame per camera, starting after the camera served first last time."""
+        batch = []
+        count = len(self.cameras)
+        for offset in range(count):
+            camera = self.cameras[(self._next + offset) % count]
+            if camera.ended or len(batch) >= self.max_batch_size:
+                continue
+            item = camera.buffer.take()
+            if item is None:
+                continue
+            if item is END_OF_STREAM:
+                camera.ended = True
+                continue
+            batch.append((camera, item))
+        self._next = (self._next + 1) % max(count, 1)
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            if all(camera.ended for camera in self.cameras):
+                break
+            self._wake.wait(0.1)
+            self._wake.clear()
+            # Give the other cameras a moment so their frames share this forward pass
+            if self.batch_window and len(self.cameras) > 1:
+                time.sleep(self.batch_window)
+
+            batch = self._collect()
+            if batch:
+                try:
+                    self._process(batch)
+                except Exception as e:
+                    logger.error(f"Inference scheduler failed on a batch of {len(batch)} frames: {e}")
+                # Frames may still be pending if the batch was full
+                self._wake.set()
+
+    def _process(self, batch):
+        active = [
+            (camera, item) for camera, item in batch
+            if camera.state.motion_gate is None or camera.state.motion_gate.should_infer(item[2])
+        ]
+
+        detections = {}
+        if active:
+            start = time.perf_counter()
+            frames = [item[2] for _, item in active]
+            results = self.detector.detect(frames, self.confidence_threshold, self.nms_threshold)
+            self.inference_seconds += time.perf_counter() - start
+            self.batches += 1
+            self.batched_frames += len(active)
+
+            for (camera, item), (boxes, confidences) in zip(active, results):
+                detections[camera.source.name] = build_detections(self.color_classifier, item[2], boxes, confidences)
+
+        for camera, (frame_id, timestamp, frame) in batch:
+            state = camera.state
+            skipped = camera.source.name not in detections
+            if skipped:
+                # Reuse the previous boxes so tracks of people standing still stay alive
+                camera.skipped += 1
+                frame_detections = [dict(detection) for detection in state.last_detections]
+            else:
+                camera.inferred += 1
+                frame_detections = detections[camera.source.name]
+
+            track_ids = state.tracker.update([d["box"] for d in frame_detections], timestamp)
+            for detection, (track_id, is_new) in zip(frame_detections, track_ids):
+                detection["track_id"] = track_id
+                detection["new_track"] = is_new
+            state.last_detections = frame_detections
+
+            self.on_result(CameraResult(camera.source.name, frame_id, timestamp, frame, frame_detections, skipped))
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "mean_batch_size": round(self.batched_frames / self.batches, 2) if self.batches else 0.0,
+            "mean_inference_ms": round(1000 * self.inference_seconds / self.batches, 2) if self.batches else 0.0,
+            "cameras": {
+                camera.source.name: dict(
+                    camera.reader.stats(),
+                    frames_inferred=camera.inferred,
+                    frames_skipped=camera.skipped
+                )
+                for camera in self.cameras
+            }
+        }
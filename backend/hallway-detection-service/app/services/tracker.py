@@ -0,0 +1,191 @@
+import itertools
+import math
+import time
+
+import numpy as np
+
+DEFAULT_IOU_THRESHOLD = 0.3
+DEFAULT_MAX_DISTANCE = 80
+DEFAULT_TRACK_TIMEOUT = 5.0
+
+# Cost given to detection/track pairs that are not allowed to match
+_FORBIDDEN = 1e6
+
+
+def linear_assignment(cost):
+    """
+    Minimum-cost one-to-one assignment for a rectangular cost matrix
+    (Hungarian algorithm, O(n^2 m)). Returns a list of (row, column) pairs.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    rows, columns = cost.shape
+    if rows == 0:
+        return []
+
+    # Potentials and matching use 1-based indices; column 0 is a sentinel
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    match = np.zeros(columns + 1, dtype=np.int64)
+    way = np.zeros(columns + 1, dtype=np.int64)
+
+    for row in range(1, rows + 1):
+        match[0] = row
+        column = 0
+        min_value = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = match[column]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_value[1:])
+            min_value[1:][better] = reduced[better]
+            way[1:][better] = column
+
+            candidates = np.where(free, min_value[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+
+            u[match[used]] += delta
+            v[used] -= delta
+            min_value[~used] -= delta
+
+            column = next_column
+            if match[column] == 0:
+                break
+
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    pairs = [(int(match[c]) - 1, c - 1) for c in range(1, columns + 1) if match[c]]
+    return [(c, r) for r, c in pairs] if transposed else pairs
+
+
+def box_iou(box, boxes):
+    """IoU between one [x, y, w, h] box and an (N, 4) array of boxes."""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    overlap_w = np.clip(np.minimum(box[0] + box[2], boxes[:, 0] + boxes[:, 2]) - np.maximum(box[0], boxes[:, 0]), 0, None)
+    overlap_h = np.clip(np.minimum(box[1] + box[3], boxes[:, 1] + boxes[:, 3]) - np.maximum(box[1], boxes[:, 1]), 0, None)
+    intersection = overlap_w * overlap_h
+    union = box[2] * box[3] + boxes[:, 2] * boxes[:, 3] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    def __init__(self, track_id, box, timestamp):
+        self.track_id = track_id
+        self.first_seen = timestamp
+        self.hits = 0
+        self.update(box, timestamp)
+
+    def update(self, box, timestamp):
+        self.box = box
+        self.centroid = (box[0] + box[2] / 2, box[1] + box[3] / 2)
+        self.last_seen = timestamp
+        self.hits += 1
+
+
+class PersonTracker:
+    """
+    Multi-object tracker for person boxes from one camera.
+
+    Detections are associated with live tracks by IoU, falling back to
+    centroid distance, using an optimal one-to-one assignment. Candidate
+    tracks come from a spatial grid index, and tracks not seen for
+    `track_timeout` seconds are expired, so the cost of a frame depends on
+    the people currently in view, not on how long the camera has run.
+    """
+
+    def __init__(self, iou_threshold=DEFAULT_IOU_THRESHOLD, max_distance=DEFAULT_MAX_DISTANCE,
+                 track_timeout=DEFAULT_TRACK_TIMEOUT, cell_size=None):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.track_timeout = track_timeout
+        self.cell_size = cell_size or max(2 * max_distance, 1)
+        self.tracks = {}
+        self._grid = {}
+        self._ids = itertools.count(1)
+
+    def _cell(self, point):
+        return int(point[0] // self.cell_size), int(point[1] // self.cell_size)
+
+    def _index(self, track):
+        track.cell = self._cell(track.centroid)
+        self._grid.setdefault(track.cell, set()).add(track.track_id)
+
+    def _unindex(self, track):
+        cell = self._grid.get(track.cell)
+        if cell is not None:
+            cell.discard(track.track_id)
+            if not cell:
+                del self._grid[track.cell]
+
+    def _candidates(self, box):
+        """Track ids whose centroid lies in a grid cell reachable from this box."""
+        reach = max(self.max_distance, box[2], box[3])
+        span = int(math.ceil(reach / self.cell_size))
+        cx, cy = self._cell((box[0] + box[2] / 2, box[1] + box[3] / 2))
+        found = set()
+        for gx in range(cx - span, cx + span + 1):
+            for gy in range(cy - span, cy + span + 1):
+                found.update(self._grid.get((gx, gy), ()))
+        return found
+
+    def expire(self, timestamp):
+        for track in [t for t in self.tracks.values() if timestamp - t.last_seen > self.track_timeout]:
+            self._unindex(track)
+            del self.tracks[track.track_id]
+
+    def update(self, boxes, timestamp=None):
+        """
+        Associate this frame's [x, y, w, h] boxes with tracks.
+        Returns (track_id, is_new) for each box, in input order.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        self.expire(timestamp)
+
+        boxes = [list(box) for box in np.asarray(boxes).reshape(-1, 4).tolist()]
+        if not boxes:
+            return []
+
+        candidate_ids = sorted(set().union(*(self._candidates(box) for box in boxes)))
+        assignments = {}
+        if candidate_ids:
+            candidates = [self.tracks[track_id] for track_id in candidate_ids]
+            track_boxes = np.array([track.box for track in candidates], dtype=np.float64)
+            track_centroids = np.array([track.centroid for track in candidates])
+
+            cost = np.full((len(boxes), len(candidates)), _FORBIDDEN)
+            for i, box in enumerate(boxes):
+                iou = box_iou(box, track_boxes)
+                distance = np.hypot(track_centroids[:, 0] - (box[0] + box[2] / 2),
+                                    track_centroids[:, 1] - (box[1] + box[3] / 2))
+                # Overlapping boxes are preferred over merely nearby ones
+                cost[i] = np.where(iou >= self.iou_threshold, 1.0 - iou,
+                                   np.where(distance <= self.max_distance,
+                                            1.0 + distance / max(self.max_distance, 1e-9), _FORBIDDEN))
+
+            for i, j in linear_assignment(cost):
+                if cost[i, j] < _FORBIDDEN:
+                    assignments[i] = candidates[j]
+
+        results = []
+        for i, box in enumerate(boxes):
+            track = assignments.get(i)
+            if track is not None:
+                self._unindex(track)
+                track.update(box, timestamp)
+                self._index(track)
+                results.append((track.track_id, False))
+            else:
+                track = Track(next(self._ids), box, timestamp)
+                self.tracks[track.track_id] = track
+                self._index(track)
+                results.append((track.track_id, True))
+        return results
+
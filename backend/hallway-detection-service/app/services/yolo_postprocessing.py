@@ -0,0 +1,97 @@
+import cv2
+import numpy as np
+
+# Class ID 0 is for 'person' in the COCO label set used by YOLOv3
+PERSON_CLASS_ID = 0
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.5
+DEFAULT_NMS_THRESHOLD = 0.4
+
+_EMPTY_BOXES = np.empty((0, 4), dtype=np.int64)
+_EMPTY_CONFIDENCES = np.empty((0,), dtype=np.float32)
+
+# Output layouts understood by to_darknet_layout
+DARKNET_LAYOUT = "darknet"  # [cx, cy, w, h] in 0..1, objectness, class scores * objectness
+YOLOV5_LAYOUT = "yolov5"    # [cx, cy, w, h] in input pixels, objectness, raw class scores
+YOLOV8_LAYOUT = "yolov8"    # transposed (84, rows), [cx, cy, w, h] in input pixels, class scores
+OUTPUT_LAYOUTS = (DARKNET_LAYOUT, YOLOV5_LAYOUT, YOLOV8_LAYOUT)
+
+
+def to_darknet_layout(output, layout, input_size):
+    """
+    Convert a batched (N, ...) output of an exported model to the
+    (N, rows, 5 + classes) layout produced by OpenCV's darknet YOLO layers,
+    so find_person_boxes works unchanged for every model family.
+    """
+    if layout == DARKNET_LAYOUT:
+        return output
+    if layout == YOLOV5_LAYOUT:
+        rows = output.astype(np.float32, copy=True)
+        rows[..., :4] /= input_size
+        rows[..., 5:] *= rows[..., 4:5]
+        return rows
+    if layout == YOLOV8_LAYOUT:
+        columns = np.swapaxes(output, 1, 2)
+        rows = np.empty(columns.shape[:2] + (columns.shape[2] + 1,), dtype=np.float32)
+        rows[..., :4] = columns[..., :4] / input_size
+        rows[..., 4] = 1.0
+        rows[..., 5:] = columns[..., 4:]
+        return rows
+    raise ValueError(f"Unknown output layout: {layout}")
+
+
+def find_person_boxes(outputs, width, height,
+                      confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                      nms_threshold=DEFAULT_NMS_THRESHOLD):
+    """
+    Turn the raw YOLO output layers of one frame into person boxes.
+
+    Every row of every layer is filtered, scaled and converted in a single
+    NumPy pass; only the surviving candidates reach cv2.dnn.NMSBoxes.
+    Returns (boxes, confidences) where boxes is an (N, 4) array of
+    [x, y, w, h] pixel coordinates, ordered as NMSBoxes keeps them.
+    """
+    boxes, confidences = person_candidates(outputs, width, height, confidence_threshold)
+    return suppress_overlaps(boxes, confidences, confidence_threshold, nms_threshold)
+
+
+def person_candidates(outputs, width, height, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD):
+    """Person rows above the threshold as pixel boxes and confidences, before non-maximum suppression."""
+    rows = [output.reshape(-1, output.shape[-1]) for output in outputs]
+    if not rows:
+        return _EMPTY_BOXES, _EMPTY_CONFIDENCES
+    rows = rows[0] if len(rows) == 1 else np.concatenate(rows)
+
+    # A row is a person when the person score is above the threshold and is
+    # also the best class score; checking the person column first means the
+    # full argmax only runs on the handful of candidates.
+    candidates = rows[rows[:, 5 + PERSON_CLASS_ID] > confidence_threshold]
+    scores = candidates[:, 5:]
+    candidates = candidates[np.argmax(scores, axis=1) == PERSON_CLASS_ID]
+    if len(candidates) == 0:
+        return _EMPTY_BOXES, _EMPTY_CONFIDENCES
+
+    confidences = candidates[:, 5 + PERSON_CLASS_ID]
+
+    center_x = (candidates[:, 0] * width).astype(np.int64)
+    center_y = (candidates[:, 1] * height).astype(np.int64)
+    w = (candidates[:, 2] * width).astype(np.int64)
+    h = (candidates[:, 3] * height).astype(np.int64)
+    x = (center_x - w / 2).astype(np.int64)
+    y = (center_y - h / 2).astype(np.int64)
+    return np.stack([x, y, w, h], axis=1), confidences
+
+
+def suppress_overlaps(boxes, confidences,
+                      confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                      nms_threshold=DEFAULT_NMS_THRESHOLD):
+    """Non-maximum suppression over candidate boxes, see find_person_boxes."""
+    if len(boxes) == 0:
+        return _EMPTY_BOXES, _EMPTY_CONFIDENCES
+    indices = cv2.dnn.NMSBoxes(boxes.tolist(), confidences.tolist(),
+                               confidence_threshold, nms_threshold)
+    if len(indices) == 0:
+        return _EMPTY_BOXES, _EMPTY_CONFIDENCES
+
+    indices = np.asarray(indices).flatten()
+    return boxes[indices], confidences[indices]
@@ -0,0 +1,171 @@
+"""
+Compare detector configurations on a folder of recorded hallway frames.
+
+Each configuration is MODEL@SIZE (for example yolov3-tiny@320). Every
+configuration runs over the same frames and reports per-frame latency,
+throughput, and how well its person detections agree with the reference
+configuration (boxes matched by IoU).
+
+Usage (from the service root):
+    python -m benchmarks.model_benchmark --frames-dir recordings/ward2 \\
+        --reference yolov3@608 --configs yolov3@416 yolov3-tiny@416 yolov3-tiny@320
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.services.model_registry import (
+    get_model_spec,
+    ensure_model_files,
+    load_detector,
+    DNN_BACKENDS,
+    DNN_TARGETS
+)
+from app.services.yolo_postprocessing import DEFAULT_CONFIDENCE_THRESHOLD, DEFAULT_NMS_THRESHOLD
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "models")
+
+
+def parse_config(value):
+    name, _, size = value.partition("@")
+    return name, int(size) if size else 416
+
+
+def load_frames(frames_dir, limit=None):
+    paths = sorted(
+        os.path.join(frames_dir, name) for name in os.listdir(frames_dir)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    frames = [cv2.imread(path, cv2.IMREAD_COLOR) for path in paths[:limit]]
+    return [frame for frame in frames if frame is not None]
+
+
+def box_iou(boxes_a, boxes_b):
+    """IoU matrix between two (N, 4) / (M, 4) arrays of [x, y, w, h] boxes."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+    overlap_w = np.clip(np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    overlap_h = np.clip(np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = overlap_w * overlap_h
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+def match_count(boxes, reference_boxes, iou_threshold):
+    """Greedy one-to-one matching by descending IoU; returns the number of matched boxes."""
+    if len(boxes) == 0 or len(reference_boxes) == 0:
+        return 0
+    iou = box_iou(boxes, reference_boxes)
+    matched = 0
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < iou_threshold:
+            return matched
+        matched += 1
+        iou[i, :] = -1
+        iou[:, j] = -1
+
+
+def run_config(name, input_size, frames, args):
+    spec = get_model_spec(name, args.registry)
+    ensure_model_files(spec, args.models_dir)
+    detector = load_detector(spec, args.models_dir, input_size, args.backend, args.target)
+
+    # Warm-up pass so backend initialisation is not counted
+    detector.detect(frames[:1], args.confidence, args.nms)
+
+    latencies = []
+    results = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), args.batch_size):
+        batch = frames[i:i + args.batch_size]
+        batch_start = time.perf_counter()
+        results.extend(boxes for boxes, _ in detector.detect(batch, args.confidence, args.nms))
+        latencies.extend([(time.perf_counter() - batch_start) / len(batch)] * len(batch))
+    total = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "config": f"{name}@{input_size}",
+        "frames": len(frames),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "fps": len(frames) / total,
+        "persons": int(sum(len(boxes) for boxes in results)),
+    }, results
+
+
+def agreement(results, reference_results, iou_threshold):
+    matched = predicted = expected = same_count = 0
+    for boxes, reference_boxes in zip(results, reference_results):
+        matched += match_count(boxes, reference_boxes, iou_threshold)
+        predicted += len(boxes)
+        expected += len(reference_boxes)
+        same_count += len(boxes) == len(reference_boxes)
+    precision = matched / predicted if predicted else 1.0
+    recall = matched / expected if expected else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "count_agreement": same_count / len(results) if results else 1.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames-dir", required=True, help="folder of .jpg/.png frames")
+    parser.add_argument("--configs", nargs="+", default=["yolov3@416", "yolov3-tiny@416", "yolov3-tiny@320"])
+    parser.add_argument("--reference", default="yolov3@608", help="configuration used as ground truth")
+    parser.add_argument("--registry", default=os.getenv("MODEL_REGISTRY_FILE"), help="extra model registry JSON")
+    parser.add_argument("--models-dir", default=os.getenv("MODELS_DIR", DEFAULT_MODELS_DIR))
+    parser.add_argument("--backend", default="default", choices=sorted(DNN_BACKENDS))
+    parser.add_argument("--target", default="cpu", choices=sorted(DNN_TARGETS))
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=None, help="use at most this many frames")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE_THRESHOLD)
+    parser.add_argument("--nms", type=float, default=DEFAULT_NMS_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU needed to count two boxes as the same person")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.frames_dir, args.limit)
+    if not frames:
+        print(f"No frames found in {args.frames_dir}", file=sys.stderr)
+        return 1
+
+    reference_name, reference_size = parse_config(args.reference)
+    reference_report, reference_results = run_config(reference_name, reference_size, frames, args)
+    reports = [dict(reference_report, **agreement(reference_results, reference_results, args.iou))]
+
+    for config in args.configs:
+        if config == args.reference:
+            continue
+        name, input_size = parse_config(config)
+        report, results = run_config(name, input_size, frames, args)
+        reports.append(dict(report, **agreement(results, reference_results, args.iou)))
+
+    print(f"{len(frames)} frames, reference {args.reference}, backend={args.backend}, target={args.target}")
+    print(f"{'config':<20}{'mean ms':>9}{'p95 ms':>9}{'fps':>8}{'persons':>9}{'precision':>11}{'recall':>8}{'f1':>7}{'count':>7}")
+    for report in reports:
+        print(f"{report['config']:<20}{report['mean_ms']:>9.1f}{report['p95_ms']:>9.1f}{report['fps']:>8.1f}"
+              f"{report['persons']:>9}{report['precision']:>11.3f}{report['recall']:>8.3f}"
+              f"{report['f1']:>7.3f}{report['count_agreement']:>7.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"reference": args.reference, "frames": len(frames), "results": reports}, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Per-stage benchmark of the detection pipeline, with a regression check.
+
+Every stage a /analyze request goes through is timed on its own: base64
+decode, cv2.imdecode, blobFromImage, net.forward, YOLO post-processing,
+NMS and colour classification. Stages that depend on the frame size run
+for each --sizes entry, stages that depend on the number of people for
+each --persons entry. Frames are synthetic (people drawn in palette
+colours) or, with --frames-dir, recorded frames resized to each size.
+Post-processing and NMS run on synthetic YOLO outputs with the requested
+number of people, so they do not depend on what the model finds.
+
+Results are median/p90 milliseconds per stage. --save writes them, with
+the environment they were measured in, as a JSON baseline; --baseline
+compares against one and exits with 1 when a stage is slower than the
+baseline by more than --tolerance (and by more than --min-delta-ms, so
+microsecond stages do not fail on noise).
+
+Usage (from the service root):
+    python -m benchmarks.pipeline_benchmark --save benchmarks/pipeline_baseline.json
+    python -m benchmarks.pipeline_benchmark --baseline benchmarks/pipeline_baseline.json --tolerance 0.25
+    python -m benchmarks.pipeline_benchmark --frames-dir recordings/ward2 --sizes 1280x720 --persons 0 8
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.services.color_classifier import ColorClassifier, DEFAULT_PALETTE
+from app.services.model_registry import get_model_spec, load_detector
+from app.services.person_detector import YOLO_SCALE, YOLO_INPUT_SIZE
+from app.services.yolo_postprocessing import person_candidates, suppress_overlaps
+from benchmarks.model_benchmark import DEFAULT_MODELS_DIR, load_frames
+from benchmarks.postprocessing_benchmark import synthetic_outputs
+
+DEFAULT_SIZES = ("640x480", "1280x720", "1920x1080")
+DEFAULT_PERSONS = (0, 4, 16)
+JPEG_QUALITY = 90
+# People in the frame the decode stages run on, fixed so their timings do not depend on --persons
+DECODE_FRAME_PERSONS = 8
+
+
+def parse_size(value):
+    width, _, height = value.partition("x")
+    return int(width), int(height)
+
+
+def person_boxes(rng, width, height, persons):
+    """Upright person-sized [x, y, w, h] boxes inside the frame."""
+    boxes = []
+    for _ in range(persons):
+        h = int(height * rng.uniform(0.3, 0.8))
+        w = int(h * rng.uniform(0.3, 0.5))
+        boxes.append([int(rng.integers(0, width - w)), int(rng.integers(0, height - h)), w, h])
+    return np.array(boxes, dtype=np.int64).reshape(-1, 4)
+
+
+def synthetic_frame(rng, width, height, boxes):
+    """Hallway-like frame: shaded floor and walls, sensor noise, people wearing palette colours."""
+    shade = np.linspace(60, 180, height, dtype=np.float32)[:, None, None]
+    frame = np.clip(shade + rng.normal(0, 8, (height, width, 3)), 0, 255).astype(np.uint8)
+    # Middle hue of each colour's first range, well inside the palette's saturation and value bounds
+    hsv = np.array([[[(low[0] + high[0]) // 2, 220, 200] for (low, high), *_ in DEFAULT_PALETTE.values()]], np.uint8)
+    colors = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0].tolist()
+    for i, (x, y, w, h) in enumerate(boxes.tolist()):
+        color = colors[i % len(colors)]
+        cv2.rectangle(frame, (x, y + h // 5), (x + w, y + h), color, -1)
+        cv2.circle(frame, (x + w // 2, y + h // 10), max(h // 10, 1), (90, 120, 160), -1)
+    return frame
+
+
+def recorded_frame(frames, index, width, height):
+    return cv2.resize(frames[index % len(frames)], (width, height), interpolation=cv2.INTER_AREA)
+
+
+def measure(fn, repeat, warmup=2):
+    """Median, p90 and min of `repeat` timed calls, in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1000
+    return {
+        "median_ms": round(float(np.median(samples)), 4),
+        "p90_ms": round(float(np.percentile(samples, 90)), 4),
+        "min_ms": round(float(samples.min()), 4),
+    }
+
+
+def load_net(model, input_size, models_dir):
+    """The configured detector, or None when its files are not available locally (nothing is downloaded)."""
+    spec = get_model_spec(model)
+    missing = [path for path, _ in spec.files(models_dir) if not os.path.exists(path)]
+    if missing:
+        print(f"Skipping forward: {', '.join(missing)} not found", file=sys.stderr)
+        return None
+    return load_detector(spec, models_dir, input_size)
+
+
+def run_benchmark(sizes, persons, repeat, forward_repeat, detector=None, recorded=None, seed=0,
+                  input_size=YOLO_INPUT_SIZE):
+    """Time every stage; returns {"<stage>/<case>": timings}."""
+    rng = np.random.default_rng(seed)
+    classifier = ColorClassifier()
+    results = {}
+
+    if detector is not None:
+        blob = cv2.dnn.blobFromImage(
+            np.zeros((input_size, input_size, 3), np.uint8), YOLO_SCALE, (input_size, input_size), (0, 0, 0), True
+        )
+
+        def forward():
+            detector.net.setInput(blob)
+            detector.net.forward(detector.output_layers)
+
+        results[f"forward/{input_size}"] = measure(forward, forward_repeat, warmup=1)
+
+    for width, height in sizes:
+        size = f"{width}x{height}"
+        if recorded:
+            frame = recorded_frame(recorded, 0, width, height)
+        else:
+            decode_rng = np.random.default_rng(seed)
+            frame = synthetic_frame(decode_rng, width, height, person_boxes(decode_rng, width, height, DECODE_FRAME_PERSONS))
+        encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1].tobytes()
+        payload = base64.b64encode(encoded)
+        results[f"b64decode/{size}"] = measure(lambda: base64.b64decode(payload), repeat)
+        results[f"imdecode/{size}"] = measure(
+            lambda: cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR), repeat
+        )
+        results[f"blob/{size}"] = measure(
+            lambda: cv2.dnn.blobFromImage(frame, YOLO_SCALE, (input_size, input_size), (0, 0, 0), True, crop=False),
+            repeat
+        )
+
+        for index, count in enumerate(persons):
+            boxes = person_boxes(rng, width, height, count)
+            if recorded:
+                frame = recorded_frame(recorded, index, width, height)
+            else:
+                frame = synthetic_frame(rng, width, height, boxes)
+            outputs = synthetic_outputs(rng, count)
+            candidates = person_candidates(outputs, width, height)
+            results[f"postprocess/{size}/p{count}"] = measure(lambda: person_candidates(outputs, width, height), repeat)
+            results[f"nms/{size}/p{count}"] = measure(lambda: suppress_overlaps(*candidates), repeat)
+            results[f"detect_color/{size}/p{count}"] = measure(lambda: classifier.classify(frame, boxes), repeat)
+
+    return results
+
+
+def environment(args):
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "opencv_threads": cv2.getNumThreads(),
+        "model": args.model,
+        "input_size": args.input_size,
+        "source": "recorded" if args.frames_dir else "synthetic",
+        "repeat": args.repeat,
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """(key, current, reference, change) for every stage slower than the baseline allows."""
+    regressions = []
+    for key, timings in results.items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            continue
+        current, previous = timings["median_ms"], reference["median_ms"]
+        if current > previous * (1 + tolerance) and current - previous > min_delta_ms:
+            regressions.append((key, current, previous, current / previous - 1))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'stage/case':<34}{'median ms':>11}{'p90 ms':>10}{'baseline':>10}{'change':>9}")
+    for key, timings in results.items():
+        line = f"{key:<34}{timings['median_ms']:>11.3f}{timings['p90_ms']:>10.3f}"
+        reference = baseline["results"].get(key) if baseline else None
+        if reference:
+            change = timings["median_ms"] / reference["median_ms"] - 1 if reference["median_ms"] else 0.0
+            line += f"{reference['median_ms']:>10.3f}{change:>+9.0%}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="frame sizes, WIDTHxHEIGHT")
+    parser.add_argument("--persons", nargs="+", type=int, default=list(DEFAULT_PERSONS), help="people per frame")
+    parser.add_argument("--frames-dir", help="recorded frames to use instead of synthetic ones")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per stage and case")
+    parser.add_argument("--forward-repeat", type=int, default=5, help="timed runs of net.forward")
+    parser.add_argument("--model", default=os.getenv("DETECTION_MODEL", "yolov3"))
+    parser.add_argument("--input-size", type=int, default=int(os.getenv("DETECTION_INPUT_SIZE", str(YOLO_INPUT_SIZE))))
+    parser.add_argument("--models-dir", default=os.getenv("MODELS_DIR", DEFAULT_MODELS_DIR))
+    parser.add_argument("--skip-forward", action="store_true", help="do not load the model or time net.forward")
+    parser.add_argument("--threads", type=int, help="OpenCV threads (default: OpenCV's choice)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the results as a JSON baseline to this file")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per stage (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="slowdowns below this are never regressions")
+    args = parser.parse_args(argv)
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    recorded = None
+    if args.frames_dir:
+        recorded = load_frames(args.frames_dir)
+        if not recorded:
+            print(f"No frames found in {args.frames_dir}", file=sys.stderr)
+            return 2
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    detector = None if args.skip_forward else load_net(args.model, args.input_size, args.models_dir)
+    results = run_benchmark(
+        [parse_size(size) for size in args.sizes], sorted(set(args.persons)), args.repeat, args.forward_repeat,
+        detector=detector, recorded=recorded, seed=args.seed, input_size=args.input_size
+    )
+    env = environment(args)
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"environment": env, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.save}")
+
+    if baseline is None:
+        return 0
+    differences = [
+        f"{key}: {baseline['environment'].get(key)} -> {value}"
+        for key, value in env.items() if baseline["environment"].get(key) != value
+    ]
+    if differences:
+        print("Warning: environment differs from the baseline (" + ", ".join(differences) + ")")
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for key, current, previous, change in regressions:
+        print(f"REGRESSION {key}: {current:.3f} ms vs {previous:.3f} ms baseline ({change:+.0%})")
+    if not regressions:
+        print(f"No stage slower than the baseline by more than {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Micro-benchmark for the YOLO post-processing stage.
+
+Compares the original per-row Python loop with the vectorized
+find_person_boxes on synthetic YOLOv3 outputs (416x416 -> 10647 rows) and
+checks that both produce exactly the same boxes and confidences.
+
+Usage (from the service root):
+    python -m benchmarks.postprocessing_benchmark --frames 200 --persons 12
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.services.yolo_postprocessing import (
+    find_person_boxes,
+    DEFAULT_CONFIDENCE_THRESHOLD,
+    DEFAULT_NMS_THRESHOLD
+)
+
+# Grid sizes of the three YOLOv3 output layers for a 416x416 blob
+YOLO_GRIDS = (13, 26, 52)
+ANCHORS_PER_CELL = 3
+NUM_CLASSES = 80
+
+
+def reference_person_boxes(outputs, width, height,
+                           confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                           nms_threshold=DEFAULT_NMS_THRESHOLD):
+    # Original loop from detect_persons, kept verbatim as the baseline
+    boxes = []
+    confidences = []
+
+    for output in outputs:
+        for detection in output:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+
+            if confidence > confidence_threshold and class_id == 0:
+                center_x = int(detection[0] * width)
+                center_y = int(detection[1] * height)
+                w = int(detection[2] * width)
+                h = int(detection[3] * height)
+
+                x = int(center_x - w / 2)
+                y = int(center_y - h / 2)
+                boxes.append([x, y, w, h])
+                confidences.append(float(confidence))
+
+    indices = cv2.dnn.NMSBoxes(boxes, confidences, confidence_threshold, nms_threshold)
+    if len(indices) == 0:
+        return [], []
+    indices = np.asarray(indices).flatten()
+    return [boxes[i] for i in indices], [confidences[i] for i in indices]
+
+
+def synthetic_outputs(rng, persons):
+    """Build YOLO-shaped outputs with `persons` clusters of overlapping person rows."""
+    outputs = []
+    for grid in YOLO_GRIDS:
+        rows = grid * grid * ANCHORS_PER_CELL
+        output = np.zeros((rows, 5 + NUM_CLASSES), dtype=np.float32)
+        output[:, 0:2] = rng.random((rows, 2), dtype=np.float32)
+        output[:, 2:4] = rng.random((rows, 2), dtype=np.float32) * 0.3
+        output[:, 4] = rng.random(rows, dtype=np.float32)
+        output[:, 5:] = rng.random((rows, NUM_CLASSES), dtype=np.float32) * 0.05
+        outputs.append(output)
+
+    # Each person lights up a few neighbouring rows, like real YOLO output
+    for _ in range(persons):
+        layer = outputs[rng.integers(len(outputs))]
+        center = rng.random(2, dtype=np.float32)
+        size = rng.uniform(0.05, 0.3, 2).astype(np.float32)
+        for row in rng.choice(len(layer), size=4, replace=False):
+            layer[row, 0:2] = center + rng.normal(0, 0.01, 2).astype(np.float32)
+            layer[row, 2:4] = size * rng.uniform(0.9, 1.1, 2).astype(np.float32)
+            layer[row, 5] = rng.uniform(0.4, 1.0)
+
+    # Rows where another class wins must be ignored even with a high person score
+    for layer in outputs:
+        rows = rng.choice(len(layer), size=5, replace=False)
+        layer[rows, 5] = 0.7
+        layer[rows, 6] = 0.9
+
+    return outputs
+
+
+def time_per_frame(fn, frames, width, height, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for outputs in frames:
+            fn(outputs, width, height)
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=100, help="synthetic frames per run")
+    parser.add_argument("--persons", type=int, default=10, help="person clusters per frame")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per implementation (best is kept)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    frames = [synthetic_outputs(rng, args.persons) for _ in range(args.frames)]
+
+    mismatches = 0
+    for outputs in frames:
+        expected_boxes, expected_confidences = reference_person_boxes(outputs, args.width, args.height)
+        boxes, confidences = find_person_boxes(outputs, args.width, args.height)
+        if boxes.tolist() != expected_boxes or confidences.tolist() != expected_confidences:
+            mismatches += 1
+
+    loop_time = time_per_frame(reference_person_boxes, frames, args.width, args.height, args.repeat)
+    vectorized_time = time_per_frame(find_person_boxes, frames, args.width, args.height, args.repeat)
+
+    print(f"frames: {args.frames}, rows/frame: {sum(len(o) for o in frames[0])}, persons/frame: {args.persons}")
+    print(f"python loop : {loop_time * 1000:8.3f} ms/frame")
+    print(f"vectorized  : {vectorized_time * 1000:8.3f} ms/frame")
+    print(f"speedup     : {loop_time / vectorized_time:8.1f}x")
+    print(f"identical   : {'yes' if mismatches == 0 else f'NO ({mismatches} frames differ)'}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
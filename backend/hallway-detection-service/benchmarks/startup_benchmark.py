@@ -0,0 +1,82 @@
+"""
+Measure cold-start time of the detection service.
+
+Starts the service with uvicorn in a fresh process, polls /health
+(liveness) and /ready (model loaded and warmed up), and reports how long
+each took along with the startup phases the service reports itself.
+Eureka must be reachable (or EUREKA_SERVER pointed at a stub) since the
+service registers on startup.
+
+Usage (from the service root):
+    python -m benchmarks.startup_benchmark --runs 3 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def wait_for(url, process, deadline):
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Service exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return json.loads(response.read() or b"{}")
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.05)
+    raise TimeoutError(f"{url} not available in time")
+
+
+def measure(port, timeout):
+    env = dict(os.environ, PORT=str(port))
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = start + timeout
+        wait_for(f"http://127.0.0.1:{port}/health", process, deadline)
+        live = time.monotonic() - start
+        ready_report = wait_for(f"http://127.0.0.1:{port}/ready", process, deadline)
+        ready = time.monotonic() - start
+    finally:
+        process.terminate()
+        process.wait(10)
+    return {"live_seconds": live, "ready_seconds": ready, "reported": ready_report.get("startup")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--timeout", type=float, default=300.0, help="seconds to wait for readiness")
+    parser.add_argument("--output", help="write the measurements as JSON to this file")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for run in range(args.runs):
+        result = measure(args.port, args.timeout)
+        runs.append(result)
+        print(f"run {run + 1}: live {result['live_seconds']:.2f}s, ready {result['ready_seconds']:.2f}s")
+
+    summary = {
+        "live_seconds": min(r["live_seconds"] for r in runs),
+        "ready_seconds": min(r["ready_seconds"] for r in runs),
+        "runs": runs,
+    }
+    print(f"best: live {summary['live_seconds']:.2f}s, ready {summary['ready_seconds']:.2f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,30 @@
+"""
+Watch one or more hallway cameras and report people by clothing colour.
+
+Sources come from a JSON config (see cameras.example.json) or --source
+arguments: webcam indexes, RTSP/HTTP stream URLs or video files. Each
+camera is read on its own thread and all cameras share batched YOLO
+inference. With no source at all, webcam 0 is used.
+
+Usage (from the service root):
+    python color_detection_with_person_detection.py --config cameras.json --display
+    python color_detection_with_person_detection.py --source recordings/ward2.mp4
+"""
+import argparse
+import os
+import threading
+
 import cv2
-import numpy as np
-import requests  # Import the requests library
 import logging  # Import the logging module
+from app.services.alert_dispatcher import AlertDispatcher, DEFAULT_NOTIFICATION_URL, DEFAULT_COALESCE_WINDOW
+from app.services.camera_state import CameraState
+from app.services.capture import load_sources
+from app.services.color_classifier import ColorClassifier
+from app.services.event_store import EventStore
+from app.services.model_registry import get_model_spec, ensure_model_files, load_detector
+from app.services.motion_gate import MotionGate
+from app.services.pipeline import CapturePipeline, DEFAULT_MAX_BATCH_SIZE
+from app.services.tracker import PersonTracker
 
 # Configure logging
 logging.basicConfig(
@@ -10,147 +33,123 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'  # Log format
 )
 
-# Load YOLO
-net = cv2.dnn.readNet("yolov3.weights", "yolov3.cfg")
-layer_names = net.getLayerNames()
-output_layers = [layer_names[i - 1] for i in net.getUnconnectedOutLayers().flatten()]
-
-print("Unconnected Out Layers:", output_layers)  # Debug print
-
-# Function to detect colors
-def detect_color(frame):
-    if frame is None or frame.size == 0:  # Check if the frame is empty
-        return "No Frame"
-
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-
-    # Define color ranges for blue
-    blue_lower = np.array([100, 150, 0])
-    blue_upper = np.array([140, 255, 255])
-    
-    # Define color ranges for green
-    green_lower = np.array([40, 100, 0])
-    green_upper = np.array([80, 255, 255])
-
-    # Create masks for blue and green
-    blue_mask = cv2.inRange(hsv, blue_lower, blue_upper)
-    green_mask = cv2.inRange(hsv, green_lower, green_upper)
-
-    if cv2.countNonZero(blue_mask) > 0:
-        return "Wearing Blue"
-    elif cv2.countNonZero(green_mask) > 0:
-        return "Wearing Green"
+DEFAULT_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "models")
+
+# Colours that trigger a notification
+NOTIFY_COLORS = ["Wearing Blue", "Wearing Green"]
+
+# Latest annotated frame per camera, shown by the main thread
+latest_frames = {}
+latest_frames_lock = threading.Lock()
+
+def handle_result(result, dispatcher, events, zones, display):
+    new_detections = [detection for detection in result.detections if detection["new_track"]]
+
+    # Record each new person once in the event store (query with event_query.py)
+    events.append(result.camera, zones[result.camera], new_detections)
+
+    for detection in new_detections:
+        # Send notification if wearing blue or green (queued, never waits on the network)
+        if dispatcher is not None and detection["color"] in NOTIFY_COLORS:
+            dispatcher.submit(detection["color"], zones[result.camera], detection["track_id"])
+
+    if display:
+        frame = result.frame.copy()
+        for detection in result.detections:
+            x, y, w, h = detection["box"]
+            # Draw bounding box
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            # Display the track ID and color label
+            cv2.putText(frame, f"#{detection['track_id']} {detection['color']}", (x, y - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+        with latest_frames_lock:
+            latest_frames[result.camera] = frame
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", help="JSON camera config")
+    parser.add_argument("--source", action="append", default=[], help="webcam index, stream URL or video file")
+    parser.add_argument("--model", default=os.getenv("DETECTION_MODEL", "yolov3"))
+    parser.add_argument("--input-size", type=int, default=int(os.getenv("DETECTION_INPUT_SIZE", "416")))
+    parser.add_argument("--models-dir", default=os.getenv("MODELS_DIR", DEFAULT_MODELS_DIR))
+    parser.add_argument("--registry", default=os.getenv("MODEL_REGISTRY_FILE"))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--no-motion-gate", action="store_true", help="run YOLO on every frame")
+    parser.add_argument("--display", action="store_true", help="show a window per camera")
+    parser.add_argument("--events-dir", default=os.getenv("EVENTS_DIR", "events"), help="detection event store")
+    parser.add_argument("--notification-url", default=os.getenv("NOTIFICATION_SERVICE_URL", DEFAULT_NOTIFICATION_URL))
+    parser.add_argument("--alert-email", default=os.getenv("ALERT_RECIPIENT_EMAIL"), help="recipient of the alerts")
+    parser.add_argument("--alert-window", type=float,
+                        default=float(os.getenv("ALERT_COALESCE_WINDOW", str(DEFAULT_COALESCE_WINDOW))),
+                        help="seconds during which repeated alerts for a colour and zone are merged")
+    args = parser.parse_args(argv)
+
+    sources = load_sources(args.config, args.source)
+    if not sources:
+        sources = load_sources(sources=[0])
+
+    # Load YOLO
+    spec = get_model_spec(args.model, args.registry)
+    ensure_model_files(spec, args.models_dir)
+    detector = load_detector(spec, args.models_dir, args.input_size)
+
+    # Track persons per camera; tracks expire once a person has left the view.
+    # Motion gating skips YOLO while the scene is static and reuses the previous boxes.
+    def new_state():
+        return CameraState(PersonTracker(max_distance=50, track_timeout=5.0),
+                           None if args.no_motion_gate else MotionGate())
+
+    # The notification service requires a recipient, so without one alerts are not sent at all
+    dispatcher = None
+    if args.alert_email:
+        dispatcher = AlertDispatcher(args.notification_url, args.alert_email, coalesce_window=args.alert_window)
     else:
-        return "Unknown"
-
-# Function to send notification to an API
-def send_notification(color_label):
-    url = "https://your-api-endpoint.com/notify"  # Replace with your API endpoint
-    data = {
-        "message": f"Detected a person wearing {color_label}."
-    }
+        print("No alert recipient configured (--alert-email / ALERT_RECIPIENT_EMAIL), alerts are disabled")
+    events = EventStore(args.events_dir)
+    zones = {source.name: source.zone for source in sources}
+    pipeline = CapturePipeline(
+        detector, sources, new_state, ColorClassifier(),
+        lambda result: handle_result(result, dispatcher, events, zones, args.display),
+        max_batch_size=args.batch_size
+    )
+    if dispatcher is not None:
+        dispatcher.start()
+    pipeline.start()
+    print(f"Watching {len(sources)} camera(s): {', '.join(source.name for source in sources)}")
+
     try:
-        response = requests.post(url, json=data)
-        if response.status_code == 200:
-            print("Notification sent successfully.")
-        else:
-            print("Failed to send notification:", response.status_code, response.text)
-    except Exception as e:
-        print("Error sending notification:", str(e))
-
-# Start video capture
-cap = cv2.VideoCapture(0)
-
-# Set to track detected persons
-detected_persons = []
-
-# Define a threshold for distance to consider the same person
-DISTANCE_THRESHOLD = 50  # Adjust this value as needed
-
-while True:
-    ret, frame = cap.read()
-    if not ret or frame is None or frame.size == 0:  # Check if frame is valid
-        print("Failed to capture frame")  # Debug message
-        break
-
-    # Detecting persons
-    height, width, _ = frame.shape
-    blob = cv2.dnn.blobFromImage(frame, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-    net.setInput(blob)
-    outputs = net.forward(output_layers)
-
-    boxes = []
-    confidences = []
-    class_ids = []
-
-    for output in outputs:
-        for detection in output:
-            scores = detection[5:]
-            class_id = np.argmax(scores)
-            confidence = scores[class_id]
-
-            if confidence > 0.5 and class_id == 0:  # Class ID 0 is for 'person'
-                center_x = int(detection[0] * width)
-                center_y = int(detection[1] * height)
-                w = int(detection[2] * width)
-                h = int(detection[3] * height)
-
-                # Create bounding box
-                x = int(center_x - w / 2)
-                y = int(center_y - h / 2)
-                boxes.append([x, y, w, h])
-                confidences.append(float(confidence))
-                class_ids.append(class_id)
-
-    # Apply Non-Maximum Suppression
-    indices = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
-
-    if len(indices) > 0:
-        for i in indices.flatten():  # Use flatten() to get a 1D array
-            box = boxes[i]
-            x, y, w, h = box
-
-            # Calculate the center of the bounding box
-            center_x = x + w // 2
-            center_y = y + h // 2
-
-            # Check if this person has already been detected
-            person_detected = False
-            for detected in detected_persons:
-                # Calculate the distance between the current and detected person
-                distance = np.sqrt((center_x - detected[0]) ** 2 + (center_y - detected[1]) ** 2)
-                if distance < DISTANCE_THRESHOLD:
-                    person_detected = True
-                    break
-
-            if not person_detected:
-                # Add the new detected person to the list
-                detected_persons.append((center_x, center_y))
-
-                # Draw bounding box
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-                # Crop the detected person
-                person_roi = frame[y:y + h, x:x + w]
-
-                # Detect color in the cropped region
-                color_label = detect_color(person_roi)
-
-                # Log the detected color
-                logging.info(f"Detected: {color_label} at coordinates: ({x}, {y}, {w}, {h})")
-
-                # Display the color label
-                cv2.putText(frame, color_label, (x, y - 10), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
-
-                # Send notification if wearing blue or green
-                if color_label in ["Wearing Blue", "Wearing Green"]:
-                    send_notification(color_label)
-
-    cv2.imshow('Video Feed', frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows() 
\ No newline at end of file
+        while pipeline.running:
+            if not args.display:
+                pipeline.join(0.5)
+                continue
+            # OpenCV windows must be driven from the main thread
+            with latest_frames_lock:
+                frames = dict(latest_frames)
+            for name, frame in frames.items():
+                cv2.imshow(name, frame)
+            if cv2.waitKey(30) & 0xFF == ord('q'):
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        if dispatcher is not None:
+            dispatcher.stop()
+        events.close()
+        if args.display:
+            cv2.destroyAllWindows()
+
+    stats = pipeline.stats()
+    print(f"{stats['batches']} batches, mean batch size {stats['mean_batch_size']}, "
+          f"mean inference {stats['mean_inference_ms']} ms")
+    for name, camera in stats["cameras"].items():
+        print(f"  {name}: read {camera['frames_read']}, dropped {camera['frames_dropped']}, "
+              f"inferred {camera['frames_inferred']}, skipped {camera['frames_skipped']}")
+    if dispatcher is not None:
+        alerts = dispatcher.stats()
+        print(f"Alerts: {alerts['sent']} sent, {alerts['coalesced']} coalesced, {alerts['dropped']} dropped, "
+              f"{alerts['failed']} failed")
+    print(f"Events: {events.appended} written to {args.events_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Count stored detection events by colour, camera, zone and time bucket.
+
+Times are ISO dates ("2026-10-17T20:00") or durations before now ("12h",
+"30m", "2d"). Buckets use the same duration syntax.
+
+Usage (from the service root):
+    python event_query.py --since 2026-10-17T20:00 --until 2026-10-18T06:00 --zone floor-2 --color "Wearing Green"
+    python event_query.py --since 24h --by color camera --bucket 1h
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from app.services.event_store import EventReader, LABEL_KINDS
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(value):
+    if value[-1:] in DURATION_UNITS:
+        return float(value[:-1]) * DURATION_UNITS[value[-1]]
+    return float(value)
+
+
+def parse_time(value):
+    if value is None:
+        return None
+    try:
+        return time.time() - parse_duration(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events-dir", default=os.getenv("EVENTS_DIR", "events"))
+    parser.add_argument("--since", help="start of the range (inclusive)")
+    parser.add_argument("--until", help="end of the range (exclusive)")
+    parser.add_argument("--camera", action="append", help="only these cameras")
+    parser.add_argument("--zone", action="append", help="only these zones")
+    parser.add_argument("--color", action="append", help='only these colours, e.g. "Wearing Green"')
+    parser.add_argument("--by", nargs="*", default=["color"], choices=LABEL_KINDS, help="group by these labels")
+    parser.add_argument("--bucket", help="also group by time bucket, e.g. 15m, 1h, 1d")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.events_dir):
+        print(f"No event store at {args.events_dir}", file=sys.stderr)
+        return 1
+
+    reader = EventReader(args.events_dir)
+    events = reader.query(
+        parse_time(args.since), parse_time(args.until),
+        cameras=args.camera, zones=args.zone, colors=args.color
+    )
+    bucket = parse_duration(args.bucket) if args.bucket else None
+    results = reader.aggregate(events, by=args.by, bucket=bucket)
+
+    if args.json:
+        print(json.dumps([dict(group, count=count) for group, count in results], indent=2))
+        return 0
+
+    columns = list(args.by) + (["bucket"] if bucket else [])
+    rows = [
+        [datetime.fromtimestamp(group[column]).isoformat(sep=" ", timespec="minutes") if column == "bucket"
+         else group[column] for column in columns] + [str(count)]
+        for group, count in results
+    ]
+    widths = [max([len(column)] + [len(row[i]) for row in rows]) for i, column in enumerate(columns + ["count"])]
+    for row in [columns + ["count"]] + rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+    print(f"{len(events)} events")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import asyncio
+
+from app.services.camera_state import CameraState, hold_cameras
+
+def test_hold_cameras_serialises_frames_of_one_camera():
+    state, other = CameraState(), CameraState()
+    events = []
+
+    async def frame(name, states):
+        async with hold_cameras(states):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    async def main():
+        # A batch naming one camera twice, another camera, and requests without a camera
+        await asyncio.gather(frame("first", [state, None, state]), frame("second", [other, state]),
+                             frame("unrelated", [None]))
+
+    asyncio.run(main())
+    assert events.index("first end") < events.index("second start")
+    assert events.index("unrelated start") < events.index("first end")
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+
+from app.services import event_store
+from app.services.event_store import INDEX_INTERVAL, RECORD_SIZE, EventReader, EventStore
+
+def _detection(i, color="Wearing Blue", new_track=True):
+    return {
+        "box": [10 * i, 20, 30, 60],
+        "color": color,
+        "confidence": 0.5,
+        "color_fraction": 0.25,
+        "track_id": i,
+        "new_track": new_track
+    }
+
+def _segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".bin"))
+
+def test_records_round_trip_with_labels(tmp_path):
+    store = EventStore(str(tmp_path))
+    store.append("cam-1", "Ward A", [_detection(1), _detection(2, "Wearing Green", new_track=False)], timestamp=100.0)
+    store.append("cam-2", "Ward B", [_detection(3)], timestamp=101.0)
+    store.append("cam-2", "Ward B", [], timestamp=102.0)
+    store.close()
+
+    reader = EventReader(str(tmp_path))
+    events = reader.query()
+    assert store.appended == len(events) == 3
+    assert os.path.getsize(tmp_path / _segments(tmp_path)[0]) == 3 * RECORD_SIZE
+    assert events["timestamp"].tolist() == [100.0, 100.0, 101.0]
+    assert [reader.labels["camera"][i] for i in events["camera"]] == ["cam-1", "cam-1", "cam-2"]
+    assert [reader.labels["color"][i] for i in events["color"]] == ["Wearing Blue", "Wearing Green", "Wearing Blue"]
+    assert events["track_id"].tolist() == [1, 2, 3]
+    assert events["box"][1].tolist() == [20, 20, 30, 60]
+    assert round(events["confidence"][0] / 65535, 4) == 0.5
+    assert round(events["color_fraction"][0] / 65535, 4) == 0.25
+
+    assert len(reader.query(cameras=["cam-2"])) == 1
+    assert len(reader.query(colors=["Wearing Green"])) == 1
+    assert len(reader.query(new_tracks_only=True)) == 2
+    assert reader.aggregate(events, by=("zone",), bucket=60) == [
+        ({"zone": "Ward A", "bucket": 60}, 2),
+        ({"zone": "Ward B", "bucket": 60}, 1)
+    ]
+
+def test_sparse_index_selects_only_matching_blocks(tmp_path):
+    store = EventStore(str(tmp_path))
+    # Three full index blocks, one per second, and a tail that is not indexed yet
+    for block in range(3):
+        for i in range(INDEX_INTERVAL // 8):
+            store.append("cam", "zone", [_detection(j) for j in range(8)], timestamp=block + i / (INDEX_INTERVAL // 8))
+    store.append("cam", "zone", [_detection(0)] * 10, timestamp=5.0)
+
+    reader = EventReader(str(tmp_path))
+    segment = str(tmp_path / _segments(tmp_path)[0])
+    tail = (3 * INDEX_INTERVAL, 3 * INDEX_INTERVAL + 10)
+    assert reader._segment_ranges(segment, 1.0, 2.0) == [(INDEX_INTERVAL, 2 * INDEX_INTERVAL), tail]
+    assert reader._segment_ranges(segment, 0.5, 2.5) == [(0, 3 * INDEX_INTERVAL), tail]
+    assert reader._segment_ranges(segment, 10.0, 11.0) == [tail]
+
+    events = reader.query(1.0, 2.0)
+    assert len(events) == INDEX_INTERVAL
+    assert events["timestamp"].min() >= 1.0 and events["timestamp"].max() < 2.0
+
+    # Closing indexes the partial tail block as well
+    store.close()
+    assert reader._segment_ranges(segment, 10.0, 11.0) == []
+    assert len(reader.query(5.0, 6.0)) == 10
+
+def test_torn_index_entry_is_ignored(tmp_path):
+    store = EventStore(str(tmp_path))
+    store.append("cam", "zone", [_detection(i) for i in range(INDEX_INTERVAL)], timestamp=1.0)
+    store.close()
+    segment = str(tmp_path / _segments(tmp_path)[0])
+    with open(segment[:-len(".bin")] + ".idx", "ab") as f:
+        f.write(np.array([2.0], dtype="<f8").tobytes())
+
+    assert EventReader(str(tmp_path))._segment_ranges(segment, 0.0, 10.0) == [(0, INDEX_INTERVAL)]
+
+def test_segments_rotate_and_old_ones_are_removed(tmp_path):
+    store = EventStore(str(tmp_path), max_segment_bytes=4 * RECORD_SIZE, max_segments=2)
+    # Rotation also happens partway through an append that shares one timestamp
+    store.append("cam", "zone", [_detection(i) for i in range(6)], timestamp=1.0)
+    store.append("cam", "zone", [_detection(i) for i in range(6, 10)], timestamp=2.0)
+    store.close()
+
+    segments = _segments(tmp_path)
+    assert len(segments) == 2
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".idx")) == [
+        name[:-len(".bin")] + ".idx" for name in segments
+    ]
+    assert all(os.path.getsize(tmp_path / name) <= 4 * RECORD_SIZE for name in segments)
+    assert EventReader(str(tmp_path)).query()["track_id"].tolist() == [4, 5, 6, 7, 8, 9]
+
+def test_store_reopened_appends_to_a_new_segment(tmp_path):
+    first = EventStore(str(tmp_path))
+    first.append("cam", "zone", [_detection(1)], timestamp=1.0)
+    first.close()
+    second = EventStore(str(tmp_path))
+    second.append("cam", "other zone", [_detection(2)], timestamp=1.0)
+    second.close()
+
+    reader = EventReader(str(tmp_path))
+    assert len(_segments(tmp_path)) == 2
+    assert reader.labels["zone"] == ["zone", "other zone"]
+    assert reader.query()["track_id"].tolist() == [1, 2]
+
+def test_query_opens_only_segments_overlapping_the_range(tmp_path, monkeypatch):
+    store = EventStore(str(tmp_path), max_segment_bytes=2 * RECORD_SIZE)
+    # Ten segments of two records, starting at 10, 20, ... 100; the last append
+    # rotates partway through, so two segments start at the same timestamp
+    for second in range(10, 100, 10):
+        store.append("cam", "zone", [_detection(second), _detection(second + 1)], timestamp=float(second))
+    store.append("cam", "zone", [_detection(100), _detection(101), _detection(102)], timestamp=100.0)
+    store.close()
+    segments = _segments(tmp_path)
+    assert len(segments) == 11
+
+    opened = []
+    memmap = np.memmap
+    monkeypatch.setattr(event_store.np, "memmap", lambda path, **kwargs: opened.append(os.path.basename(path))
+                        or memmap(path, **kwargs))
+    reader = EventReader(str(tmp_path))
+
+    assert reader.query(35.0, 55.0)["track_id"].tolist() == [40, 41, 50, 51]
+    assert opened == segments[2:5]
+
+    opened.clear()
+    # Starting exactly at a segment's start also opens the previous one, which may end on that timestamp
+    assert reader.query(100.0, 101.0)["track_id"].tolist() == [100, 101, 102]
+    assert opened == segments[8:]
+
+    opened.clear()
+    assert len(reader.query(200.0, 300.0)) == 0 and opened == segments[10:]
+    opened.clear()
+    assert len(reader.query(0.0, 10.0)) == 0 and opened == []
+
@@ -0,0 +1,59 @@
+import itertools
+
+import numpy as np
+
+from app.services.tracker import PersonTracker, box_iou, linear_assignment
+
+def _brute_force_cost(cost):
+    rows, columns = cost.shape
+    if rows <= columns:
+        return min(sum(cost[r, c] for r, c in zip(range(rows), perm))
+                   for perm in itertools.permutations(range(columns), rows))
+    return _brute_force_cost(cost.T)
+
+def test_linear_assignment_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for rows, columns in [(1, 1), (3, 3), (2, 5), (5, 2), (4, 6), (6, 6)]:
+        for _ in range(20):
+            cost = rng.integers(0, 10, (rows, columns)).astype(np.float64)
+            pairs = linear_assignment(cost)
+            assert len(pairs) == min(rows, columns)
+            assert len({r for r, _ in pairs}) == len({c for _, c in pairs}) == len(pairs)
+            assert sum(cost[r, c] for r, c in pairs) == _brute_force_cost(cost)
+
+def test_linear_assignment_empty_matrix():
+    assert linear_assignment(np.zeros((0, 3))) == []
+    assert linear_assignment(np.zeros((3, 0))) == []
+
+def test_box_iou():
+    iou = box_iou([0, 0, 10, 10], [[0, 0, 10, 10], [5, 0, 10, 10], [20, 20, 5, 5], [0, 0, 0, 0]])
+    assert iou.tolist() == [1.0, 50 / 150, 0.0, 0.0]
+
+def test_tracker_keeps_ids_of_moving_people():
+    tracker = PersonTracker(max_distance=50)
+    assert tracker.update([[0, 0, 40, 100], [300, 0, 40, 100]], timestamp=0.0) == [(1, True), (2, True)]
+    # Input order changes and both people move; ids follow the people
+    assert tracker.update([[310, 5, 40, 100], [8, 3, 40, 100]], timestamp=0.1) == [(2, False), (1, False)]
+    assert tracker.update([[600, 0, 40, 100]], timestamp=0.2) == [(3, True)]
+
+def test_tracker_assignment_is_optimal_not_greedy():
+    tracker = PersonTracker(iou_threshold=0.9, max_distance=100)
+    tracker.update([[0, 0, 20, 20], [60, 0, 20, 20]], timestamp=0.0)
+    # Greedily, the first box would take the nearer track 2 and leave the second box
+    # beyond max_distance of track 1, starting a new track
+    assert tracker.update([[35, 0, 20, 20], [110, 0, 20, 20]], timestamp=0.1) == [(1, False), (2, False)]
+
+def test_tracker_expires_tracks_after_timeout():
+    tracker = PersonTracker(track_timeout=5.0)
+    tracker.update([[0, 0, 40, 100]], timestamp=0.0)
+    assert tracker.update([[0, 0, 40, 100]], timestamp=4.0) == [(1, False)]
+    assert tracker.update([[0, 0, 40, 100]], timestamp=9.5) == [(2, True)]
+    assert list(tracker.tracks) == [2]
+    assert tracker.update([], timestamp=20.0) == []
+    assert tracker.tracks == {} and tracker._grid == {}
+
+def test_tracker_grid_finds_tracks_across_cells():
+    tracker = PersonTracker(max_distance=30, cell_size=10)
+    tracker.update([[0, 0, 20, 40]], timestamp=0.0)
+    assert tracker.update([[25, 0, 20, 40]], timestamp=0.1) == [(1, False)]
+    assert tracker.update([[200, 0, 20, 40]], timestamp=0.2) == [(2, True)]
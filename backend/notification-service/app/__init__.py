@@ -11,5 +11,17 @@ load_dotenv()
 DEFAULT_CONFIG = {
     "EMAIL_ENABLED": os.getenv("EMAIL_ENABLED", "true").lower() == "true",
     "SMS_ENABLED": os.getenv("SMS_ENABLED", "true").lower() == "true",
-    "DEFAULT_PRIORITY": "normal"
+    "DEFAULT_PRIORITY": "normal",
+    # Stockage des notifications : URL SQLAlchemy (ex. sqlite:///notifications.db), sinon en mémoire.
+    # Requis pour que la file d'envoi survive aux redémarrages : en mémoire, les notifications en attente sont perdues
+    "NOTIFICATION_STORE_URL": os.getenv("NOTIFICATION_STORE_URL", ""),
+    "NOTIFICATION_MAX_ITEMS": int(os.getenv("NOTIFICATION_MAX_ITEMS", "100000")),
+    "NOTIFICATION_RETENTION_DAYS": float(os.getenv("NOTIFICATION_RETENTION_DAYS", "30")),
+    # File d'envoi : workers généraux, workers réservés aux urgences, taille maximale d'un résumé
+    "DISPATCH_WORKERS": int(os.getenv("DISPATCH_WORKERS", "4")),
+    "DISPATCH_URGENT_WORKERS": int(os.getenv("DISPATCH_URGENT_WORKERS", "1")),
+    "DISPATCH_MAX_DIGEST_SIZE": int(os.getenv("DISPATCH_MAX_DIGEST_SIZE", "20")),
+    # Envoi groupé : taille maximale d'une requête, et taille à partir de laquelle la réponse est diffusée en NDJSON
+    "BULK_MAX_NOTIFICATIONS": int(os.getenv("BULK_MAX_NOTIFICATIONS", "10000")),
+    "BULK_STREAM_THRESHOLD": int(os.getenv("BULK_STREAM_THRESHOLD", "1000"))
 }
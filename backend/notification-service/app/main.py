@@ -1,12 +1,18 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import Optional, List
+from collections import Counter
+import json
+import re
 from datetime import datetime
 import py_eureka_client.eureka_client as eureka_client
 from app import DEFAULT_CONFIG
 from app.services.email_service import email_service
+from app.services.notification_store import MemoryNotificationStore, create_store, new_notification_id
+from app.services.dispatch_queue import DispatchQueue
+from app.services.status_feed import StatusFeed
 import logging
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import os
 from dotenv import load_dotenv
@@ -45,20 +51,119 @@ class NotificationResponse(BaseModel):
     notification_id: str
     status: str
     timestamp: str
+    version: Optional[int] = None  # incrémentée à chaque changement de statut
 
-# Base fictive pour stocker les notifications
-notifications_db = []
-sent_emails = []  # Nouvelle liste pour stocker les emails envoyés
+class BulkRecipient(BaseModel):
+    recipient_email: str
+    params: Optional[dict] = None  # valeurs des {champs} du modèle de message
+    metadata: Optional[dict] = None
+
+class NotificationTemplate(BaseModel):
+    message: str
+    notification_type: str
+    priority: str = DEFAULT_CONFIG["DEFAULT_PRIORITY"]
+    metadata: Optional[dict] = None
+
+class BulkNotificationRequest(BaseModel):
+    # Soit des notifications complètes, soit un modèle et une liste de destinataires
+    notifications: Optional[List[NotificationBase]] = None
+    template: Optional[NotificationTemplate] = None
+    recipients: Optional[List[BulkRecipient]] = None
+
+class BulkNotificationResult(BaseModel):
+    recipient_email: str
+    notification_id: str
+
+class BulkNotificationResponse(BaseModel):
+    count: int
+    status: str
+    notifications: List[BulkNotificationResult]
+
+class NotificationPage(BaseModel):
+    items: List[NotificationResponse]
+    next_cursor: Optional[int] = None  # None : dernière page
+    next_since: Optional[int] = None  # avec `since` : valeur à repasser pour les changements suivants
+
+class SentEmailPage(BaseModel):
+    items: List[dict]
+    next_cursor: Optional[int] = None
+    next_since: Optional[int] = None
+
+# Stockage des notifications et des emails envoyés, borné en taille et en durée
+notification_store = create_store(
+    DEFAULT_CONFIG["NOTIFICATION_STORE_URL"],
+    max_items=DEFAULT_CONFIG["NOTIFICATION_MAX_ITEMS"],
+    retention_seconds=DEFAULT_CONFIG["NOTIFICATION_RETENTION_DAYS"] * 24 * 3600
+)
+
+# Changements de statut diffusés en direct (Server-Sent Events)
+status_feed = StatusFeed()
+
+def set_status(notification_id: str, status: str):
+    notification = notification_store.update_status(notification_id, status)
+    if notification:
+        status_feed.publish(notification)
+
+def digest_key(notification: dict):
+    # Seuls les emails normaux d'un même destinataire et d'un même service sont regroupés,
+    # le sujet du résumé nommant le service ; les urgents partent seuls
+    if notification["notification_type"] == "email" and notification["priority"] != "urgent":
+        return notification["recipient_email"], (notification["metadata"] or {}).get("department")
+    return None
+
+async def dispatch_notifications(notifications: List[dict]):
+    if notifications[0]["notification_type"] == "email":
+        await send_email_notification(notifications)
+    else:
+        for notification in notifications:
+            success = await send_sms_notification(notification)
+            # Sans mise à jour du statut, la notification resterait "queued" et serait renvoyée à chaque redémarrage
+            set_status(notification["notification_id"], "sent" if success else "failed")
+
+# File d'envoi par priorité, remplace les BackgroundTasks
+dispatch_queue = DispatchQueue(
+    dispatch_notifications,
+    workers=DEFAULT_CONFIG["DISPATCH_WORKERS"],
+    urgent_workers=DEFAULT_CONFIG["DISPATCH_URGENT_WORKERS"],
+    max_digest_size=DEFAULT_CONFIG["DISPATCH_MAX_DIGEST_SIZE"],
+    coalesce_key=digest_key
+)
+
+@app.on_event("startup")
+async def start_dispatch():
+    if isinstance(notification_store, MemoryNotificationStore):
+        logger.warning("Stockage en mémoire : les notifications en attente seront perdues au redémarrage "
+                       "(définir NOTIFICATION_STORE_URL pour les conserver)")
+    # Soumettre à nouveau les notifications restées en attente avant l'arrêt
+    recovered = 0
+    cursor = 0
+    while cursor is not None:
+        notifications, cursor = notification_store.list(cursor, 1000, status="queued")
+        for notification in notifications:
+            dispatch_queue.submit(notification, enqueued_at=datetime.fromisoformat(notification["timestamp"]).timestamp())
+        recovered += len(notifications)
+    if recovered:
+        logger.info(f"{recovered} notification(s) en attente soumise(s) à nouveau")
+    await dispatch_queue.start()
+
+@app.on_event("shutdown")
+async def stop_dispatch():
+    await dispatch_queue.stop()
 
 @app.get("/")
 async def root():
     return {"message": "Notification Service is running"}
 
+TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+
 @app.post("/api/v1/notifications", response_model=NotificationResponse)
-async def send_notification(notification: NotificationBase, background_tasks: BackgroundTasks):
+async def send_notification(notification: NotificationBase):
     try:
+        if notification.notification_type not in ("email", "sms"):
+            raise HTTPException(status_code=400, detail="Type de notification non supporté")
+
         # Générer un ID unique pour la notification
-        notification_id = f"notif_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        notification_id = new_notification_id()
         
         # Créer une notification avec la structure souhaitée
         notification_entry = {
@@ -72,16 +177,12 @@ async def send_notification(notification: NotificationBase, background_tasks: Ba
             "timestamp": datetime.now().isoformat()
         }
         
-        # Ajouter la notification à la base fictive
-        notifications_db.append(notification_entry)
+        # Enregistrer la notification
+        notification_store.add(notification_entry)
+        status_feed.publish(notification_entry)
         
-        # Ajouter la tâche d'envoi à la file d'attente
-        if notification.notification_type == "email":
-            background_tasks.add_task(send_email_notification, notification)
-        elif notification.notification_type == "sms":
-            background_tasks.add_task(send_sms_notification, notification)
-        else:
-            raise HTTPException(status_code=400, detail="Type de notification non supporté")
+        # Ajouter la notification à la file d'envoi
+        dispatch_queue.submit(notification_entry)
 
         return NotificationResponse(
             recipient_email=notification.recipient_email,
@@ -91,70 +192,204 @@ async def send_notification(notification: NotificationBase, background_tasks: Ba
             metadata=notification.metadata,
             notification_id=notification_id,
             status="queued",
-            timestamp=datetime.now().isoformat()
+            timestamp=notification_entry["timestamp"]
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def send_email_notification(notification: NotificationBase):
+def expand_bulk_request(request: BulkNotificationRequest) -> List[dict]:
+    """
+    Notifications d'une requête groupée, validées en une passe : toutes les
+    erreurs sont renvoyées ensemble (422) et rien n'est enregistré.
+    """
+    provided = (request.notifications is not None, request.template is not None, request.recipients is not None)
+    if provided not in ((True, False, False), (False, True, True)):
+        raise HTTPException(status_code=422, detail="Fournir soit 'notifications', soit 'template' et 'recipients'")
+    items = request.notifications if request.notifications is not None else request.recipients
+    if not items:
+        raise HTTPException(status_code=422, detail="La requête groupée ne contient aucune notification")
+    if len(items) > DEFAULT_CONFIG["BULK_MAX_NOTIFICATIONS"]:
+        raise HTTPException(status_code=413, detail=f"Au plus {DEFAULT_CONFIG['BULK_MAX_NOTIFICATIONS']} notifications par requête")
+
+    errors = []
+    if request.notifications is not None:
+        notifications = [notification.model_dump() for notification in request.notifications]
+    else:
+        template = request.template
+        notifications = []
+        for index, recipient in enumerate(request.recipients):
+            params = recipient.params or {}
+            try:
+                message = TEMPLATE_FIELD.sub(lambda match: str(params[match.group(1)]), template.message)
+            except KeyError as e:
+                message = None
+                errors.append({"index": index, "error": f"Paramètre manquant dans le modèle : {e.args[0]}"})
+            notifications.append({
+                "recipient_email": recipient.recipient_email,
+                "message": message,
+                "notification_type": template.notification_type,
+                "priority": template.priority,
+                "metadata": dict(template.metadata or {}, **(recipient.metadata or {})) or None
+            })
+
+    errors += [
+        {"index": index, "error": "Type de notification non supporté"}
+        for index, notification in enumerate(notifications)
+        if notification["notification_type"] not in ("email", "sms")
+    ]
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return notifications
+
+@app.post("/api/v1/notifications/bulk", response_model=BulkNotificationResponse)
+async def send_bulk_notifications(request: BulkNotificationRequest, stream: Optional[bool] = None):
+    """
+    Envoyer un lot de notifications en une requête : validées ensemble, enregistrées
+    en une transaction et mises en file d'un bloc. Les IDs par destinataire sont
+    renvoyés en JSON, ou diffusés en NDJSON (une ligne par notification) pour les
+    grands lots ou avec `stream=true`.
+    """
+    notifications = expand_bulk_request(request)
+
+    timestamp = datetime.now().isoformat()
+    for notification in notifications:
+        notification.update(notification_id=new_notification_id(), status="queued", timestamp=timestamp)
+    notification_store.add_many(notifications)
+    for notification in notifications:
+        dispatch_queue.submit(notification)
+        status_feed.publish(notification)
+
+    if stream is None:
+        stream = len(notifications) >= DEFAULT_CONFIG["BULK_STREAM_THRESHOLD"]
+    if stream:
+        def ndjson_lines():
+            for start in range(0, len(notifications), 500):
+                yield "".join(
+                    json.dumps({
+                        "recipient_email": notification["recipient_email"],
+                        "notification_id": notification["notification_id"],
+                        "status": "queued"
+                    }) + "\n"
+                    for notification in notifications[start:start + 500]
+                )
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    return BulkNotificationResponse(
+        count=len(notifications),
+        status="queued",
+        notifications=[BulkNotificationResult(
+            recipient_email=notification["recipient_email"],
+            notification_id=notification["notification_id"]
+        ) for notification in notifications]
+    )
+
+def build_email(notifications: List[dict]):
+    """Sujet et contenu d'un email ; plusieurs notifications forment un résumé, les messages répétés comptés une fois."""
+    first = notifications[0]
+    subject = f"Notification {first['priority']} - {(first['metadata'] or {}).get('department', '')}"
+    if len(notifications) == 1:
+        return subject, first["message"]
+    counts = Counter(notification["message"] for notification in notifications)
+    message = "".join(
+        f"<p>{text}</p>" if count == 1 else f"<p>{text} (x{count})</p>" for text, count in counts.items()
+    )
+    return f"{subject} ({len(notifications)} notifications)", message
+
+async def send_email_notification(notifications: List[dict]):
+    notification_ids = [notification["notification_id"] for notification in notifications]
     try:
-        # Construire le sujet de l'email
-        subject = f"Notification {notification.priority} - {notification.metadata.get('department', '')}"
+        # Construire le sujet et le contenu de l'email
+        subject, message = build_email(notifications)
         
         # Utiliser le service email existant
         success = await email_service.send_email(
-            recipient_email=notification.recipient_email,
+            recipient_email=notifications[0]["recipient_email"],
             subject=subject,
-            message=notification.message
+            message=message
         )
         
-        # Mettre à jour le statut dans la base de données
-        for notif in notifications_db:
-            if notif["recipient_email"] == notification.recipient_email:
-                notif["status"] = "sent" if success else "failed"
-        
-        # Ajouter l'email envoyé à la liste
-        sent_emails.append({
-            "recipient_email": notification.recipient_email,
-            "subject": subject,
-            "message": notification.message,
-            "status": "sent" if success else "failed",
-            "timestamp": datetime.now().isoformat()
-        })
+        for notification_id in notification_ids:
+            # Mettre à jour le statut de chaque notification envoyée
+            set_status(notification_id, "sent" if success else "failed")
+            
+            # Enregistrer l'email envoyé
+            notification_store.add_sent_email({
+                "notification_id": notification_id,
+                "recipient_email": notifications[0]["recipient_email"],
+                "subject": subject,
+                "message": message,
+                "status": "sent" if success else "failed",
+                "timestamp": datetime.now().isoformat()
+            })
         
         return success
     except Exception as e:
         logger.error(f"Erreur d'envoi d'email: {str(e)}")
+        for notification_id in notification_ids:
+            set_status(notification_id, "failed")
         return False
 
-async def send_sms_notification(notification: NotificationBase):
+async def send_sms_notification(notification: dict) -> bool:
     # TODO: Implémenter l'envoi de SMS
-    pass
+    logger.warning(f"Envoi de SMS non implémenté, notification {notification['notification_id']} marquée en échec")
+    return False
 
-@app.get("/api/v1/notifications", response_model=List[NotificationResponse])
-async def get_all_notifications():
+@app.get("/api/v1/notifications", response_model=NotificationPage)
+async def get_all_notifications(
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    recipient_email: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0)
+):
     """
-    Récupérer toutes les notifications enregistrées.
+    Récupérer les notifications enregistrées, page par page dans l'ordre d'arrivée.
+    Passer `next_cursor` comme `cursor` pour obtenir la page suivante.
+
+    Avec `since`, seules les notifications créées ou modifiées après cette
+    version sont renvoyées, dans l'ordre des changements : un client commence
+    avec since=0, puis repasse `next_since` (tant que `next_cursor` n'est pas
+    nul, il reste des changements à lire).
     """
-    return [NotificationResponse(
-        recipient_email=notif["recipient_email"],
-        message=notif["message"],
-        notification_type=notif["notification_type"],
-        priority=notif["priority"],
-        metadata=notif["metadata"],
-        notification_id=notif["notification_id"],
-        status=notif["status"],
-        timestamp=notif["timestamp"]
-    ) for notif in notifications_db]
+    if since is None:
+        items, next_cursor = notification_store.list(cursor, limit, recipient_email=recipient_email, status=status)
+        return NotificationPage(items=[NotificationResponse(**notif) for notif in items], next_cursor=next_cursor)
+
+    items, next_cursor = notification_store.changes(since, limit)
+    next_since = items[-1]["version"] if items else since
+    items = [
+        notif for notif in items
+        if (recipient_email is None or notif["recipient_email"] == recipient_email)
+        and (status is None or notif["status"] == status)
+    ]
+    return NotificationPage(items=[NotificationResponse(**notif) for notif in items],
+                            next_cursor=next_cursor, next_since=next_since)
+
+@app.get("/api/v1/notifications/stream")
+async def stream_notification_status(request: Request, since: Optional[int] = Query(None, ge=0)):
+    """
+    Flux Server-Sent Events des changements de statut (queued, sent, failed).
+    Avec `since` (ou l'en-tête Last-Event-ID d'un EventSource qui se reconnecte),
+    les changements manqués sont envoyés d'abord.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        status_feed.events(since, notification_store.changes),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/v1/notifications/{notification_id}", response_model=NotificationResponse)
 async def get_notification_status(notification_id: str):
     """
     Récupérer les détails d'une notification spécifique par ID.
     """
-    # Rechercher la notification par ID dans la base fictive
-    notification = next((notif for notif in notifications_db if notif["notification_id"] == notification_id), None)
+    notification = notification_store.get(notification_id)
     if not notification:
         raise HTTPException(status_code=404, detail="Notification introuvable")
     return NotificationResponse(**notification)
@@ -164,6 +399,24 @@ async def get_index():
     with open("index.html") as f:
         return f.read()
 
-@app.get("/api/v1/sent-emails", response_model=List[dict])
-async def get_sent_emails():
-    return sent_emails  # Retourner la liste des emails envoyés
+@app.get("/api/v1/sent-emails", response_model=SentEmailPage)
+async def get_sent_emails(
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    since: Optional[int] = Query(None, ge=0)
+):
+    """
+    Emails envoyés, dans l'ordre d'envoi. Chaque email porte son `seq` ; avec
+    `since`, seuls les emails postérieurs sont renvoyés et `next_since` est à
+    repasser à l'appel suivant.
+    """
+    items, next_cursor = notification_store.list_sent_emails(cursor if since is None else since, limit)
+    next_since = None if since is None else (items[-1]["seq"] if items else since)
+    return SentEmailPage(items=items, next_cursor=next_cursor, next_since=next_since)
+
+@app.get("/api/v1/dispatch/stats")
+async def get_dispatch_stats():
+    """
+    État de la file d'envoi : attente par priorité et temps d'attente (p50/p95/max) avant envoi.
+    """
+    return dispatch_queue.stats()
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("urgent", "normal")
+DEFAULT_WORKERS = 4
+# Workers réservés aux notifications urgentes, libres même pendant une rafale de notifications normales
+DEFAULT_URGENT_WORKERS = 1
+DEFAULT_MAX_DIGEST_SIZE = 20
+# Nombre de temps d'attente conservés par priorité pour les percentiles
+LATENCY_WINDOW = 1000
+
+
+class _QueuedItem:
+    __slots__ = ("notification", "enqueued_at", "coalesce_key", "taken")
+
+    def __init__(self, notification: dict, enqueued_at: float, coalesce_key):
+        self.notification = notification
+        self.enqueued_at = enqueued_at
+        self.coalesce_key = coalesce_key
+        self.taken = False
+
+
+class DispatchQueue:
+    """
+    File d'envoi des notifications, par priorité.
+
+    Une file FIFO par priorité : un worker libre prend toujours une
+    notification urgente avant une normale, et `urgent_workers` workers ne
+    prennent que des urgentes, pour qu'une alerte n'attende jamais derrière
+    des envois normaux en cours.
+
+    Quand une notification est prise, les autres notifications en attente de
+    même `coalesce_key` (par exemple les emails normaux d'un même
+    destinataire) partent avec elle, en un seul envoi de type résumé : en cas
+    d'embouteillage, un destinataire reçoit un email au lieu de dix.
+
+    La file ne persiste rien elle-même : les notifications sont enregistrées
+    "queued" dans le stockage avant d'être soumises, et celles qui le sont
+    encore au redémarrage sont soumises à nouveau.
+    """
+
+    def __init__(self, handler: Callable[[List[dict]], Awaitable[None]], workers: int = DEFAULT_WORKERS,
+                 urgent_workers: int = DEFAULT_URGENT_WORKERS, max_digest_size: int = DEFAULT_MAX_DIGEST_SIZE,
+                 coalesce_key: Optional[Callable[[dict], object]] = None):
+        self.handler = handler
+        self.workers = workers
+        self.urgent_workers = urgent_workers
+        self.max_digest_size = max_digest_size
+        self.coalesce_key = coalesce_key or (lambda notification: None)
+        self._queues: Dict[str, deque] = {priority: deque() for priority in PRIORITIES}
+        self._by_key: Dict[object, deque] = {}
+        self._pending = {priority: 0 for priority in PRIORITIES}
+        self._available = None
+        self._tasks = []
+        self._latencies = {priority: deque(maxlen=LATENCY_WINDOW) for priority in PRIORITIES}
+        self._counters = {priority: {"submitted": 0, "dispatched": 0, "coalesced": 0} for priority in PRIORITIES}
+        self.failed_batches = 0
+
+    @staticmethod
+    def priority_of(notification: dict) -> str:
+        return "urgent" if notification.get("priority") == "urgent" else "normal"
+
+    def submit(self, notification: dict, enqueued_at: Optional[float] = None) -> None:
+        priority = self.priority_of(notification)
+        key = self.coalesce_key(notification)
+        item = _QueuedItem(notification, time.time() if enqueued_at is None else enqueued_at, key)
+        self._queues[priority].append(item)
+        if key is not None:
+            self._by_key.setdefault(key, deque()).append(item)
+        self._counters[priority]["submitted"] += 1
+        self._pending[priority] += 1
+        if self._available is not None:
+            self._available.set()
+
+    async def start(self) -> None:
+        self._available = asyncio.Event()
+        if self.pending():
+            self._available.set()
+        self._tasks = [
+            asyncio.ensure_future(self._worker(urgent_only=i < self.urgent_workers))
+            for i in range(self.urgent_workers + self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._available = None
+
+    def pending(self, priority: Optional[str] = None) -> int:
+        if priority is None:
+            return sum(self._pending.values())
+        return self._pending[priority]
+
+    def _mark_taken(self, item: _QueuedItem) -> None:
+        item.taken = True
+        self._pending[self.priority_of(item.notification)] -= 1
+
+    def _take(self, urgent_only: bool) -> Optional[List[_QueuedItem]]:
+        for priority in (("urgent",) if urgent_only else PRIORITIES):
+            queue = self._queues[priority]
+            while queue:
+                item = queue.popleft()
+                if not item.taken:
+                    return self._collect(item)
+        return None
+
+    def _collect(self, item: _QueuedItem) -> List[_QueuedItem]:
+        """L'élément pris et les autres éléments en attente de même clé."""
+        batch = [item]
+        self._mark_taken(item)
+        if item.coalesce_key is None:
+            return batch
+        pending = self._by_key[item.coalesce_key]
+        while pending and len(batch) < self.max_digest_size:
+            other = pending.popleft()
+            if not other.taken:
+                self._mark_taken(other)
+                batch.append(other)
+        # Retirer de l'index les éléments déjà pris par ailleurs
+        while pending and pending[0].taken:
+            pending.popleft()
+        if not pending:
+            del self._by_key[item.coalesce_key]
+        return batch
+
+    async def _worker(self, urgent_only: bool) -> None:
+        while True:
+            batch = self._take(urgent_only)
+            if batch is None:
+                self._available.clear()
+                await self._available.wait()
+                continue
+            now = time.time()
+            for item in batch:
+                priority = self.priority_of(item.notification)
+                self._latencies[priority].append(now - item.enqueued_at)
+                self._counters[priority]["dispatched"] += 1
+            self._counters[self.priority_of(batch[0].notification)]["coalesced"] += len(batch) - 1
+            # Réveiller un autre worker s'il reste du travail
+            if self.pending():
+                self._available.set()
+            try:
+                await self.handler([item.notification for item in batch])
+            except Exception as e:
+                self.failed_batches += 1
+                logger.error(f"Erreur lors de l'envoi de {len(batch)} notification(s): {str(e)}")
+
+    def stats(self) -> dict:
+        priorities = {}
+        for priority in PRIORITIES:
+            latencies = sorted(self._latencies[priority])
+            priorities[priority] = dict(
+                self._counters[priority],
+                pending=self.pending(priority),
+                wait_ms={
+                    "p50": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+                    "max": round(latencies[-1] * 1000, 1) if latencies else None,
+                },
+            )
+        return {
+            "workers": self.workers,
+            "urgent_workers": self.urgent_workers,
+            "running": bool(self._tasks),
+            "failed_batches": self.failed_batches,
+            "priorities": priorities,
+        }
@@ -1,7 +1,14 @@
 import os
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
+import urllib3
 import logging
 
 # Configuration du logging
@@ -11,32 +18,217 @@ logger = logging.getLogger(__name__)
 # Chargement des variables d'environnement
 load_dotenv()
 
-class EmailService:
-    def __init__(self):
-        self.configuration = sib_api_v3_sdk.Configuration()
-        self.configuration.api_key['api-key'] = os.getenv("BREVO_API_KEY")
-        
-    async def send_email(self, recipient_email: str, subject: str, message: str) -> bool:
-        try:
-            api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(self.configuration))
-            
-            sender = {"name": "Notification Service", "email": os.getenv("SENDER_EMAIL")}
-            to = [{"email": recipient_email}]
-            
+# Transport : "brevo" (API Brevo) ou "stub" (local, pour les tests de charge hors ligne)
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "brevo")
+EMAIL_STUB_LATENCY = float(os.getenv("EMAIL_STUB_LATENCY", "0.05"))
+# Appels simultanés au fournisseur
+EMAIL_MAX_WORKERS = int(os.getenv("EMAIL_MAX_WORKERS", "4"))
+# Appels par seconde autorisés par le quota du fournisseur, et rafale tolérée
+EMAIL_RATE_LIMIT = float(os.getenv("EMAIL_RATE_LIMIT", "10"))
+EMAIL_RATE_BURST = int(os.getenv("EMAIL_RATE_BURST", "10"))
+# Regroupement des emails de même contenu : attente maximale et taille d'un lot
+EMAIL_BATCH_WINDOW = float(os.getenv("EMAIL_BATCH_WINDOW", "0.05"))
+EMAIL_MAX_BATCH_SIZE = int(os.getenv("EMAIL_MAX_BATCH_SIZE", "100"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+EMAIL_BACKOFF = float(os.getenv("EMAIL_BACKOFF", "0.5"))
+EMAIL_MAX_BACKOFF = 30.0
+
+
+class TransientEmailError(Exception):
+    """Échec temporaire du fournisseur (quota, erreur serveur, réseau) : l'envoi peut être retenté."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BrevoTransport:
+    """
+    Envoi via l'API transactionnelle Brevo, avec un seul client (et son pool
+    de connexions) réutilisé pour tous les envois. Un lot de destinataires
+    part en un seul appel grâce aux `message_versions`.
+    """
+
+    def __init__(self, pool_size: int = EMAIL_MAX_WORKERS):
+        configuration = sib_api_v3_sdk.Configuration()
+        configuration.api_key['api-key'] = os.getenv("BREVO_API_KEY")
+        configuration.connection_pool_maxsize = pool_size
+        self.api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+        self.sender = {"name": "Notification Service", "email": os.getenv("SENDER_EMAIL")}
+
+    def send(self, recipients: List[str], subject: str, message: str) -> None:
+        if len(recipients) == 1:
             send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-                to=to,
+                to=[{"email": recipients[0]}],
                 html_content=message,
-                sender=sender,
+                sender=self.sender,
                 subject=subject
             )
-            
-            api_response = api_instance.send_transac_email(send_smtp_email)
-            logger.info(f"Email envoyé avec succès à {recipient_email}")
-            return True
-                
+        else:
+            send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
+                message_versions=[{"to": [{"email": recipient}]} for recipient in recipients],
+                html_content=message,
+                sender=self.sender,
+                subject=subject
+            )
+        try:
+            self.api_instance.send_transac_email(send_smtp_email)
         except ApiException as e:
-            logger.error(f"Erreur lors de l'envoi de l'email à {recipient_email}: {str(e)}")
-            return False
+            if e.status == 429 or (e.status or 0) >= 500:
+                retry_after = (e.headers or {}).get("Retry-After")
+                raise TransientEmailError(str(e), float(retry_after) if retry_after else None) from e
+            raise
+        except urllib3.exceptions.HTTPError as e:
+            raise TransientEmailError(str(e)) from e
+
+
+class StubTransport:
+    """Transport local : simule la latence du fournisseur et compte les envois, sans réseau."""
+
+    def __init__(self, latency: float = EMAIL_STUB_LATENCY):
+        self.latency = latency
+        self.calls = 0
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def send(self, recipients: List[str], subject: str, message: str) -> None:
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            self.sent += len(recipients)
+
+
+def create_transport(name: str = EMAIL_TRANSPORT):
+    if name == "stub":
+        return StubTransport()
+    if name == "brevo":
+        return BrevoTransport()
+    raise ValueError(f"Transport email inconnu : {name}")
+
+
+class RateLimiter:
+    """
+    Seau à jetons par réservation : chaque appel réserve un jeton et attend
+    le temps nécessaire pour rester sous `rate` appels par seconde.
+    """
+
+    def __init__(self, rate: float = EMAIL_RATE_LIMIT, burst: int = EMAIL_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Réserve un jeton ; renvoie le délai d'attente avant de l'utiliser."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class EmailService:
+    """
+    Canal email non bloquant.
+
+    Les appels au fournisseur tournent dans un pool de `max_workers` threads,
+    jamais sur la boucle d'événements. Les emails de même sujet et même
+    contenu demandés dans la même fenêtre (`batch_window`) partent en un seul
+    appel, jusqu'à `max_batch_size` destinataires. Chaque appel passe par le
+    limiteur de débit ; les échecs temporaires sont retentés avec un délai
+    exponentiel (ou le Retry-After du fournisseur). Si le fournisseur refuse
+    un lot (par exemple une adresse invalide), chaque destinataire est
+    renvoyé seul, pour que seul l'email fautif soit en échec.
+    """
+
+    def __init__(self, transport=None, max_workers: int = EMAIL_MAX_WORKERS, rate_limiter: RateLimiter = None,
+                 batch_window: float = EMAIL_BATCH_WINDOW, max_batch_size: int = EMAIL_MAX_BATCH_SIZE,
+                 max_retries: int = EMAIL_MAX_RETRIES, backoff: float = EMAIL_BACKOFF):
+        # Transport créé au premier envoi, pour ne pas exiger de configuration à l'import
+        self._transport = transport
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="email")
+        # (sujet, message) -> [(destinataire, future)]
+        self._batches = {}
+        self.stats = {"sent": 0, "failed": 0, "provider_calls": 0, "retries": 0}
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = create_transport()
+        return self._transport
+
+    async def send_email(self, recipient_email: str, subject: str, message: str) -> bool:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (subject, message)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = []
+            loop.call_later(self.batch_window, self._flush, key)
+        batch.append((recipient_email, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        batch = self._batches.pop(key, None)
+        if batch:
+            asyncio.ensure_future(self._send_batch(key, batch))
+
+    async def _send_batch(self, key, batch):
+        subject, message = key
+        recipients = [recipient for recipient, _ in batch]
+        success, rejected = await self._send_with_retries(recipients, subject, message)
+        if rejected and len(recipients) > 1:
+            results = await asyncio.gather(*(
+                self._send_with_retries([recipient], subject, message) for recipient in recipients
+            ))
+            outcomes = [result for result, _ in results]
+        else:
+            outcomes = [success] * len(recipients)
+        for (_, future), outcome in zip(batch, outcomes):
+            self.stats["sent" if outcome else "failed"] += 1
+            if not future.done():
+                future.set_result(outcome)
+
+    async def _send_with_retries(self, recipients: List[str], subject: str, message: str) -> Tuple[bool, bool]:
+        """(succès, refus définitif du fournisseur) ; un refus n'est pas retenté."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            self.stats["provider_calls"] += 1
+            try:
+                await loop.run_in_executor(self._executor, self.transport.send, recipients, subject, message)
+                logger.info(f"Email envoyé avec succès à {recipients[0]}"
+                            + (f" et {len(recipients) - 1} autre(s)" if len(recipients) > 1 else ""))
+                return True, False
+            except TransientEmailError as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Échec de l'envoi de l'email à {recipients} après {attempt + 1} tentatives : {e}")
+                    return False, False
+                delay = min(self.backoff * 2 ** attempt, EMAIL_MAX_BACKOFF) * random.uniform(0.5, 1.0)
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                self.stats["retries"] += 1
+                logger.warning(f"Envoi de l'email à {recipients} retardé de {delay:.1f}s : {e}")
+                await asyncio.sleep(delay)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'envoi de l'email à {recipients}: {str(e)}")
+                return False, True
+        return False, False
 
 # Instance globale du service email
 email_service = EmailService()
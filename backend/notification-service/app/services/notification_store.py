@@ -0,0 +1,369 @@
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import (JSON, Column, Float, Index, Integer, MetaData, String, Table, Text, create_engine, delete,
+                        func, insert, select, update)
+
+# Limites par défaut : au-delà, les notifications les plus anciennes sont supprimées
+DEFAULT_MAX_ITEMS = 100000
+DEFAULT_RETENTION_SECONDS = 30 * 24 * 3600
+
+NOTIFICATION_FIELDS = ("recipient_email", "message", "notification_type", "priority", "metadata",
+                       "notification_id", "status", "timestamp", "version")
+SENT_EMAIL_FIELDS = ("notification_id", "recipient_email", "subject", "message", "status", "timestamp")
+
+
+def new_notification_id() -> str:
+    """
+    ID unique de notification : horodatage lisible suivi d'un suffixe aléatoire,
+    donc sans collision même pour plusieurs notifications dans la même seconde.
+    """
+    return f"notif_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:16]}"
+
+
+class MemoryNotificationStore:
+    """
+    Stockage en mémoire des notifications et des emails envoyés.
+
+    Chaque notification reçoit un numéro de séquence croissant, qui sert de
+    curseur de pagination. La recherche par ID est en O(1) ; les index par
+    destinataire et par statut sont des listes de séquences triées, où une
+    page filtrée commence directement au curseur (bisect). Au-delà
+    de `max_items` entrées, ou après `retention_seconds`, les plus anciennes
+    sont supprimées.
+
+    Chaque création ou changement de statut donne à la notification une
+    nouvelle `version`, croissante pour tout le stockage : changes(since)
+    renvoie ce qui a changé depuis une version donnée.
+    """
+
+    def __init__(self, max_items: int = DEFAULT_MAX_ITEMS, retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        self.max_items = max_items
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._next_seq = 1
+        # seq -> (date de création, notification)
+        self._records: Dict[int, Tuple[float, dict]] = {}
+        self._seq_by_id: Dict[str, int] = {}
+        # Séquences dans l'ordre d'insertion ; les entrées avant _head ont été supprimées
+        self._order: List[int] = []
+        self._head = 0
+        # Séquences triées par destinataire et par statut
+        self._by_recipient: Dict[str, List[int]] = defaultdict(list)
+        self._by_status: Dict[str, List[int]] = defaultdict(list)
+        self.version = 0
+        # Journal (version, seq) des changements ; une entrée n'est valable que si la
+        # notification existe encore avec cette version
+        self._change_log: List[Tuple[int, int]] = []
+        # (seq, date de création, email envoyé)
+        self._sent_emails = deque()
+        self._next_sent_seq = 1
+
+    def add(self, notification: dict) -> dict:
+        self.add_many([notification])
+        return notification
+
+    def add_many(self, notifications: List[dict]) -> None:
+        """Enregistre les notifications et renseigne leur `version`."""
+        now = time.time()
+        with self._lock:
+            for notification in notifications:
+                seq = self._next_seq
+                self._next_seq += 1
+                self.version += 1
+                notification["version"] = self.version
+                self._change_log.append((self.version, seq))
+                self._records[seq] = (now, dict(notification))
+                self._seq_by_id[notification["notification_id"]] = seq
+                self._order.append(seq)
+                # Nouvelle séquence, toujours la plus grande : l'ajout en fin garde les index triés
+                self._by_recipient[notification["recipient_email"]].append(seq)
+                self._by_status[notification["status"]].append(seq)
+            self._evict(now)
+
+    def get(self, notification_id: str) -> Optional[dict]:
+        with self._lock:
+            seq = self._seq_by_id.get(notification_id)
+            return None if seq is None else dict(self._records[seq][1])
+
+    def update_status(self, notification_id: str, status: str) -> Optional[dict]:
+        """Change le statut ; renvoie la notification mise à jour, ou None si elle n'existe pas."""
+        with self._lock:
+            seq = self._seq_by_id.get(notification_id)
+            if seq is None:
+                return None
+            notification = self._records[seq][1]
+            self._remove_from_index(self._by_status, notification["status"], seq)
+            notification["status"] = status
+            insort(self._by_status[status], seq)
+            self.version += 1
+            notification["version"] = self.version
+            self._change_log.append((self.version, seq))
+            return dict(notification)
+
+    def changes(self, since: int = 0, limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+        """Notifications créées ou modifiées après la version `since`, par version ; renvoie (page, since suivant ou None)."""
+        with self._lock:
+            page = []
+            start = bisect_right(self._change_log, (since, float("inf")))
+            for version, seq in self._change_log[start:]:
+                record = self._records.get(seq)
+                if record is None or record[1]["version"] != version:
+                    continue
+                if len(page) == limit:
+                    return page, page[-1]["version"]
+                page.append(dict(record[1]))
+        return page, None
+
+    def list(self, cursor: int = 0, limit: int = 100, recipient_email: Optional[str] = None,
+             status: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+        """Notifications après `cursor`, dans l'ordre d'arrivée ; renvoie (page, curseur suivant ou None)."""
+        with self._lock:
+            if recipient_email is None and status is None:
+                start = bisect_right(self._order, cursor, lo=self._head)
+                seqs = self._order[start:start + limit + 1]
+            else:
+                indexes = [index for index in (
+                    self._by_recipient.get(recipient_email, []) if recipient_email is not None else None,
+                    self._by_status.get(status, []) if status is not None else None,
+                ) if index is not None]
+                # Parcourir le plus petit index à partir du curseur et vérifier les autres
+                smallest = min(indexes, key=len)
+                others = [index for index in indexes if index is not smallest]
+                seqs = []
+                for i in range(bisect_right(smallest, cursor), len(smallest)):
+                    seq = smallest[i]
+                    if all(self._contains(index, seq) for index in others):
+                        seqs.append(seq)
+                        if len(seqs) > limit:
+                            break
+            more = len(seqs) > limit
+            seqs = seqs[:limit]
+            page = [dict(self._records[seq][1]) for seq in seqs]
+        return page, (seqs[-1] if more else None)
+
+    def add_sent_email(self, email: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._sent_emails.append((self._next_sent_seq, now, dict(email, seq=self._next_sent_seq)))
+            self._next_sent_seq += 1
+            while self._sent_emails and (len(self._sent_emails) > self.max_items
+                                         or self._sent_emails[0][1] < now - self.retention_seconds):
+                self._sent_emails.popleft()
+
+    def list_sent_emails(self, cursor: int = 0, limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+        with self._lock:
+            first = self._sent_emails[0][0] if self._sent_emails else 0
+            start = max(0, cursor + 1 - first)
+            entries = [self._sent_emails[i] for i in range(start, min(start + limit + 1, len(self._sent_emails)))]
+        more = len(entries) > limit
+        entries = entries[:limit]
+        return [dict(email) for _, _, email in entries], (entries[-1][0] if more else None)
+
+    def __len__(self):
+        return len(self._records)
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.retention_seconds
+        while self._head < len(self._order):
+            seq = self._order[self._head]
+            created, notification = self._records[seq]
+            if len(self._records) <= self.max_items and created >= cutoff:
+                break
+            del self._records[seq]
+            del self._seq_by_id[notification["notification_id"]]
+            self._remove_from_index(self._by_recipient, notification["recipient_email"], seq)
+            self._remove_from_index(self._by_status, notification["status"], seq)
+            self._head += 1
+        # Compacter la liste d'ordre quand la moitié est déjà supprimée
+        if self._head > len(self._order) // 2:
+            del self._order[:self._head]
+            self._head = 0
+        # Idem pour le journal des changements, dont les entrées périmées s'accumulent
+        if len(self._change_log) > 2 * len(self._records) + 1000:
+            self._change_log = [
+                (version, seq) for version, seq in self._change_log
+                if seq in self._records and self._records[seq][1]["version"] == version
+            ]
+
+    @staticmethod
+    def _contains(entries: List[int], seq: int) -> bool:
+        i = bisect_left(entries, seq)
+        return i < len(entries) and entries[i] == seq
+
+    @staticmethod
+    def _remove_from_index(index: Dict[str, List[int]], key: str, seq: int) -> None:
+        entries = index.get(key)
+        if entries is not None:
+            i = bisect_left(entries, seq)
+            if i < len(entries) and entries[i] == seq:
+                del entries[i]
+            if not entries:
+                del index[key]
+
+
+class SqlNotificationStore:
+    """
+    Même interface que MemoryNotificationStore, persistée via SQLAlchemy
+    (par exemple `sqlite:///notifications.db`). Les index (destinataire, seq)
+    et (statut, seq) servent la pagination filtrée ; les limites de
+    rétention sont appliquées à chaque insertion.
+    """
+
+    def __init__(self, url: str, max_items: int = DEFAULT_MAX_ITEMS,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        self.max_items = max_items
+        self.retention_seconds = retention_seconds
+        self._engine = create_engine(url)
+        metadata = MetaData()
+        # sqlite_autoincrement : les séquences ne sont jamais réutilisées, les curseurs restent valides
+        self._notifications = Table(
+            "notifications", metadata,
+            Column("seq", Integer, primary_key=True),
+            Column("notification_id", String(64), nullable=False, unique=True),
+            Column("recipient_email", String(320), nullable=False),
+            Column("message", Text, nullable=False),
+            Column("notification_type", String(16), nullable=False),
+            Column("priority", String(16), nullable=False),
+            Column("metadata", JSON),
+            Column("status", String(16), nullable=False),
+            Column("timestamp", String(32), nullable=False),
+            Column("created_at", Float, nullable=False, index=True),
+            Column("version", Integer, nullable=False, index=True),
+            Index("ix_notifications_recipient_seq", "recipient_email", "seq"),
+            Index("ix_notifications_status_seq", "status", "seq"),
+            sqlite_autoincrement=True,
+        )
+        self._sent_emails = Table(
+            "sent_emails", metadata,
+            Column("seq", Integer, primary_key=True),
+            Column("notification_id", String(64)),
+            Column("recipient_email", String(320), nullable=False),
+            Column("subject", Text, nullable=False),
+            Column("message", Text, nullable=False),
+            Column("status", String(16), nullable=False),
+            Column("timestamp", String(32), nullable=False),
+            Column("created_at", Float, nullable=False, index=True),
+            sqlite_autoincrement=True,
+        )
+        metadata.create_all(self._engine)
+        self._lock = threading.Lock()
+        with self._engine.connect() as conn:
+            self.version = conn.execute(select(func.max(self._notifications.c.version))).scalar_one() or 0
+
+    def _next_versions(self, count: int) -> int:
+        """Réserve `count` versions ; renvoie la première."""
+        with self._lock:
+            first = self.version + 1
+            self.version += count
+            return first
+
+    def add(self, notification: dict) -> dict:
+        now = time.time()
+        notification["version"] = self._next_versions(1)
+        with self._engine.begin() as conn:
+            seq = conn.execute(insert(self._notifications).values(
+                **{key: notification.get(key) for key in NOTIFICATION_FIELDS}, created_at=now
+            )).inserted_primary_key[0]
+            self._evict(conn, self._notifications, seq, now)
+        return notification
+
+    def add_many(self, notifications: List[dict]) -> None:
+        """Insère un lot en une seule transaction."""
+        if not notifications:
+            return
+        now = time.time()
+        first = self._next_versions(len(notifications))
+        for version, notification in enumerate(notifications, start=first):
+            notification["version"] = version
+        with self._engine.begin() as conn:
+            conn.execute(insert(self._notifications), [
+                dict({key: notification.get(key) for key in NOTIFICATION_FIELDS}, created_at=now)
+                for notification in notifications
+            ])
+            seq = conn.execute(select(func.max(self._notifications.c.seq))).scalar_one()
+            self._evict(conn, self._notifications, seq, now)
+
+    def get(self, notification_id: str) -> Optional[dict]:
+        with self._engine.connect() as conn:
+            row = conn.execute(select(*self._columns(self._notifications, NOTIFICATION_FIELDS))
+                               .where(self._notifications.c.notification_id == notification_id)).first()
+        return None if row is None else dict(row._mapping)
+
+    def update_status(self, notification_id: str, status: str) -> Optional[dict]:
+        with self._engine.begin() as conn:
+            result = conn.execute(update(self._notifications)
+                                  .where(self._notifications.c.notification_id == notification_id)
+                                  .values(status=status, version=self._next_versions(1)))
+        return self.get(notification_id) if result.rowcount > 0 else None
+
+    def changes(self, since: int = 0, limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+        table = self._notifications
+        query = (select(*self._columns(table, NOTIFICATION_FIELDS)).where(table.c.version > since)
+                 .order_by(table.c.version).limit(limit + 1))
+        with self._engine.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(query)]
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1]["version"]
+        return rows, None
+
+    def list(self, cursor: int = 0, limit: int = 100, recipient_email: Optional[str] = None,
+             status: Optional[str] = None) -> Tuple[List[dict], Optional[int]]:
+        table = self._notifications
+        query = select(table.c.seq, *self._columns(table, NOTIFICATION_FIELDS)).where(table.c.seq > cursor)
+        if recipient_email is not None:
+            query = query.where(table.c.recipient_email == recipient_email)
+        if status is not None:
+            query = query.where(table.c.status == status)
+        return self._page(query.order_by(table.c.seq).limit(limit + 1), limit)
+
+    def add_sent_email(self, email: dict) -> None:
+        now = time.time()
+        with self._engine.begin() as conn:
+            seq = conn.execute(insert(self._sent_emails).values(
+                **{key: email.get(key) for key in SENT_EMAIL_FIELDS}, created_at=now
+            )).inserted_primary_key[0]
+            self._evict(conn, self._sent_emails, seq, now)
+
+    def list_sent_emails(self, cursor: int = 0, limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+        table = self._sent_emails
+        query = select(table.c.seq, *self._columns(table, SENT_EMAIL_FIELDS)).where(table.c.seq > cursor)
+        return self._page(query.order_by(table.c.seq).limit(limit + 1), limit, keep_seq=True)
+
+    def __len__(self):
+        with self._engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self._notifications)).scalar_one()
+
+    def _page(self, query, limit: int, keep_seq: bool = False) -> Tuple[List[dict], Optional[int]]:
+        with self._engine.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(query)]
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = rows[-1]["seq"] if more else None
+        if not keep_seq:
+            for row in rows:
+                del row["seq"]
+        return rows, next_cursor
+
+    def _evict(self, conn, table: Table, seq: int, now: float) -> None:
+        # Les séquences ne font que croître : garder les max_items dernières suffit
+        conn.execute(delete(table).where(
+            (table.c.seq <= seq - self.max_items) | (table.c.created_at < now - self.retention_seconds)
+        ))
+
+    @staticmethod
+    def _columns(table: Table, fields):
+        return [table.c[field] for field in fields]
+
+
+def create_store(url: Optional[str] = None, max_items: int = DEFAULT_MAX_ITEMS,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+    """Stockage SQL si une URL de base est configurée, sinon en mémoire."""
+    if url:
+        return SqlNotificationStore(url, max_items=max_items, retention_seconds=retention_seconds)
+    return MemoryNotificationStore(max_items=max_items, retention_seconds=retention_seconds)
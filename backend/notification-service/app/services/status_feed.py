@@ -0,0 +1,104 @@
+import asyncio
+import json
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+# Événements en attente par abonné ; au-delà, l'abonné trop lent est déconnecté et se resynchronise via `since`
+DEFAULT_SUBSCRIBER_QUEUE_SIZE = 1000
+KEEPALIVE_INTERVAL = 15.0
+EVENT_FIELDS = ("notification_id", "recipient_email", "notification_type", "priority", "status", "version")
+
+
+class _Subscriber:
+    __slots__ = ("queue", "loop", "overflowed")
+
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.loop = asyncio.get_running_loop()
+        self.overflowed = False
+
+
+class StatusFeed:
+    """
+    Diffusion des changements de statut des notifications (queued, sent, failed)
+    à tous les abonnés du flux, sans interroger le stockage.
+
+    Chaque abonné a sa propre file bornée, alimentée dans sa boucle
+    d'événements : un client lent ne ralentit ni les envois ni les autres
+    clients, il est simplement déconnecté quand sa file déborde.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, notification: dict) -> None:
+        event = {key: notification.get(key) for key in EVENT_FIELDS}
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, event)
+            except RuntimeError:
+                # Boucle fermée : l'abonné a disparu
+                self._subscribers.discard(subscriber)
+
+    def _deliver(self, subscriber: _Subscriber, event: dict) -> None:
+        if subscriber not in self._subscribers:
+            return
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._subscribers.discard(subscriber)
+            subscriber.overflowed = True
+            self.dropped_subscribers += 1
+
+    def subscribe(self) -> _Subscriber:
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    async def events(self, since: Optional[int], changes: Callable[[int, int], Tuple[List[dict], Optional[int]]],
+                     keepalive: float = KEEPALIVE_INTERVAL) -> AsyncIterator[str]:
+        """
+        Flux Server-Sent Events. Avec `since`, les changements manqués sont
+        d'abord relus dans le stockage (`changes`), puis le flux continue en
+        direct sans doublon. L'`id` de chaque événement est la version de la
+        notification : un EventSource qui se reconnecte la renvoie dans
+        Last-Event-ID et reprend là où il s'était arrêté.
+        """
+        subscriber = self.subscribe()
+        try:
+            last_version = since or 0
+            while since is not None:
+                notifications, since = changes(last_version, 500)
+                for notification in notifications:
+                    last_version = notification["version"]
+                    yield self.format({key: notification.get(key) for key in EVENT_FIELDS})
+
+            while True:
+                if subscriber.overflowed and subscriber.queue.empty():
+                    # Trop de retard : le client se reconnecte et relit les changements manqués
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["version"] is not None and event["version"] <= last_version:
+                    continue
+                last_version = event["version"] or last_version
+                yield self.format(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+    @staticmethod
+    def format(event: dict) -> str:
+        return f"id: {event['version']}\nevent: status\ndata: {json.dumps(event)}\n\n"
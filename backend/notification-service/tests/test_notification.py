@@ -1,6 +1,12 @@
+import asyncio
+import json
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, build_email, digest_key, dispatch_notifications, notification_store, set_status
+from app.services.dispatch_queue import DispatchQueue
+from app.services.status_feed import StatusFeed
+from app.services.email_service import EmailService, RateLimiter, StubTransport, TransientEmailError
+from app.services.notification_store import MemoryNotificationStore, SqlNotificationStore, new_notification_id
 
 client = TestClient(app)
 
@@ -34,3 +40,313 @@ def test_send_sms_notification():
     assert response.status_code == 200
     assert "notification_id" in response.json()
     assert response.json()["status"] == "queued"
+
+def test_notification_ids_are_unique():
+    notification_data = {
+        "recipient_email": "+33612345678",
+        "message": "Test SMS notification",
+        "notification_type": "sms",
+        "priority": "urgent"
+    }
+    ids = {client.post("/api/v1/notifications", json=notification_data).json()["notification_id"] for _ in range(20)}
+    assert len(ids) == 20
+    for notification_id in ids:
+        response = client.get(f"/api/v1/notifications/{notification_id}")
+        assert response.status_code == 200
+        assert response.json()["notification_id"] == notification_id
+
+def test_list_notifications_is_cursor_paginated():
+    for i in range(5):
+        client.post("/api/v1/notifications", json={
+            "recipient_email": "pagination@example.com",
+            "message": f"Message {i}",
+            "notification_type": "sms"
+        })
+    messages = []
+    cursor = 0
+    while cursor is not None:
+        page = client.get("/api/v1/notifications", params={
+            "recipient_email": "pagination@example.com", "cursor": cursor, "limit": 2
+        }).json()
+        assert len(page["items"]) <= 2
+        messages += [notif["message"] for notif in page["items"]]
+        cursor = page["next_cursor"]
+    assert messages == [f"Message {i}" for i in range(5)]
+
+def test_unknown_notification_type_is_rejected():
+    response = client.post("/api/v1/notifications", json={
+        "recipient_email": "test@example.com",
+        "message": "Test",
+        "notification_type": "pigeon"
+    })
+    assert response.status_code == 400
+
+def _notification(i, recipient="a@example.com"):
+    return {
+        "recipient_email": recipient,
+        "message": f"Message {i}",
+        "notification_type": "email",
+        "priority": "normal",
+        "metadata": {"department": "cardiology"},
+        "notification_id": new_notification_id(),
+        "status": "queued",
+        "timestamp": f"2024-01-01T00:00:{i:02d}"
+    }
+
+def test_memory_store_evicts_oldest_and_updates_indexes():
+    store = MemoryNotificationStore(max_items=3)
+    notifications = [store.add(_notification(i, recipient=f"r{i % 2}@example.com")) for i in range(5)]
+    assert len(store) == 3
+    assert store.get(notifications[0]["notification_id"]) is None
+    assert store.update_status(notifications[4]["notification_id"], "sent")
+    items, _ = store.list(status="queued")
+    assert [notif["message"] for notif in items] == ["Message 2", "Message 3"]
+    items, _ = store.list(recipient_email="r0@example.com")
+    assert [notif["message"] for notif in items] == ["Message 2", "Message 4"]
+
+def test_memory_store_filtered_pages_follow_the_cursor():
+    store = MemoryNotificationStore(max_items=40)
+    notifications = [store.add(_notification(i % 60, recipient=f"r{i % 3}@example.com")) for i in range(60)]
+    for notification in notifications[::4]:
+        store.update_status(notification["notification_id"], "sent")
+    store.update_status(notifications[21]["notification_id"], "queued")
+    kept = notifications[20:]
+    for recipient_email, status in (("r1@example.com", None), (None, "queued"), (None, "sent"), ("r2@example.com", "sent")):
+        ids, cursor = [], 0
+        while cursor is not None:
+            page, cursor = store.list(cursor, 3, recipient_email=recipient_email, status=status)
+            assert len(page) <= 3
+            ids += [notif["notification_id"] for notif in page]
+        expected = [
+            notification["notification_id"] for notification in kept
+            if recipient_email in (None, notification["recipient_email"])
+            and status in (None, store.get(notification["notification_id"])["status"])
+        ]
+        assert ids == expected
+
+def test_sqlite_store_persists_notifications(tmp_path):
+    url = f"sqlite:///{tmp_path / 'notifications.db'}"
+    store = SqlNotificationStore(url, max_items=3)
+    notifications = [store.add(_notification(i)) for i in range(4)]
+    store.update_status(notifications[3]["notification_id"], "sent")
+
+    reopened = SqlNotificationStore(url, max_items=3)
+    assert len(reopened) == 3
+    assert reopened.get(notifications[0]["notification_id"]) is None
+    assert reopened.get(notifications[3]["notification_id"])["status"] == "sent"
+    assert reopened.get(notifications[3]["notification_id"])["metadata"] == {"department": "cardiology"}
+    page, cursor = reopened.list(limit=2)
+    assert [notif["message"] for notif in page] == ["Message 1", "Message 2"]
+    page, cursor = reopened.list(cursor=cursor, limit=2)
+    assert [notif["message"] for notif in page] == ["Message 3"] and cursor is None
+
+class FlakyTransport(StubTransport):
+    def __init__(self, failures):
+        super().__init__(latency=0)
+        self.failures = failures
+
+    def send(self, recipients, subject, message):
+        if self.failures:
+            self.failures -= 1
+            raise TransientEmailError("429 Too Many Requests")
+        super().send(recipients, subject, message)
+
+def test_email_service_batches_same_content():
+    transport = StubTransport(latency=0.01)
+    service = EmailService(transport=transport, batch_window=0.02, rate_limiter=RateLimiter(rate=1000, burst=10))
+
+    async def send_all():
+        return await asyncio.gather(*(
+            service.send_email(f"nurse{i}@example.com", "Alerte", "Patient en chambre 3") for i in range(10)
+        ), service.send_email("doctor@example.com", "Alerte", "Autre message"))
+
+    assert all(asyncio.run(send_all()))
+    assert transport.calls == 2
+    assert transport.sent == 11
+
+def test_email_service_retries_transient_errors():
+    transport = FlakyTransport(failures=2)
+    service = EmailService(transport=transport, batch_window=0, backoff=0.01, max_retries=2,
+                           rate_limiter=RateLimiter(rate=1000, burst=10))
+    assert asyncio.run(service.send_email("nurse@example.com", "Alerte", "Test"))
+    assert service.stats["retries"] == 2
+
+    transport.failures = 3
+    assert not asyncio.run(service.send_email("nurse@example.com", "Alerte", "Test"))
+
+class RejectingTransport(StubTransport):
+    def __init__(self, rejected):
+        super().__init__(latency=0)
+        self.rejected = rejected
+
+    def send(self, recipients, subject, message):
+        if self.rejected in recipients:
+            raise ValueError(f"400 Bad Request: invalid email {self.rejected}")
+        super().send(recipients, subject, message)
+
+def test_email_service_isolates_a_rejected_recipient_in_a_batch():
+    transport = RejectingTransport("invalid@example")
+    service = EmailService(transport=transport, batch_window=0.02, rate_limiter=RateLimiter(rate=1000, burst=10))
+    recipients = ["nurse0@example.com", "invalid@example", "nurse1@example.com"]
+
+    async def send_all():
+        return await asyncio.gather(*(service.send_email(recipient, "Alerte", "Test") for recipient in recipients))
+
+    assert asyncio.run(send_all()) == [True, False, True]
+    assert transport.sent == 2
+    assert service.stats["sent"] == 2 and service.stats["failed"] == 1
+
+def test_rate_limiter_spaces_calls_beyond_burst():
+    limiter = RateLimiter(rate=10, burst=2)
+    delays = [limiter.reserve() for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert 0.05 < delays[2] <= 0.1 < delays[3] <= 0.2
+
+def _run_queue(queue, notifications):
+    async def run():
+        for notification in notifications:
+            queue.submit(notification)
+        await queue.start()
+        while queue.pending():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        await queue.stop()
+    asyncio.run(run())
+
+def test_dispatch_queue_sends_urgent_first():
+    batches = []
+
+    async def handler(notifications):
+        batches.append([notif["message"] for notif in notifications])
+        await asyncio.sleep(0.01)
+
+    queue = DispatchQueue(handler, workers=1, urgent_workers=0)
+    notifications = [dict(_notification(i, recipient=f"r{i}@example.com")) for i in range(5)]
+    notifications[4]["priority"] = "urgent"
+    _run_queue(queue, notifications)
+    assert batches[0] == ["Message 4"]
+    assert queue.stats()["priorities"]["urgent"]["dispatched"] == 1
+    assert queue.stats()["priorities"]["normal"]["wait_ms"]["max"] is not None
+
+def test_dispatch_queue_coalesces_digests_per_recipient():
+    batches = []
+
+    async def handler(notifications):
+        batches.append(sorted(notif["message"] for notif in notifications))
+
+    queue = DispatchQueue(handler, workers=2, urgent_workers=1, coalesce_key=digest_key)
+    notifications = [_notification(i, recipient="a@example.com") for i in range(3)] + [
+        _notification(3, recipient="b@example.com"), dict(_notification(4, recipient="a@example.com"), priority="urgent"),
+        dict(_notification(5, recipient="a@example.com"), metadata={"department": "radiology"})
+    ]
+    _run_queue(queue, notifications)
+    assert sorted(batches) == [["Message 0", "Message 1", "Message 2"], ["Message 3"], ["Message 4"], ["Message 5"]]
+    assert queue.stats()["priorities"]["normal"]["coalesced"] == 2
+
+def test_build_email_counts_repeated_messages():
+    notifications = [_notification(0), _notification(1), dict(_notification(2), message="Message 0")]
+    subject, message = build_email(notifications)
+    assert subject.endswith("(3 notifications)")
+    assert message == "<p>Message 0 (x2)</p><p>Message 1</p>"
+
+def test_bulk_notifications_from_template():
+    response = client.post("/api/v1/notifications/bulk", json={
+        "template": {"message": "Bonjour {name}, patient en chambre {room}", "notification_type": "sms",
+                     "metadata": {"department": "cardiology"}},
+        "recipients": [{"recipient_email": f"+3361234567{i}", "params": {"name": f"N{i}", "room": 3}} for i in range(3)]
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 3 and body["status"] == "queued"
+    notification = client.get(f"/api/v1/notifications/{body['notifications'][1]['notification_id']}").json()
+    assert notification["recipient_email"] == "+33612345671"
+    assert notification["message"] == "Bonjour N1, patient en chambre 3"
+    assert notification["metadata"] == {"department": "cardiology"}
+
+def test_bulk_notifications_are_validated_together():
+    before = client.get("/api/v1/notifications", params={"recipient_email": "bulk@example.com"}).json()["items"]
+    response = client.post("/api/v1/notifications/bulk", json={"notifications": [
+        {"recipient_email": "bulk@example.com", "message": "ok", "notification_type": "sms"},
+        {"recipient_email": "bulk@example.com", "message": "ko", "notification_type": "pigeon"},
+    ]})
+    assert response.status_code == 422
+    assert response.json()["detail"] == [{"index": 1, "error": "Type de notification non supporté"}]
+    after = client.get("/api/v1/notifications", params={"recipient_email": "bulk@example.com"}).json()["items"]
+    assert after == before
+
+def test_bulk_request_mixing_list_and_template_is_rejected():
+    notification = {"recipient_email": "mixed@example.com", "message": "ok", "notification_type": "sms"}
+    template = {"message": "Bonjour", "notification_type": "sms"}
+    recipients = [{"recipient_email": "mixed@example.com"}]
+    for body in ({"notifications": [notification], "template": template},
+                 {"notifications": [notification], "recipients": recipients},
+                 {"notifications": [notification], "template": template, "recipients": recipients},
+                 {"template": template},
+                 {}):
+        assert client.post("/api/v1/notifications/bulk", json=body).status_code == 422
+    assert client.get("/api/v1/notifications", params={"recipient_email": "mixed@example.com"}).json()["items"] == []
+
+def test_empty_bulk_request_is_rejected():
+    for body in ({"notifications": []},
+                 {"template": {"message": "Bonjour", "notification_type": "sms"}, "recipients": []}):
+        response = client.post("/api/v1/notifications/bulk", json=body)
+        assert response.status_code == 422
+        assert response.json()["detail"] == "La requête groupée ne contient aucune notification"
+
+def test_bulk_notifications_stream_ndjson():
+    response = client.post("/api/v1/notifications/bulk", params={"stream": True}, json={
+        "template": {"message": "Exercice incendie", "notification_type": "sms"},
+        "recipients": [{"recipient_email": f"+336000000{i:02d}"} for i in range(20)]
+    })
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["recipient_email"] for line in lines] == [f"+336000000{i:02d}" for i in range(20)]
+    assert len({line["notification_id"] for line in lines}) == 20
+
+def test_list_notifications_since_returns_only_changes():
+    notification_id = client.post("/api/v1/notifications", json={
+        "recipient_email": "since@example.com", "message": "Test", "notification_type": "sms"
+    }).json()["notification_id"]
+    since = 0
+    while True:
+        page = client.get("/api/v1/notifications", params={"since": since, "limit": 1000}).json()
+        since = page["next_since"]
+        if page["next_cursor"] is None:
+            break
+    assert client.get("/api/v1/notifications", params={"since": since}).json()["items"] == []
+
+    set_status(notification_id, "sent")
+    page = client.get("/api/v1/notifications", params={"since": since}).json()
+    assert [(notif["notification_id"], notif["status"]) for notif in page["items"]] == [(notification_id, "sent")]
+    assert page["next_since"] == page["items"][0]["version"] > since
+
+def test_status_feed_replays_missed_changes_then_streams_live():
+    store = MemoryNotificationStore()
+    feed = StatusFeed()
+    first, second = _notification(0), _notification(1)
+    store.add(first)
+    store.add(second)
+    store.update_status(first["notification_id"], "sent")
+
+    async def read_events():
+        events = feed.events(second["version"], store.changes, keepalive=0.05)
+        replayed = await events.__anext__()
+        feed.publish(store.update_status(second["notification_id"], "failed"))
+        live = await events.__anext__()
+        await events.aclose()
+        return replayed, live
+
+    replayed, live = asyncio.run(read_events())
+    assert replayed.startswith("id: 3\nevent: status\n")
+    assert json.loads(replayed.split("data: ")[1])["status"] == "sent"
+    assert json.loads(live.split("data: ")[1]) == dict(
+        (key, second[key]) for key in ("notification_id", "recipient_email", "notification_type", "priority")
+    ) | {"status": "failed", "version": 4}
+    assert len(feed) == 0
+
+def test_unimplemented_sms_does_not_stay_queued():
+    notification_id = client.post("/api/v1/notifications", json={
+        "recipient_email": "+33600000000", "message": "Test", "notification_type": "sms"
+    }).json()["notification_id"]
+    asyncio.run(dispatch_notifications([notification_store.get(notification_id)]))
+    assert client.get(f"/api/v1/notifications/{notification_id}").json()["status"] == "failed"
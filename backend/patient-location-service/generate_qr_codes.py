@@ -1,47 +1,241 @@
-import qrcode
+"""
+Generate room QR codes from a manifest.
+
+The manifest is a CSV file with a header row, or a JSON list of objects,
+with a room_number column and optional floor, wing, type and building
+columns (x and y, used by the scan service's room registry, are not put
+in the codes). Without a manifest, rooms 1-8 are generated as before.
+
+Codes hold either the legacy JSON payload or, with --format compact, a
+short versioned room id ("R1:B2214") that fits a version 1 QR code and is
+resolved by the scan service's room registry.
+
+Only rooms whose payload changed since the last run are rendered (hashes
+are kept in <output>/.qr_state.json), in parallel when there are many.
+
+Usage:
+    python generate_qr_codes.py --manifest rooms.csv
+    python generate_qr_codes.py --manifest rooms.json --format compact --sheets room_codes.pdf
+"""
+import argparse
+import hashlib
 import json
 import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+from PIL import Image, ImageDraw
 
-# Create a directory for QR codes if it doesn't exist
-if not os.path.exists('qr_codes'):
-    os.makedirs('qr_codes')
+from room_registry import load_rooms, compact_payload
 
 # Room data template
 room_data_template = {
     "room_number": None,
-    #"floor": "1",
-    #"wing": "A",
-    #"type": "patient_room"
+    "floor": None,
+    "wing": None,
+    "type": None,
+    "building": None,
+}
+
+# QR rendering parameters; changing them re-renders every code
+QR_OPTIONS = {
+    "error_correction": "L",
+    "box_size": 10,
+    "border": 4,
 }
+ERROR_CORRECTION = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+STATE_FILE = ".qr_state.json"
+# Below this many changed rooms, starting worker processes costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+# Printable sheets: A4 at 300 dpi
+SHEET_SIZE = (2480, 3508)
+SHEET_MARGIN = 120
+SHEET_COLUMNS = 3
+SHEET_ROWS = 4
+
+
+def load_manifest(path):
+    """Rooms from a CSV or JSON manifest (see room_registry.load_rooms), or rooms 1-8."""
+    if path is None:
+        return [{"room_number": str(room_number)} for room_number in range(1, 9)]
+    return load_rooms(path)
+
+
+def room_payload(room, payload_format="json"):
+    """QR payload of a room: a compact id, or the template fields it has as JSON."""
+    if payload_format == "compact":
+        return compact_payload(room)
+    room_data = {key: room[key] for key in room_data_template if key in room}
+    return json.dumps(room_data)
+
+
+def room_filename(room):
+    return f"room_{re.sub(r'[^A-Za-z0-9_.-]', '_', str(room['room_number']))}_qr.png"
+
+
+def check_filenames(rooms):
+    """Raise ValueError when two rooms (e.g. "A/1" and "A 1") would be written to the same file."""
+    owners = {}
+    for room in rooms:
+        filename = room_filename(room)
+        other = owners.setdefault(filename, room["room_number"])
+        if other != room["room_number"]:
+            raise ValueError(f"rooms {other!r} and {room['room_number']!r} would both be written to {filename}")
+
+
+def payload_hash(payload):
+    options = json.dumps(QR_OPTIONS, sort_keys=True)
+    return hashlib.sha256(f"{options}\n{payload}".encode()).hexdigest()
+
 
-# Generate QR codes for rooms 1-8
-for room_number in range(1, 9):
-    # Create room data
-    room_data = room_data_template.copy()
-    room_data["room_number"] = str(room_number)
-    
-    # Convert data to JSON string
-    qr_data = json.dumps(room_data)
-    
+def render_qr_code(job):
+    """Render one code to PNG; runs in a worker process for large batches."""
+    payload, path = job
     # Create QR code instance
     qr = qrcode.QRCode(
         version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+        error_correction=ERROR_CORRECTION[QR_OPTIONS["error_correction"]],
+        box_size=QR_OPTIONS["box_size"],
+        border=QR_OPTIONS["border"],
     )
-    
-    # Add data to QR code
-    qr.add_data(qr_data)
+    qr.add_data(payload)
     qr.make(fit=True)
-    
-    # Create image from QR code
-    qr_image = qr.make_image(fill_color="black", back_color="white")
-    
-    # Save QR code image
-    filename = f'qr_codes/room_{room_number}_qr.png'
-    qr_image.save(filename)
-    
-    print(f"Generated QR code for Room {room_number}: {filename}")
-
-print("\nAll QR codes have been generated successfully!") 
\ No newline at end of file
+    qr.make_image(fill_color="black", back_color="white").save(path)
+    return path
+
+
+def load_state(output_dir):
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def generate(rooms, output_dir, jobs=None, force=False, prune=False, payload_format="json"):
+    """Render the codes whose payload changed; returns (rendered, unchanged, removed) counts."""
+    check_filenames(rooms)
+    os.makedirs(output_dir, exist_ok=True)
+    state = load_state(output_dir)
+
+    todo = []
+    new_state = {}
+    for room in rooms:
+        payload = room_payload(room, payload_format)
+        filename = room_filename(room)
+        digest = payload_hash(payload)
+        new_state[filename] = digest
+        if force or state.get(filename) != digest or not os.path.exists(os.path.join(output_dir, filename)):
+            todo.append((payload, os.path.join(output_dir, filename)))
+
+    if len(todo) >= PARALLEL_THRESHOLD and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for _ in pool.map(render_qr_code, todo, chunksize=max(1, len(todo) // (4 * (jobs or os.cpu_count() or 1)))):
+                pass
+    else:
+        for job in todo:
+            render_qr_code(job)
+
+    removed = 0
+    for filename in set(state) - set(new_state):
+        if prune and os.path.exists(os.path.join(output_dir, filename)):
+            os.remove(os.path.join(output_dir, filename))
+            removed += 1
+        elif not prune:
+            # Keep tracking codes that are still on disk so a later --prune finds them
+            new_state[filename] = state[filename]
+
+    save_state(output_dir, new_state)
+    return len(todo), len(rooms) - len(todo), removed
+
+
+def room_label(room):
+    parts = [f"Room {room['room_number']}"]
+    for key in ("building", "floor", "wing"):
+        if key in room:
+            parts.append(f"{key.capitalize()} {room[key]}")
+    return " - ".join(parts)
+
+
+def build_sheets(rooms, output_dir, path):
+    """Lay the codes out SHEET_COLUMNS x SHEET_ROWS per A4 page, with labels, in a PDF (or one PNG per page)."""
+    cell_w = (SHEET_SIZE[0] - 2 * SHEET_MARGIN) // SHEET_COLUMNS
+    cell_h = (SHEET_SIZE[1] - 2 * SHEET_MARGIN) // SHEET_ROWS
+    code_size = min(cell_w, cell_h - 80)
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+
+    pages = []
+    for start in range(0, len(rooms), per_page):
+        page = Image.new("L", SHEET_SIZE, 255)
+        draw = ImageDraw.Draw(page)
+        for i, room in enumerate(rooms[start:start + per_page]):
+            x = SHEET_MARGIN + (i % SHEET_COLUMNS) * cell_w + (cell_w - code_size) // 2
+            y = SHEET_MARGIN + (i // SHEET_COLUMNS) * cell_h
+            with Image.open(os.path.join(output_dir, room_filename(room))) as code:
+                page.paste(code.convert("L").resize((code_size, code_size), Image.NEAREST), (x, y))
+            draw.text((x, y + code_size + 10), room_label(room), fill=0)
+        pages.append(page)
+
+    if not pages:
+        return 0
+    if path.lower().endswith(".pdf"):
+        pages[0].save(path, save_all=True, append_images=pages[1:], resolution=300)
+    else:
+        stem, ext = os.path.splitext(path)
+        for number, page in enumerate(pages, start=1):
+            page.save(f"{stem}_{number}{ext or '.png'}")
+    return len(pages)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", help="CSV or JSON room manifest (default: rooms 1-8)")
+    parser.add_argument("--output", default="qr_codes", help="directory for the PNG codes")
+    parser.add_argument("--format", choices=["json", "compact"], default="json",
+                        help="payload format: legacy JSON or compact room id")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="re-render every code")
+    parser.add_argument("--prune", action="store_true", help="delete codes of rooms no longer in the manifest")
+    parser.add_argument("--sheets", help="also write printable sheets to this .pdf (or .png, one file per page)")
+    args = parser.parse_args(argv)
+
+    try:
+        rooms = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read manifest: {e}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    try:
+        rendered, unchanged, removed = generate(rooms, args.output, args.jobs, args.force, args.prune, args.format)
+    except ValueError as e:
+        print(f"Cannot generate codes: {e}", file=sys.stderr)
+        return 1
+    print(f"{len(rooms)} rooms: {rendered} generated, {unchanged} unchanged, {removed} removed "
+          f"in {time.perf_counter() - start:.3f}s ({args.output})")
+
+    if args.sheets:
+        pages = build_sheets(rooms, args.output, args.sheets)
+        print(f"Printable sheets: {pages} page(s) in {args.sheets}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+# Production serving for patient-location-service:
+#     gunicorn -c gunicorn.conf.py main:app
+#
+# The app (OpenCV, zbar, QR decoder state) is loaded once in the master and
+# forked into the workers. Eureka registration and heartbeats run in the
+# master only, so an instance registers once however many workers it has.
+# Scans are not sticky to a worker, so the location debounce state is kept
+# in a SQLite file (LOCATION_STATE_FILE) that all workers share.
+import multiprocessing
+import os
+
+import cv2
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5002')}"
+workers = int(os.getenv("SCAN_WORKERS", str(multiprocessing.cpu_count())))
+# A couple of threads per worker so health checks and fast 503s are served while scans run
+worker_class = "gthread"
+threads = int(os.getenv("SCAN_THREADS", "4"))
+preload_app = True
+timeout = 30
+keepalive = 5
+# Keep the kernel queue short: requests beyond it fail fast at the client
+backlog = int(os.getenv("SCAN_BACKLOG", "64"))
+
+
+def when_ready(server):
+    from main import register_with_eureka
+    register_with_eureka()
+
+
+def post_fork(server, worker):
+    # One OpenCV thread per worker; parallelism comes from the worker processes
+    cv2.setNumThreads(1)
+
+
+def on_exit(server):
+    import py_eureka_client.eureka_client as eureka_client
+    try:
+        eureka_client.stop()
+    except Exception as e:
+        server.log.error(f"Failed to deregister from Eureka: {e}")
@@ -0,0 +1,137 @@
+"""
+Load test for /scan: throughput and latency for several worker counts.
+
+For each --workers value a gunicorn instance (gunicorn.conf.py) is started
+without Eureka, then --concurrency clients post raw Y-plane frames to it
+for --duration seconds. With --url, an already running server is tested
+instead.
+
+Usage (from the service root):
+    python load_test.py --workers 1 2 4 --concurrency 16 --duration 15
+    python load_test.py --url http://localhost:5002 --frame sample_frame.png
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+import qrcode
+import requests
+
+
+def synthetic_frame(width=1280, height=720, size=240):
+    """Camera-sized noisy Y plane with one room code in it."""
+    code = np.array(qrcode.make('{"room_number": "1"}').convert("L").resize((size, size)))
+    frame = np.random.default_rng(0).integers(90, 160, (height, width), dtype=np.uint8)
+    frame[(height - size) // 2:(height + size) // 2, (width - size) // 2:(width + size) // 2] = code
+    return frame
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, port):
+    env = dict(os.environ, SCAN_WORKERS=str(workers), PORT=str(port), EUREKA_ENABLED="false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return server, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+def client(url, frame, deadline, results, device_id):
+    session = requests.Session()
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-Width": str(frame.shape[1]),
+        "X-Height": str(frame.shape[0]),
+        "X-Device-Id": device_id,
+    }
+    body = frame.tobytes()
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            status = session.post(f"{url}/scan", data=body, headers=headers, timeout=30).status_code
+        except requests.RequestException:
+            status = None
+        results.append((status, time.perf_counter() - start))
+        if status == 503:
+            # Back off like a client honouring Retry-After would, without waiting a full second
+            time.sleep(0.05)
+
+
+def run_load(url, frame, concurrency, duration):
+    results = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client, args=(url, frame, deadline, results, f"load-{i}"))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ok = np.array([latency for status, latency in results if status == 200]) * 1000
+    return {
+        "scans_per_second": len(ok) / duration,
+        "p50_ms": float(np.percentile(ok, 50)) if len(ok) else 0.0,
+        "p95_ms": float(np.percentile(ok, 95)) if len(ok) else 0.0,
+        "rejected": sum(status == 503 for status, _ in results),
+        "errors": sum(status not in (200, 503) for status, _ in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="test this server instead of starting gunicorn")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--frame", help="image to send (converted to grayscale) instead of a synthetic frame")
+    args = parser.parse_args(argv)
+
+    frame = cv2.imread(args.frame, cv2.IMREAD_GRAYSCALE) if args.frame else synthetic_frame()
+    if frame is None:
+        print(f"Cannot read {args.frame}", file=sys.stderr)
+        return 1
+
+    runs = []
+    if args.url:
+        runs.append(("-", run_load(args.url, frame, args.concurrency, args.duration)))
+    else:
+        for workers in args.workers:
+            server, url = start_server(workers, free_port())
+            try:
+                runs.append((workers, run_load(url, frame, args.concurrency, args.duration)))
+            finally:
+                server.terminate()
+                server.wait()
+
+    print(f"{frame.shape[1]}x{frame.shape[0]} frames, {args.concurrency} clients, {args.duration:.0f}s per run")
+    print(f"{'workers':>8}{'scans/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'503s':>8}{'errors':>8}")
+    for workers, report in runs:
+        print(f"{workers:>8}{report['scans_per_second']:>10.1f}{report['p50_ms']:>9.1f}{report['p95_ms']:>9.1f}"
+              f"{report['rejected']:>8}{report['errors']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
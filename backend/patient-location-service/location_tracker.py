@@ -0,0 +1,182 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Consistent decodes needed before a user's room changes
+DEFAULT_CONFIRMATIONS = 3
+# A user not scanned for this long starts over (their next room needs confirming again)
+DEFAULT_LOCATION_TTL = 300.0
+DEFAULT_FLUSH_INTERVAL = 1.0
+MAX_USERS = 100000
+
+
+class LocationTracker:
+    """
+    Debounces decoded rooms per user (or device).
+
+    A room becomes the user's location only after `confirmations`
+    consecutive decodes of it; a decode of another room restarts the count.
+    observe() reports a change only when the confirmed room actually
+    changes. Users not seen for `ttl` seconds are forgotten, and at most
+    `max_users` are kept (least recently seen dropped first).
+
+    The state lives in a SQLite file at `path`, so every gunicorn worker
+    sharing it sees the same counts: consecutive scans of one user may land
+    on different workers, and exactly one of them reports the change.
+    """
+
+    def __init__(self, path, confirmations=DEFAULT_CONFIRMATIONS, ttl=DEFAULT_LOCATION_TTL, max_users=MAX_USERS):
+        self.path = path
+        self.confirmations = confirmations
+        self.ttl = ttl
+        self.max_users = max_users
+        # One connection per thread, reopened after a fork (connections must not cross processes)
+        self._local = threading.local()
+        with closing(sqlite3.connect(path)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Room columns have no type, so rooms keep the type they were observed with (str or int)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS locations (user TEXT PRIMARY KEY, room_id, "
+                "candidate, count INTEGER NOT NULL, last_seen REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS locations_last_seen ON locations (last_seen)")
+            connection.commit()
+
+    def _connection(self):
+        if getattr(self._local, "pid", None) != os.getpid():
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            self._local.connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def observe(self, user, room_id, now=None):
+        """Record a decode of `room_id`; returns (confirmed room, changed, confirmations so far)."""
+        now = time.time() if now is None else now
+        connection = self._connection()
+        # Takes the write lock up front, so the read and update below are atomic across workers
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT room_id, candidate, count, last_seen FROM locations WHERE user = ?", (user,)
+            ).fetchone()
+            if row is None or now - row[3] > self.ttl:
+                current, candidate, count = None, None, 0
+            else:
+                current, candidate, count = row[:3]
+
+            if room_id == current:
+                candidate, count, result = None, 0, (current, False, self.confirmations)
+            else:
+                if room_id == candidate:
+                    count += 1
+                else:
+                    candidate, count = room_id, 1
+                if count < self.confirmations:
+                    result = (current, False, count)
+                else:
+                    current, candidate, count = room_id, None, 0
+                    result = (room_id, True, self.confirmations)
+
+            connection.execute(
+                "INSERT OR REPLACE INTO locations VALUES (?, ?, ?, ?, ?)", (user, current, candidate, count, now)
+            )
+            if row is None:
+                self._evict(connection, now)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+    def _evict(self, connection, now):
+        connection.execute("DELETE FROM locations WHERE last_seen < ?", (now - self.ttl,))
+        excess = connection.execute("SELECT COUNT(*) FROM locations").fetchone()[0] - self.max_users
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM locations WHERE user IN "
+                "(SELECT user FROM locations ORDER BY last_seen LIMIT ?)", (excess,)
+            )
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+
+
+class LocalisationWriter:
+    """
+    Writes location changes to the user-service localisation API in the background.
+
+    submit() only records the user's latest room; a flush thread posts the
+    pending changes every `flush_interval` seconds over one pooled session,
+    so several changes of the same user within an interval become a single
+    write. Failed writes are retried on the next flush unless a newer room
+    was submitted meanwhile. The thread is started lazily in the process
+    that submits, so it survives gunicorn's fork of a preloaded app.
+    """
+
+    def __init__(self, url, flush_interval=DEFAULT_FLUSH_INTERVAL, timeout=5.0):
+        self.url = url
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.written = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        threading.Thread(target=self._run, name="localisation-writer", daemon=True).start()
+
+    def submit(self, username, room_id):
+        with self._lock:
+            self._ensure_started()
+            if username in self._pending:
+                self.coalesced += 1
+            self._pending[username] = room_id
+            self.submitted += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for username, room_id in pending.items():
+            try:
+                response = self._session.post(
+                    self.url, json={"room_id": room_id, "username": username}, timeout=self.timeout
+                )
+                response.raise_for_status()
+                self.written += 1
+            except requests.RequestException as e:
+                self.failed += 1
+                logger.error(f"Failed to save localisation of {username} in room {room_id}: {e}")
+                with self._lock:
+                    self._pending.setdefault(username, room_id)
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "failed": self.failed,
+        }
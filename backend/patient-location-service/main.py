@@ -1,14 +1,16 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-import cv2
-import numpy as np
-from pyzbar.pyzbar import decode
 import base64
 import logging
 import json
 import py_eureka_client.eureka_client as eureka_client
 from dotenv import load_dotenv
 import os
+import tempfile
+import threading
+from qr_decoder import QrDecoder, luminance_plane
+from location_tracker import LocationTracker, LocalisationWriter
+from room_registry import RoomRegistry
 
 # Load environment variables
 load_dotenv()
@@ -21,13 +23,31 @@ app = Flask(__name__)
 CORS(app)
 
 # Eureka configuration
+EUREKA_ENABLED = os.getenv("EUREKA_ENABLED", "true").lower() == "true"
 EUREKA_SERVER = os.getenv("EUREKA_SERVER", "http://localhost:8761/eureka")
 APP_NAME = os.getenv("APP_NAME", "PATIENT-LOCATION-SERVICE")
 PORT = int(os.getenv("PORT", "5002"))
 INSTANCE_HOST = os.getenv("INSTANCE_HOST", "localhost")
 
+# Scans decoded at once per process; further requests are rejected right away
+MAX_INFLIGHT_SCANS = int(os.getenv("MAX_INFLIGHT_SCANS", "2"))
+
+# Location debouncing and writes to user-service
+USER_SERVICE_LOCALISATIONS_URL = os.getenv("USER_SERVICE_LOCALISATIONS_URL", "http://localhost:8082/api/localisations")
+LOCATION_CONFIRMATIONS = int(os.getenv("LOCATION_CONFIRMATIONS", "3"))
+LOCATION_TTL = float(os.getenv("LOCATION_TTL", "300"))
+LOCATION_FLUSH_INTERVAL = float(os.getenv("LOCATION_FLUSH_INTERVAL", "1.0"))
+# SQLite file holding the debounce state, shared by all workers of the instance
+LOCATION_STATE_FILE = os.getenv("LOCATION_STATE_FILE", os.path.join(tempfile.gettempdir(), "patient-location-state.db"))
+
+# Room manifest (CSV or JSON, same format as generate_qr_codes.py) resolving scanned codes
+ROOM_REGISTRY_FILE = os.getenv("ROOM_REGISTRY_FILE", "rooms.json")
+
 # Initialize eureka client
 def register_with_eureka():
+    if not EUREKA_ENABLED:
+        logger.info("Eureka registration disabled")
+        return
     try:
         eureka_client.init(
             eureka_server=EUREKA_SERVER,
@@ -40,8 +60,18 @@ def register_with_eureka():
         logger.error(f"Failed to register with Eureka server: {e}")
         raise
 
-# Register with Eureka on startup
-register_with_eureka()
+# Staged QR decoder, shared by all requests (keeps the last code position per device)
+qr_decoder = QrDecoder()
+
+# Rooms by id, loaded once (in the gunicorn master, then shared by the workers)
+room_registry = RoomRegistry.from_file(ROOM_REGISTRY_FILE)
+
+# Current room per user, shared by the gunicorn workers; only confirmed changes are written to user-service
+location_tracker = LocationTracker(LOCATION_STATE_FILE, confirmations=LOCATION_CONFIRMATIONS, ttl=LOCATION_TTL)
+localisation_writer = LocalisationWriter(USER_SERVICE_LOCALISATIONS_URL, flush_interval=LOCATION_FLUSH_INTERVAL)
+
+inflight_scans = threading.BoundedSemaphore(MAX_INFLIGHT_SCANS)
+scan_counters = {"rejected": 0}
 
 # Add health check endpoint for Eureka
 @app.route('/health', methods=['GET'])
@@ -57,45 +87,62 @@ def info():
         "status": "Running"
     })
 
+# Frame parameters of the binary ingest mode, as X-* headers or query parameters
+def frame_param(name, header):
+    value = request.headers.get(header) or request.args.get(name) or ''
+    return int(value) if value.isdigit() else 0
+
 @app.route('/scan', methods=['POST'])
 def scan_qr_code():
+    # Fail fast when saturated instead of queueing behind CPU-bound scans
+    if not inflight_scans.acquire(blocking=False):
+        scan_counters["rejected"] += 1
+        return jsonify({'error': 'Scanner busy, retry later'}), 503, {'Retry-After': '1'}
     try:
-        # Get the image data from the request
-        data = request.json
-        if not data or 'image' not in data:
-            return jsonify({'error': 'No image data received'}), 400
-        
-        logging.debug(f"Processing image data...")
+        return decode_scan_request()
+    finally:
+        inflight_scans.release()
 
-        # Convert base64 image to numpy array
-        image_data = data['image']
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-        
-        image_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        
-        width = int(data.get('width', 0))
-        height = int(data.get('height', 0))
-        
-        if width and height:
-            y_plane = nparr[:width*height].reshape(height, width)
-            
-            # Apply image processing steps
-            blurred = cv2.GaussianBlur(y_plane, (5, 5), 0)
-            binary = cv2.adaptiveThreshold(
-                blurred, 255,
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                cv2.THRESH_BINARY,
-                11, 2
-            )
-            
-            kernel = np.ones((3,3), np.uint8)
-            morphed = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-            
-            decoded_objects = decode(binary) or decode(morphed) or decode(y_plane)
+def decode_scan_request():
+    try:
+        if request.mimetype == 'application/octet-stream':
+            # Raw Y plane: no JSON or base64 decoding, the body is wrapped as it is
+            image_bytes = request.get_data()
+            width = frame_param('width', 'X-Width')
+            height = frame_param('height', 'X-Height')
+            bytes_per_row = frame_param('bytes_per_row', 'X-Bytes-Per-Row')
+            device_id = request.headers.get('X-Device-Id') or request.args.get('device_id')
+            username = request.headers.get('X-Username') or request.args.get('username')
         else:
-            return jsonify({'error': 'Invalid image dimensions'}), 400
+            # Get the image data from the request
+            data = request.json
+            if not data or 'image' not in data:
+                return jsonify({'error': 'No image data received'}), 400
+
+            logging.debug(f"Processing image data...")
+
+            # Convert base64 image to numpy array
+            image_data = data['image']
+            if ',' in image_data:
+                image_data = image_data.split(',')[1]
+
+            image_bytes = base64.b64decode(image_data)
+            width = int(data.get('width', 0))
+            height = int(data.get('height', 0))
+            bytes_per_row = int(data.get('bytes_per_row', 0))
+            device_id = data.get('device_id') or request.headers.get('X-Device-Id')
+            username = data.get('username') or request.headers.get('X-Username')
+
+        if not image_bytes:
+            return jsonify({'error': 'No image data received'}), 400
+        try:
+            # Strided view over the received bytes, honouring row padding
+            y_plane = luminance_plane(image_bytes, width, height, bytes_per_row)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Cheap decode attempts first, full preprocessing only as a fallback
+        decoded_objects, stage = qr_decoder.decode_plane(y_plane, device_id)
 
         if decoded_objects:
             results = []
@@ -103,9 +150,13 @@ def scan_qr_code():
                 qr_data = obj.data.decode('utf-8')
                 results.append({
                     'qr_data': qr_data,
-                    'type': obj.type
+                    'type': obj.type,
+                    'room': room_registry.resolve(qr_data)
                 })
-            return jsonify({'success': True, 'results': results})
+            response = {'success': True, 'results': results, 'stage': stage}
+            if username:
+                response['location'] = update_location(username, results)
+            return jsonify(response)
         
         return jsonify({'success': False, 'message': 'No QR code detected'})
 
@@ -113,5 +164,35 @@ def scan_qr_code():
         logging.error(f"Error processing image: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Debounce the decoded room and queue a write to user-service when it really changed
+def update_location(username, results):
+    room_id = next((r['room']['room_number'] for r in results if r['room']), None)
+    if room_id is None:
+        return {'room_id': None, 'changed': False}
+    current, changed, confirmations = location_tracker.observe(username, room_id)
+    if changed:
+        localisation_writer.submit(username, current)
+    return {
+        'room_id': current,
+        'changed': changed,
+        'decoded_room_id': room_id,
+        'confirmations': confirmations,
+        'confirmations_needed': location_tracker.confirmations
+    }
+
+# Per-stage hit rate and latency of the QR decoder
+@app.route('/scan/stats', methods=['GET'])
+def scan_stats():
+    return jsonify(dict(
+        qr_decoder.stats(),
+        pid=os.getpid(),
+        rejected=scan_counters["rejected"],
+        rooms_registered=len(room_registry),
+        users_tracked=len(location_tracker),
+        localisation_writes=localisation_writer.stats()
+    ))
+
 if __name__ == "__main__":
+    # Development server; in production gunicorn (gunicorn.conf.py) registers once per instance
+    register_with_eureka()
     app.run(host="0.0.0.0", port=PORT)
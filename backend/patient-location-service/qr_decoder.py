@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from pyzbar.pyzbar import decode as zbar_decode, ZBarSymbol
+
+# Stages in the order they are tried; each one only runs if the previous ones found nothing
+STAGES = ("roi", "downscaled", "raw", "preprocessed")
+
+# Longest side of the downscaled plane; room codes stay well above zbar's minimum module size
+DOWNSCALE_MAX_SIDE = 640
+# Region around the last code, as a fraction of the code's size on each side
+ROI_MARGIN = 0.75
+# How long a device's last code position is trusted
+ROI_TTL = 5.0
+MAX_DEVICES = 10000
+
+
+def luminance_plane(buffer, width, height, bytes_per_row=None):
+    """
+    Zero-copy (height, width) uint8 view of a Y plane whose rows are
+    `bytes_per_row` apart (row padding is skipped, not copied).
+    """
+    bytes_per_row = bytes_per_row or width
+    if width <= 0 or height <= 0:
+        raise ValueError("Invalid image dimensions")
+    if bytes_per_row < width:
+        raise ValueError(f"bytes_per_row ({bytes_per_row}) is smaller than width ({width})")
+    needed = (height - 1) * bytes_per_row + width
+    if len(buffer) < needed:
+        raise ValueError(f"Plane has {len(buffer)} bytes, {width}x{height} with {bytes_per_row} bytes per row needs {needed}")
+    return np.ndarray((height, width), dtype=np.uint8, buffer=buffer, strides=(bytes_per_row, 1))
+
+
+def decode_qr(image):
+    """zbar restricted to QR codes, which skips the 1D barcode scanners."""
+    return zbar_decode(image, symbols=[ZBarSymbol.QRCODE])
+
+
+class _StageStats:
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.seconds = 0.0
+
+
+class QrDecoder:
+    """
+    Staged QR decoder for luminance planes streamed by phones.
+
+    Cheap attempts run first and the full-resolution preprocessing
+    (blur, adaptive threshold, morphology) only runs when they all fail:
+
+    1. roi: a crop around where this device's last code was found
+    2. downscaled: the plane resized to DOWNSCALE_MAX_SIDE
+    3. raw: the full-resolution plane as received
+    4. preprocessed: binarised and morphologically closed plane
+
+    Per-stage attempts, hits and latency are kept for stats().
+    """
+
+    def __init__(self, decode=decode_qr, stages=STAGES, roi_ttl=ROI_TTL, max_devices=MAX_DEVICES):
+        self.decode = decode
+        self.stages = stages
+        self.roi_ttl = roi_ttl
+        self.max_devices = max_devices
+        self._last_rects = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {stage: _StageStats() for stage in STAGES}
+        self.scans = 0
+        self.misses = 0
+
+    def _roi(self, device_id, shape):
+        if device_id is None:
+            return None
+        with self._lock:
+            entry = self._last_rects.get(device_id)
+        if entry is None or time.monotonic() - entry[1] > self.roi_ttl:
+            return None
+        x, y, w, h = entry[0]
+        height, width = shape
+        x1, y1 = max(0, int(x - w * ROI_MARGIN)), max(0, int(y - h * ROI_MARGIN))
+        x2, y2 = min(width, int(x + w * (1 + ROI_MARGIN))), min(height, int(y + h * (1 + ROI_MARGIN)))
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def _remember(self, device_id, rect):
+        if device_id is None:
+            return
+        with self._lock:
+            self._last_rects[device_id] = (rect, time.monotonic())
+            self._last_rects.move_to_end(device_id)
+            while len(self._last_rects) > self.max_devices:
+                self._last_rects.popitem(last=False)
+
+    def _attempt(self, stage, plane, device_id):
+        """Decoded objects and a function mapping their rects back to plane coordinates."""
+        if stage == "roi":
+            roi = self._roi(device_id, plane.shape)
+            if roi is None:
+                return None, None
+            x1, y1, x2, y2 = roi
+            return self.decode(plane[y1:y2, x1:x2]), lambda r: (r[0] + x1, r[1] + y1, r[2], r[3])
+
+        if stage == "downscaled":
+            scale = DOWNSCALE_MAX_SIDE / max(plane.shape)
+            if scale >= 1:
+                # Already small: the raw stage will decode the same pixels
+                return None, None
+            small = cv2.resize(plane, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            return self.decode(small), lambda r: tuple(int(v / scale) for v in r)
+
+        if stage == "raw":
+            return self.decode(plane), tuple
+
+        blurred = cv2.GaussianBlur(plane, (5, 5), 0)
+        binary = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        decoded = self.decode(binary)
+        if not decoded:
+            decoded = self.decode(cv2.morphologyEx(binary, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8)))
+        return decoded, tuple
+
+    def decode_plane(self, plane, device_id=None):
+        """Return (decoded objects, stage that found them); ([], None) when no stage did."""
+        for stage in self.stages:
+            start = time.perf_counter()
+            decoded, to_plane = self._attempt(stage, plane, device_id)
+            if decoded is None:
+                continue
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                stats = self._stats[stage]
+                stats.attempts += 1
+                stats.seconds += elapsed
+                if decoded:
+                    stats.hits += 1
+                    self.scans += 1
+            if decoded:
+                self._remember(device_id, to_plane(tuple(decoded[0].rect)))
+                return decoded, stage
+
+        with self._lock:
+            self.scans += 1
+            self.misses += 1
+        return [], None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scans": self.scans,
+                "misses": self.misses,
+                "devices_tracked": len(self._last_rects),
+                "stages": {
+                    stage: {
+                        "attempts": stats.attempts,
+                        "hits": stats.hits,
+                        "hit_rate": round(stats.hits / stats.attempts, 4) if stats.attempts else 0.0,
+                        "mean_ms": round(1000 * stats.seconds / stats.attempts, 3) if stats.attempts else 0.0
+                    }
+                    for stage, stats in self._stats.items()
+                }
+            }
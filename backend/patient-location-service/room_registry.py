@@ -0,0 +1,98 @@
+import csv
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Manifest columns; x and y place the room on its floor map
+ROOM_FIELDS = ("room_number", "floor", "wing", "type", "building", "x", "y")
+COORDINATE_FIELDS = ("x", "y")
+
+# Compact payload: format version and room id, e.g. "R1:B2214". Upper-case
+# letters, digits and "-" keep it in QR alphanumeric mode, so a room code
+# fits in a version 1 symbol.
+COMPACT_PREFIX = "R1:"
+
+
+def load_rooms(path):
+    """Rooms from a CSV (header row) or JSON (list of objects) manifest, with string fields."""
+    with open(path, newline="") as f:
+        rows = json.load(f) if path.lower().endswith(".json") else list(csv.DictReader(f))
+
+    rooms = []
+    seen = set()
+    for line, row in enumerate(rows, start=1):
+        room = {key: str(row[key]).strip() for key in ROOM_FIELDS if row.get(key) not in (None, "")}
+        if "room_number" not in room:
+            raise ValueError(f"{path}: entry {line} has no room_number")
+        if compact_id(room["room_number"]) in seen:
+            raise ValueError(f"{path}: room {room['room_number']} is listed twice")
+        seen.add(compact_id(room["room_number"]))
+        rooms.append(room)
+    return rooms
+
+
+def compact_id(room_number):
+    return str(room_number).strip().upper()
+
+
+def compact_payload(room):
+    return COMPACT_PREFIX + compact_id(room["room_number"])
+
+
+def parse_payload(qr_data):
+    """Room number from a compact or legacy JSON ({"room_number": ...}) payload, else None."""
+    if qr_data.startswith(COMPACT_PREFIX):
+        return qr_data[len(COMPACT_PREFIX):] or None
+    try:
+        payload = json.loads(qr_data)
+    except ValueError:
+        return None
+    if isinstance(payload, dict) and payload.get("room_number") is not None:
+        return str(payload["room_number"])
+    return None
+
+
+class RoomRegistry:
+    """
+    Rooms by compact id, loaded once at startup from the room manifest.
+
+    resolve() turns a scanned payload into structured room data. Legacy
+    JSON payloads of rooms missing from the registry still resolve, to the
+    fields embedded in the code itself.
+    """
+
+    def __init__(self, rooms=()):
+        self._rooms = {}
+        for room in rooms:
+            room = dict(room)
+            for key in COORDINATE_FIELDS:
+                if key in room:
+                    room[key] = float(room[key])
+            self._rooms[compact_id(room["room_number"])] = room
+
+    @classmethod
+    def from_file(cls, path):
+        if not path or not os.path.exists(path):
+            logger.warning(f"Room registry {path} not found, only legacy QR payloads will resolve")
+            return cls()
+        registry = cls(load_rooms(path))
+        logger.info(f"Loaded {len(registry)} rooms from {path}")
+        return registry
+
+    def resolve(self, qr_data):
+        room_number = parse_payload(qr_data)
+        if room_number is None:
+            return None
+        room = self._rooms.get(compact_id(room_number))
+        if room is not None:
+            return room
+        if qr_data.startswith(COMPACT_PREFIX):
+            # A compact code only carries the id
+            return {"room_number": room_number}
+        legacy = json.loads(qr_data)
+        return {key: str(legacy[key]) for key in ROOM_FIELDS if legacy.get(key) is not None}
+
+    def __len__(self):
+        return len(self._rooms)
@@ -0,0 +1,19 @@
+import pytest
+
+try:
+    import generate_qr_codes
+except ImportError as e:
+    # qrcode and Pillow are only needed to print codes, not by the scan service
+    pytest.skip(f"generate_qr_codes unavailable: {e}", allow_module_level=True)
+
+def test_colliding_file_names_are_rejected_before_rendering(tmp_path):
+    rooms = [{"room_number": "A/1"}, {"room_number": "B1"}, {"room_number": "A 1"}]
+    with pytest.raises(ValueError, match="'A/1' and 'A 1'"):
+        generate_qr_codes.generate(rooms, str(tmp_path / "codes"))
+    assert not (tmp_path / "codes").exists()
+
+def test_codes_are_rendered_once_per_payload(tmp_path):
+    rooms = [{"room_number": "A/1"}, {"room_number": "101", "floor": "1"}]
+    assert generate_qr_codes.generate(rooms, str(tmp_path)) == (2, 0, 0)
+    assert (tmp_path / "room_A_1_qr.png").exists()
+    assert generate_qr_codes.generate(rooms, str(tmp_path)) == (0, 2, 0)
@@ -0,0 +1,71 @@
+import threading
+
+from location_tracker import LocationTracker
+
+def test_room_changes_only_after_consecutive_confirmations(tmp_path):
+    tracker = LocationTracker(str(tmp_path / "state.db"), confirmations=3)
+    assert tracker.observe("alice", "101", now=0.0) == (None, False, 1)
+    assert tracker.observe("alice", "101", now=1.0) == (None, False, 2)
+    assert tracker.observe("alice", "101", now=2.0) == ("101", True, 3)
+    # Further decodes of the confirmed room are not changes
+    assert tracker.observe("alice", "101", now=3.0) == ("101", False, 3)
+
+def test_other_room_restarts_the_count(tmp_path):
+    tracker = LocationTracker(str(tmp_path / "state.db"), confirmations=2)
+    tracker.observe("alice", "101", now=0.0)
+    tracker.observe("alice", "101", now=1.0)
+    assert tracker.observe("alice", "102", now=2.0) == ("101", False, 1)
+    assert tracker.observe("alice", "103", now=3.0) == ("101", False, 1)
+    # A decode of the confirmed room drops the pending candidate
+    assert tracker.observe("alice", "101", now=4.0) == ("101", False, 2)
+    assert tracker.observe("alice", "103", now=5.0) == ("101", False, 1)
+    assert tracker.observe("alice", "103", now=6.0) == ("103", True, 2)
+
+def test_users_are_tracked_independently(tmp_path):
+    tracker = LocationTracker(str(tmp_path / "state.db"), confirmations=2)
+    tracker.observe("alice", "101", now=0.0)
+    assert tracker.observe("bob", "101", now=0.5) == (None, False, 1)
+    assert tracker.observe("alice", "101", now=1.0) == ("101", True, 2)
+
+def test_users_expire_after_ttl(tmp_path):
+    tracker = LocationTracker(str(tmp_path / "state.db"), confirmations=2, ttl=10.0)
+    tracker.observe("alice", "101", now=0.0)
+    tracker.observe("alice", "101", now=1.0)
+    assert tracker.observe("alice", "101", now=5.0) == ("101", False, 2)
+    # Not seen for longer than the ttl: the room needs confirming again
+    assert tracker.observe("alice", "101", now=20.0) == (None, False, 1)
+
+def test_least_recently_seen_users_are_dropped(tmp_path):
+    tracker = LocationTracker(str(tmp_path / "state.db"), confirmations=1, max_users=2)
+    tracker.observe("alice", "101", now=0.0)
+    tracker.observe("bob", "102", now=1.0)
+    tracker.observe("alice", "101", now=2.0)
+    tracker.observe("carol", "103", now=3.0)
+    assert len(tracker) == 2
+    assert tracker.observe("alice", "101", now=4.0) == ("101", False, 1)
+    assert tracker.observe("bob", "102", now=5.0) == ("102", True, 1)
+
+def test_workers_share_the_debounce_state(tmp_path):
+    # One tracker per gunicorn worker, all on the same file; scans of a user alternate between them
+    first = LocationTracker(str(tmp_path / "state.db"), confirmations=3)
+    second = LocationTracker(str(tmp_path / "state.db"), confirmations=3)
+    assert first.observe("alice", "101", now=0.0) == (None, False, 1)
+    assert second.observe("alice", "101", now=1.0) == (None, False, 2)
+    assert first.observe("alice", "101", now=2.0) == ("101", True, 3)
+    assert second.observe("alice", "101", now=3.0) == ("101", False, 3)
+    assert len(first) == len(second) == 1
+
+def test_concurrent_scans_report_a_change_once(tmp_path):
+    trackers = [LocationTracker(str(tmp_path / "state.db"), confirmations=3) for _ in range(2)]
+    results = []
+
+    def scan(tracker):
+        for _ in range(20):
+            results.append(tracker.observe("alice", "101"))
+
+    threads = [threading.Thread(target=scan, args=(tracker,)) for tracker in trackers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(changed for _, changed, _ in results) == [False] * 39 + [True]
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+try:
+    from qr_decoder import luminance_plane
+except ImportError as e:
+    # pyzbar needs the zbar shared library
+    pytest.skip(f"qr_decoder unavailable: {e}", allow_module_level=True)
+
+def test_plane_without_row_padding():
+    buffer = bytes(range(12))
+    plane = luminance_plane(buffer, 4, 3)
+    assert plane.shape == (3, 4)
+    assert plane.tolist() == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11]]
+
+def test_row_padding_is_skipped_without_copying():
+    # 3 pixels per row, 5 bytes per row; the last row needs no padding
+    buffer = bytearray([1, 2, 3, 0, 0, 4, 5, 6, 0, 0, 7, 8, 9])
+    plane = luminance_plane(buffer, 3, 3, bytes_per_row=5)
+    assert plane.tolist() == [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert plane.strides == (5, 1)
+    assert np.shares_memory(plane, np.frombuffer(buffer, dtype=np.uint8))
+
+def test_short_buffer_is_rejected():
+    with pytest.raises(ValueError, match="needs 13"):
+        luminance_plane(bytes(12), 3, 3, bytes_per_row=5)
+    with pytest.raises(ValueError):
+        luminance_plane(bytes(11), 4, 3)
+
+def test_invalid_dimensions_and_stride_are_rejected():
+    with pytest.raises(ValueError, match="Invalid image dimensions"):
+        luminance_plane(bytes(12), 0, 3)
+    with pytest.raises(ValueError, match="smaller than width"):
+        luminance_plane(bytes(12), 4, 3, bytes_per_row=3)
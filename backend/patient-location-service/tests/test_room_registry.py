@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from room_registry import RoomRegistry, compact_payload, load_rooms, parse_payload
+
+ROOMS = [
+    {"room_number": "b2214", "floor": "2", "wing": "B", "x": "12.5", "y": "4"},
+    {"room_number": "101", "floor": "1"},
+]
+
+def test_parse_compact_payload():
+    assert parse_payload("R1:B2214") == "B2214"
+    assert parse_payload("R1:") is None
+    assert compact_payload(ROOMS[0]) == "R1:B2214"
+
+def test_parse_legacy_json_payload():
+    assert parse_payload(json.dumps({"room_number": 101, "floor": 1})) == "101"
+    assert parse_payload(json.dumps({"floor": 1})) is None
+    assert parse_payload(json.dumps(["room_number"])) is None
+    assert parse_payload("not a room code") is None
+    assert parse_payload("") is None
+
+def test_registry_resolves_registered_rooms_by_compact_id():
+    registry = RoomRegistry(ROOMS)
+    assert len(registry) == 2
+    room = registry.resolve("R1:B2214")
+    assert room == {"room_number": "b2214", "floor": "2", "wing": "B", "x": 12.5, "y": 4.0}
+    # Legacy codes of registered rooms resolve to the registry entry too
+    assert registry.resolve(json.dumps({"room_number": "101", "floor": "9"})) == {"room_number": "101", "floor": "1"}
+
+def test_registry_falls_back_to_the_payload_for_unknown_rooms():
+    registry = RoomRegistry(ROOMS)
+    assert registry.resolve("R1:C7") == {"room_number": "C7"}
+    legacy = {"room_number": 7, "floor": 3, "wing": None, "color": "blue"}
+    assert registry.resolve(json.dumps(legacy)) == {"room_number": "7", "floor": "3"}
+    assert registry.resolve("garbage") is None
+
+def test_load_rooms_from_csv_and_json(tmp_path):
+    csv_path = tmp_path / "rooms.csv"
+    csv_path.write_text("room_number,floor,wing,type,building,x,y\n101, 1 ,A,,,1,2\n102,1,A,icu,main,,\n")
+    assert load_rooms(str(csv_path)) == [
+        {"room_number": "101", "floor": "1", "wing": "A", "x": "1", "y": "2"},
+        {"room_number": "102", "floor": "1", "wing": "A", "type": "icu", "building": "main"},
+    ]
+    json_path = tmp_path / "rooms.json"
+    json_path.write_text(json.dumps([{"room_number": 5, "x": 1.5}]))
+    assert load_rooms(str(json_path)) == [{"room_number": "5", "x": "1.5"}]
+
+def test_load_rooms_rejects_duplicates_and_missing_ids(tmp_path):
+    path = tmp_path / "rooms.json"
+    path.write_text(json.dumps([{"room_number": "a1"}, {"room_number": "A1"}]))
+    with pytest.raises(ValueError, match="listed twice"):
+        load_rooms(str(path))
+    path.write_text(json.dumps([{"room_number": "a1"}, {"floor": "2"}]))
+    with pytest.raises(ValueError, match="entry 2 has no room_number"):
+        load_rooms(str(path))
+
+def test_missing_registry_file_gives_an_empty_registry(tmp_path):
+    assert len(RoomRegistry.from_file(str(tmp_path / "missing.json"))) == 0
+    assert len(RoomRegistry.from_file(None)) == 0
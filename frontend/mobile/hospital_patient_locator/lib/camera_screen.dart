@@ -4,7 +4,6 @@ import 'package:flutter/material.dart';
 import 'package:camera/camera.dart';
 import 'package:http/http.dart' as http;
 import 'dart:convert';
-import 'dart:typed_data';
 
 class PatientInfo {
   final String id;
@@ -106,40 +105,35 @@ class _CameraScreenState extends State<CameraScreen> {
 
   Future<void> _detectQRCode(CameraImage image) async {
     try {
-      final allBytes = BytesBuilder();
-      allBytes.add(image.planes[0].bytes);
-      
-      final bytes = allBytes.takeBytes();
-      final base64Image = base64Encode(bytes);
-      
+      // Send the luminance plane as raw bytes; the server honours the row stride
+      final plane = image.planes[0];
+
       final response = await http.post(
         Uri.parse('$SCAN_URL/scan'),
-        headers: {'Content-Type': 'application/json'},
-        body: jsonEncode({
-          'image': 'data:image/jpeg;base64,$base64Image',
-          'width': image.width,
-          'height': image.height,
-          'format': 'yuv420'
-        }),
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'X-Width': image.width.toString(),
+          'X-Height': image.height.toString(),
+          'X-Bytes-Per-Row': plane.bytesPerRow.toString(),
+          'X-Device-Id': MOCK_USER['username'],
+          'X-Username': MOCK_USER['username'],
+        },
+        body: plane.bytes,
       );
 
       if (response.statusCode == 200) {
         final result = jsonDecode(response.body);
-        if (result['success'] == true && 
-            result['results'] != null && 
-            result['results'].isNotEmpty) {
-          
-          final qrData = result['results'][0]['qr_data'];
-          
-          // Parse the QR data to get room number
-          final qrDataMap = jsonDecode(qrData);
-          final roomNumber = qrDataMap['room_number'];
+        final location = result['location'];
 
-          // Save localisation with hardcoded username
-          await saveLocalisation(roomNumber, MOCK_USER['username']);
-          
-          // Add delay to prevent multiple scans
-          await Future.delayed(const Duration(seconds: 2));
+        // The server confirms the room over several scans and saves the
+        // localisation itself, only when it actually changes
+        if (result['success'] == true && location != null && location['changed'] == true) {
+          ScaffoldMessenger.of(context).showSnackBar(
+            SnackBar(
+              content: Text('Location updated: room ${location['room_id']}'),
+              backgroundColor: Colors.green,
+            ),
+          );
         }
       }
     } catch (e, stackTrace) {
@@ -148,76 +142,6 @@ class _CameraScreenState extends State<CameraScreen> {
     }
   }
 
-  Future<void> saveLocalisation(String roomNumber, String username) async {
-    try {
-      print('Sending localisation request with room_id: $roomNumber, username: $username');
-      
-      final uri = Uri.parse('$BASE_URL/api/localisations');
-      print('Request URL: $uri');
-      
-      final requestBody = jsonEncode({
-        'room_id': roomNumber,
-        'username': username
-      });
-      print('Request body: $requestBody');
-      
-      final response = await http.post(
-        uri,
-        headers: {
-          'Content-Type': 'application/json',
-          'Accept': 'application/json',
-        },
-        body: requestBody,
-      ).timeout(
-        const Duration(seconds: 10),
-        onTimeout: () {
-          print('Request timed out');
-          throw TimeoutException('Request timed out');
-        },
-      );
-
-      print('Response status code: ${response.statusCode}');
-      print('Response headers: ${response.headers}');
-      print('Response body: ${response.body}');
-
-      if (response.statusCode == 200 || response.statusCode == 201) {
-        print('Localisation saved successfully');
-        ScaffoldMessenger.of(context).showSnackBar(
-          const SnackBar(
-            content: Text('Location updated successfully'),
-            backgroundColor: Colors.green,
-          ),
-        );
-      } else {
-        print('Failed to save localisation: ${response.statusCode}');
-        print('Error response body: ${response.body}');
-        
-        String errorMessage = 'Failed to update location';
-        try {
-          final errorBody = jsonDecode(response.body);
-          errorMessage = errorBody['message'] ?? errorMessage;
-        } catch (e) {
-          print('Error parsing error response: $e');
-        }
-        
-        ScaffoldMessenger.of(context).showSnackBar(
-          SnackBar(
-            content: Text(errorMessage),
-            backgroundColor: Colors.red,
-          ),
-        );
-      }
-    } catch (e) {
-      print('Error saving localisation: $e');
-      ScaffoldMessenger.of(context).showSnackBar(
-        SnackBar(
-          content: Text('Network error: $e'),
-          backgroundColor: Colors.red,
-        ),
-      );
-    }
-  }
-
   Future<void> printLocalisations() async {
     try {
       final uri = Uri.parse('http://192.168.3.89:8082/api/localisations');
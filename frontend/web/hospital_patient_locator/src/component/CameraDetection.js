@@ -4,6 +4,7 @@ import './CameraDetection.css';
 const CameraDetection = () => {
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
+  const socketRef = useRef(null);
   const [detectionResult, setDetectionResult] = useState(null);
   const [isActive, setIsActive] = useState(false);
 
@@ -43,13 +44,35 @@ const CameraDetection = () => {
   useEffect(() => {
     let interval;
     if (isActive) {
-      interval = setInterval(captureFrame, 2000);
+      // One streaming session per camera; the server only analyzes the newest frame
+      const socket = new WebSocket('ws://localhost:5001/ws/detection');
+      socket.binaryType = 'arraybuffer';
+      socket.onmessage = (event) => {
+        const result = JSON.parse(event.data);
+        if (result.status === 'success') {
+          setDetectionResult(result);
+        } else {
+          console.error('Error analyzing frame:', result.detail);
+        }
+      };
+      socket.onerror = (error) => console.error('Detection stream error:', error);
+      socketRef.current = socket;
+      interval = setInterval(captureFrame, 250);
     }
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      if (socketRef.current) {
+        socketRef.current.close();
+        socketRef.current = null;
+      }
+    };
   }, [isActive]);
 
   const captureFrame = async () => {
+    const socket = socketRef.current;
     if (!videoRef.current || !canvasRef.current) return;
+    // Skip this tick if the previous frame has not left the browser yet
+    if (!socket || socket.readyState !== WebSocket.OPEN || socket.bufferedAmount > 0) return;
 
     const canvas = canvasRef.current;
     const video = videoRef.current;
@@ -62,31 +85,10 @@ const CameraDetection = () => {
     // Draw current video frame to canvas
     context.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-    // Get base64 image data
-    const imageData = canvas.toDataURL('image/jpeg');
-    const base64Data = imageData.split(',')[1];
-
-    try {
-        const response = await fetch('http://localhost:5001/api/detection/analyze', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'Accept': 'application/json',
-            },
-            body: JSON.stringify({
-                image: base64Data
-            })
-        });
-
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        const result = await response.json();
-        setDetectionResult(result);
-    } catch (error) {
-        console.error('Error analyzing frame:', error);
-    }
+    // Push the JPEG bytes as a binary message
+    const imageBlob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg'));
+    if (!imageBlob || socket.readyState !== WebSocket.OPEN) return;
+    socket.send(await imageBlob.arrayBuffer());
   };
 
   const handleStartCamera = () => {